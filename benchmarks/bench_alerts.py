@@ -0,0 +1,116 @@
+"""Alert evaluation cost: grouped, vectorized cycles vs. polling per rule.
+
+Synthetic rules are spread over a universe of symbols and checked against
+a stubbed price feed with no network latency, so the numbers are the CPU
+cost of evaluation plus the number of feed requests each approach makes.
+
+    python -m benchmarks.bench_alerts
+"""
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from utils.alerts import ALERT_KINDS, ALERT_PERIOD, AlertScheduler
+from utils.prediction import StockPredictor
+
+SYMBOLS = 2000
+BARS = 63
+RULE_COUNTS = [1_000, 10_000, 50_000]
+MAX_SYMBOLS_PER_CYCLE = 500
+POLLED_RULES = 1_000  # The per-rule loop is timed on a sample and extrapolated
+
+
+class StubFeed:
+    """Feed returning pregenerated daily closes, counting requests"""
+
+    def __init__(self, symbols, bars=BARS):
+        idx = pd.date_range(end="2024-06-28", periods=bars, freq="B", name="Date")
+        rng = np.random.default_rng(0)
+        closes = 100 + rng.standard_normal((bars, len(symbols))).cumsum(axis=0)
+        self.frames = {s: pd.DataFrame({"Close": closes[:, i]}, index=idx)
+                       for i, s in enumerate(symbols)}
+        self.requests = 0
+
+    def histories(self, symbols, period=ALERT_PERIOD):
+        self.requests += 1
+        return {s: self.frames[s] for s in symbols if s in self.frames}, {}
+
+    def history(self, symbol):
+        self.requests += 1
+        return self.frames[symbol]
+
+
+def synthetic_rules(count, symbols, seed=1):
+    rng = np.random.default_rng(seed)
+    kinds = list(ALERT_KINDS)
+    thresholds = {
+        "price_above": lambda: rng.uniform(90, 110),
+        "price_below": lambda: rng.uniform(90, 110),
+        "pct_move": lambda: rng.uniform(0.5, 3),
+        "rsi_above": lambda: rng.uniform(60, 80),
+        "rsi_below": lambda: rng.uniform(20, 40),
+    }
+    rules = []
+    for i in range(count):
+        kind = kinds[rng.integers(len(kinds))]
+        rules.append(SimpleNamespace(id=i, user_id=i % 500, kind=kind,
+                                     symbol=symbols[rng.integers(len(symbols))],
+                                     threshold=thresholds[kind]()))
+    return rules
+
+
+def poll_rule(feed, rule):
+    """The naive pattern: fetch and compute indicators for every rule separately"""
+    close = feed.history(rule.symbol)["Close"]
+    last, prev = close.iloc[-1], close.iloc[-2]
+    if rule.kind == "price_above":
+        return prev < rule.threshold <= last
+    if rule.kind == "price_below":
+        return prev > rule.threshold >= last
+    if rule.kind == "pct_move":
+        return abs((last - prev) / prev * 100) >= rule.threshold
+    rsi = StockPredictor.calculate_rsi(close)
+    if rule.kind == "rsi_above":
+        return rsi.iloc[-2] < rule.threshold <= rsi.iloc[-1]
+    return rsi.iloc[-2] > rule.threshold >= rsi.iloc[-1]
+
+
+def main():
+    symbols = [f"SYM{i:04d}" for i in range(SYMBOLS)]
+    feed = StubFeed(symbols)
+
+    print(f"{SYMBOLS} symbols, {BARS} bars, {MAX_SYMBOLS_PER_CYCLE} symbols per cycle")
+    print(f"{'rules':>8} {'approach':>10} {'requests':>10} {'ms/cycle':>10} {'ms/sweep':>10} {'fired':>7}")
+    for count in RULE_COUNTS:
+        rules = synthetic_rules(count, symbols)
+
+        sample = rules[:POLLED_RULES]
+        feed.requests = 0
+        start = time.perf_counter()
+        fired = sum(bool(poll_rule(feed, r)) for r in sample)
+        polled_ms = (time.perf_counter() - start) * 1000 * count / len(sample)
+        print(f"{count:>8} {'per-rule':>10} {count:>10} {'-':>10} {polled_ms:>10.0f} "
+              f"{fired * count // len(sample):>7}")
+
+        scheduler = AlertScheduler(lambda: rules, feed.histories,
+                                   max_symbols_per_cycle=MAX_SYMBOLS_PER_CYCLE)
+        scheduler.run_cycle()  # Compile the rule book outside the timed sweep
+        scheduler._cursor = 0
+        scheduler.book.last_fired[:] = np.iinfo(np.int64).min
+        feed.requests = 0
+        cycles, fired, cycle_ms = 0, 0, []
+        while True:
+            start = time.perf_counter()
+            fired += len(scheduler.run_cycle())
+            cycle_ms.append((time.perf_counter() - start) * 1000)
+            cycles += 1
+            if scheduler._cursor == 0:
+                break
+        print(f"{count:>8} {'grouped':>10} {feed.requests:>10} {max(cycle_ms):>10.1f} "
+              f"{sum(cycle_ms):>10.0f} {fired:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Load test for user lookups and logins against SQLite as a local database.
+
+    python -m benchmarks.bench_auth
+
+Set AUTH_HASH_WORKERS before running to verify passwords on the bounded
+worker pool instead of the calling thread.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench_auth.db")
+
+from utils import auth  # noqa: E402  (DATABASE_URL must be set first)
+
+USERS = 50
+SESSIONS = 16
+REQUESTS = 2000
+
+
+def uncached_lookup(username):
+    auth.invalidate_user_cache(username)
+    return auth.get_user_by_username(username)
+
+
+def run(label, fn, requests=REQUESTS):
+    names = [f"user{i % USERS}" for i in range(requests)]
+    latencies = []
+
+    def timed(name):
+        start = time.perf_counter()
+        fn(name)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=SESSIONS) as pool:
+        list(pool.map(timed, names))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)]
+    print(f"{label:>22} {requests / elapsed:>10.0f} {p95 * 1e3:>10.2f}")
+
+
+def main():
+    for i in range(USERS):
+        if auth.get_user_by_username(f"user{i}") is None:
+            auth.create_user(f"user{i}", f"user{i}@example.com", "secret")
+
+    print(f"{'workload':>22} {'req/s':>10} {'p95 (ms)':>10}")
+    run("lookup, uncached", uncached_lookup)
+    run("lookup, cached", auth.get_user_by_username)
+    run("login", lambda name: auth.authenticate(name, "secret"), requests=200)
+
+
+if __name__ == "__main__":
+    main()
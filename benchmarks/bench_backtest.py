@@ -0,0 +1,51 @@
+"""Wall-clock time of a 500-symbol x 5y walk-forward backtest from the history store.
+
+Synthetic daily histories are written to a temporary history store first,
+so the run is fully offline, then backtested in-process and on a process
+pool over shared memory.
+
+    python -m benchmarks.bench_backtest
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.backtest import WalkForwardBacktest, summarize
+from utils.history_store import HistoryStore
+
+SYMBOLS = 500
+BARS = 1260  # About five years of trading days
+
+
+def populate(store, symbols, bars=BARS):
+    idx = pd.bdate_range(end="2024-06-28", periods=bars, name="Date")
+    rng = np.random.default_rng(0)
+    for symbol in symbols:
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, bars)))
+        history = pd.DataFrame({
+            "Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+            "Volume": rng.integers(100_000, 5_000_000, bars).astype(float),
+        }, index=idx)
+        store.save(symbol, history, idx[0])
+
+
+def main():
+    store = HistoryStore(tempfile.mkdtemp(), offline=True)
+    symbols = [f"SYM{i:03d}" for i in range(SYMBOLS)]
+    populate(store, symbols)
+
+    print(f"{SYMBOLS} symbols x {BARS} bars, horizons 1/5/21, monthly folds")
+    print(f"{'workers':>8} {'seconds':>10}")
+    for workers in sorted({1, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        results = WalkForwardBacktest(workers=workers).run_store(symbols, store=store)
+        print(f"{workers:>8} {time.perf_counter() - start:>10.1f}")
+    print()
+    print(summarize(results).to_string())
+
+
+if __name__ == "__main__":
+    main()
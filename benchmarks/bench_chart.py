@@ -0,0 +1,60 @@
+"""Serialized size and build time of the stock chart, full vs. downsampled.
+
+    python -m benchmarks.bench_chart
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.visualizations import StockVisualizer
+
+
+def synthetic_history(n, freq):
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range("2020-01-01", periods=n, freq=freq, tz="America/New_York")
+    return pd.DataFrame({
+        "Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, n),
+    }, index=index)
+
+
+def measure(data, predictions, max_points):
+    start = time.perf_counter()
+    fig = StockVisualizer.create_stock_chart(data, predictions, max_points=max_points)
+    payload = fig.to_json()
+    return time.perf_counter() - start, len(payload)
+
+
+def main():
+    cases = {
+        "5y daily": synthetic_history(5 * 252, "B"),
+        "1y 1-minute": synthetic_history(252 * 390, "min"),
+    }
+    print(f"{'series':>12} {'mode':>12} {'build+json (ms)':>16} {'payload (KB)':>13}")
+    for name, data in cases.items():
+        predictions = pd.Series(
+            data["Close"].iloc[-1] + np.arange(183.0),
+            index=data.index[-1] + pd.to_timedelta(np.arange(1, 184), unit="D"),
+        )
+        for mode, max_points in (("full", None), ("downsampled", 1000)):
+            elapsed, size = measure(data, predictions, max_points)
+            print(f"{name:>12} {mode:>12} {elapsed * 1e3:>16.1f} {size / 1024:>13.1f}")
+
+    # Rerun pattern of the dashboard: chart, then chart with predictions, then again
+    data = cases["5y daily"]
+    predictions = pd.Series(
+        data["Close"].iloc[-1] + np.arange(183.0),
+        index=data.index[-1] + pd.to_timedelta(np.arange(1, 184), unit="D"),
+    )
+    print(f"\n{'rerun step (5y daily, cached)':>32} {'build (ms)':>11}")
+    for step, preds in (("base, cold", None), ("add prediction overlay", predictions),
+                        ("toggle back to base", None), ("overlay again", predictions)):
+        start = time.perf_counter()
+        StockVisualizer.create_stock_chart(data, preds, symbol="SYM")
+        print(f"{step:>32} {(time.perf_counter() - start) * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Export cost per format, and what each page render pays for the download section.
+
+    python -m benchmarks.bench_export
+"""
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from utils.export import EXPORT_FORMATS, DataExporter
+
+CASES = {
+    "5y daily": pd.bdate_range(end="2024-06-28", periods=1260, tz="America/New_York"),
+    "60d 1m": pd.date_range(end="2024-06-28 16:00", periods=60 * 390, freq="min",
+                            tz="America/New_York"),
+}
+
+
+def history(index):
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(len(index)).cumsum()
+    return pd.DataFrame({
+        "Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, len(index)),
+        "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=index)
+
+
+def measure(fn, reset=lambda: None):
+    """Time fn, then run it again under tracemalloc for its peak allocation"""
+    reset()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    reset()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    print(f"{'history':>10} {'format':>8} {'size (KB)':>10} {'build (ms)':>11} "
+          f"{'peak (KB)':>10} {'cached (ms)':>12}")
+    for name, index in CASES.items():
+        data = history(index)
+        for fmt in EXPORT_FORMATS:
+            payload, elapsed, peak = measure(lambda: DataExporter.export(data, fmt, "SYM"),
+                                             DataExporter.clear_cache)
+            start = time.perf_counter()
+            DataExporter.export(data, fmt, "SYM")
+            cached = time.perf_counter() - start
+            print(f"{name:>10} {fmt:>8} {len(payload) // 1024:>10} {elapsed * 1e3:>11.1f} "
+                  f"{peak // 1024:>10} {cached * 1e3:>12.3f}")
+
+        # Before: every render serialized the CSV; now a render only creates a callable
+        _, eager, _ = measure(lambda: data.to_csv())
+        print(f"{name:>10} per render: eager to_csv {eager * 1e3:.1f} ms, lazy 0 ms")
+
+
+if __name__ == "__main__":
+    main()
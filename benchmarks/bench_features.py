@@ -0,0 +1,73 @@
+"""Feature preparation cost: pandas rolling ops vs. NumPy batch vs. incremental.
+
+    python -m benchmarks.bench_features
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.features import FeatureEngine, compute_features
+from utils.prediction import StockPredictor
+
+
+def pandas_features(data):
+    """The rolling-window feature code StockPredictor.prepare_data used to run"""
+    df = data.copy()
+    df['SMA_5'] = df['Close'].rolling(window=5).mean()
+    df['SMA_20'] = df['Close'].rolling(window=20).mean()
+    df['RSI'] = StockPredictor.calculate_rsi(df['Close'])
+    df['Daily_Return'] = df['Close'].pct_change()
+    df['Volatility'] = df['Daily_Return'].rolling(window=5).std()
+    return df[['Close', 'Volume', 'SMA_5', 'SMA_20', 'RSI', 'Volatility']].values
+
+
+def synthetic_history(n, freq):
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    index = pd.date_range("2015-01-01", periods=n, freq=freq)
+    return pd.DataFrame({"Close": close, "Volume": rng.integers(1_000, 1_000_000, n)}, index=index)
+
+
+def best_of(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    cases = {
+        "5y daily": synthetic_history(5 * 252, "B"),
+        "3y 1-minute": synthetic_history(3 * 252 * 390, "min"),
+    }
+    print(f"{'series':>12} {'bars':>8} {'pandas (ms)':>12} {'numpy (ms)':>11} {'+1 bar (us)':>12}")
+    for name, df in cases.items():
+        close = df["Close"].to_numpy(dtype=float)
+        volume = df["Volume"].to_numpy(dtype=float)
+
+        expected = pandas_features(df)
+        actual = compute_features(close, volume)
+        assert np.allclose(expected, actual, equal_nan=True, rtol=1e-9, atol=1e-9)
+
+        pandas_time = best_of(lambda: pandas_features(df))
+        numpy_time = best_of(lambda: compute_features(close, volume))
+
+        # Incremental: state is warm for all but the last bar
+        def append_one():
+            engine = FeatureEngine()
+            engine.features("SYM", df.index[:-2], close[:-2], volume[:-2])
+            engine.features("SYM", df.index[:-1], close[:-1], volume[:-1])
+            start = time.perf_counter()
+            engine.features("SYM", df.index, close, volume)
+            return time.perf_counter() - start
+        append_time = min(append_one() for _ in range(3))
+
+        print(f"{name:>12} {len(df):>8} {pandas_time * 1e3:>12.2f} "
+              f"{numpy_time * 1e3:>11.2f} {append_time * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
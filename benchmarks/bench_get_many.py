@@ -0,0 +1,87 @@
+"""Wall-clock comparison of StockDataHandler.get_many vs. a per-symbol loop.
+
+Uses a stub provider with a fixed simulated round-trip latency, so the
+numbers reflect request structure rather than network conditions.
+
+    python -m benchmarks.bench_get_many
+"""
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data_handler import StockDataHandler
+from utils.fundamentals import FundamentalsStore
+from utils.history_store import HistoryStore
+
+LATENCY = 0.05  # seconds per simulated round trip
+
+
+class StubProvider:
+    """Provider returning synthetic daily bars after a simulated delay"""
+
+    def __init__(self, latency=LATENCY, bars=252):
+        self.latency = latency
+        self.bars = bars
+        self.calls = 0
+
+    def _frame(self, symbol):
+        idx = pd.date_range(end=pd.Timestamp.now(tz="America/New_York").normalize(),
+                            periods=self.bars, freq="B", name="Date")
+        rng = np.random.default_rng(abs(hash(symbol)) % 2**32)
+        close = 100 + rng.standard_normal(self.bars).cumsum()
+        return pd.DataFrame({
+            "Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+            "Volume": rng.integers(1_000, 10_000, self.bars),
+            "Dividends": 0.0, "Stock Splits": 0.0,
+        }, index=idx)
+
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._frame(symbol)
+
+    def download(self, symbols, period=None, start=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        return {symbol: self._frame(symbol) for symbol in symbols}
+
+    def info(self, symbol):
+        self.calls += 1
+        time.sleep(self.latency)
+        return {"longName": symbol}
+
+
+def sequential_loop(provider, symbols):
+    """The pre-existing access pattern: history then info, one symbol at a time"""
+    return {s: {"history": provider.history(s, period="1y"), "info": provider.info(s)}
+            for s in symbols}
+
+
+def main():
+    print(f"{'symbols':>8} {'loop (s)':>10} {'get_many (s)':>13} {'speedup':>8} {'calls':>6}")
+    for n in (1, 10, 50, 100):
+        symbols = [f"SYM{i}" for i in range(n)]
+
+        provider = StubProvider()
+        start = time.perf_counter()
+        sequential_loop(provider, symbols)
+        loop_time = time.perf_counter() - start
+
+        provider = StubProvider()
+        StockDataHandler.provider = provider
+        store_dir = tempfile.mkdtemp()
+        StockDataHandler.history_store = HistoryStore(store_dir)
+        StockDataHandler.fundamentals_store = FundamentalsStore(store_dir)
+        start = time.perf_counter()
+        results, errors = StockDataHandler.get_many(symbols, "1y")
+        batch_time = time.perf_counter() - start
+        assert len(results) == n and not errors
+
+        print(f"{n:>8} {loop_time:>10.3f} {batch_time:>13.3f} "
+              f"{loop_time / batch_time:>7.1f}x {provider.calls:>6}")
+
+
+if __name__ == "__main__":
+    main()
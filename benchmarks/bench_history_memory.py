@@ -0,0 +1,93 @@
+"""Memory of cached histories: full float64 frames vs. CompactHistory.
+
+Reports bytes per symbol-year for one history, then the resident set size
+of a fresh process holding 500 cached five-year histories in a
+MemoryCacheBackend (as StockDataHandler.get_stock_data leaves them), once
+per layout. Each layout runs in its own process so the numbers do not mix.
+
+    python -m benchmarks.bench_history_memory
+"""
+import gc
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+SYMBOLS = 500
+YEARS = 5
+BARS = 252 * YEARS
+INFO = {"longName": "Example Corp", "sector": "Technology", "industry": "Software",
+        "marketCap": 1.2e12, "trailingPE": 31.5}
+
+
+def history(i):
+    """A yfinance-shaped daily history: OHLC, Volume, Dividends, Stock Splits"""
+    rng = np.random.default_rng(i)
+    index = pd.bdate_range(end="2024-06-28", periods=BARS, tz="America/New_York", name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, BARS)))
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.005, BARS)), "High": close * 1.01, "Low": close * 0.99,
+        "Close": close, "Volume": rng.integers(100_000, 50_000_000, BARS),
+        "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=index)
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    import resource  # Not Linux: peak RSS is the closest available figure
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(layout):
+    from utils.compact_history import CompactHistory
+    from utils.shared_cache import MemoryCacheBackend
+
+    cache = MemoryCacheBackend(max_entries=SYMBOLS)
+    gc.collect()
+    before = rss_mb()
+    for i in range(SYMBOLS):
+        frame = history(i)
+        if layout == "compact":
+            entry = {"history": CompactHistory.from_frame(frame), "info": dict(INFO)}
+            entry["history"].index  # The index every frame() shares
+        else:
+            entry = {"history": frame, "info": dict(INFO)}
+        cache.set(f"stock:S{i}:5y", entry, 300)
+        del frame, entry
+    gc.collect()
+    print(f"{rss_mb() - before:.1f}")
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        child(sys.argv[2])
+        return
+
+    from utils.compact_history import CompactHistory
+    frame = history(0)
+    compact = CompactHistory.from_frame(frame)
+    full_bytes = frame.memory_usage(deep=True).sum()
+    view = compact.frame()
+    view_extra = view.index.nbytes  # The materialized index; the columns are views
+    print(f"bytes per symbol-year: float64 frame {full_bytes / YEARS:,.0f}, "
+          f"compact buffer {compact.nbytes / YEARS:,.0f}, "
+          f"buffer + frame view {(compact.nbytes + view_extra) / YEARS:,.0f}")
+    print(f"max close error from float32: "
+          f"{np.abs(view['Close'].to_numpy() / frame['Close'].to_numpy() - 1).max():.1e} (relative)")
+
+    results = {}
+    for layout in ("frame", "compact"):
+        out = subprocess.run([sys.executable, "-m", "benchmarks.bench_history_memory", "--child", layout],
+                             capture_output=True, text=True, check=True)
+        results[layout] = float(out.stdout.strip().splitlines()[-1])
+    print(f"RSS growth with {SYMBOLS} cached {YEARS}-year histories: float64 frames "
+          f"{results['frame']:.1f} MB, compact {results['compact']:.1f} MB "
+          f"({results['frame'] / results['compact']:.1f}x less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Indicator cost: one shared IndicatorSet vs. a separate pandas pass per indicator.
+
+    python -m benchmarks.bench_indicators
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.indicators import OVERLAYS, IndicatorSet, TechnicalIndicators
+
+REPEATS = 20
+
+
+def history(n):
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(n).cumsum()
+    return pd.DataFrame({
+        "Open": close, "High": close + rng.random(n), "Low": close - rng.random(n), "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, n).astype(float),
+    }, index=pd.date_range(end="2024-06-28", periods=n, freq="min"))
+
+
+def pandas_per_indicator(data):
+    """Each overlay computed on its own, the way a pandas-per-feature approach would"""
+    close, high, low, volume = data['Close'], data['High'], data['Low'], data['Volume']
+    out = {}
+    out["SMA_20"] = close.rolling(20).mean()
+    out["SMA_50"] = close.rolling(50).mean()
+    out["EMA_12"] = close.ewm(span=12, adjust=False).mean()
+    out["EMA_26"] = close.ewm(span=26, adjust=False).mean()
+    middle, std = close.rolling(20).mean(), close.rolling(20).std(ddof=0)
+    out["BB_Upper"], out["BB_Middle"], out["BB_Lower"] = middle + 2 * std, middle, middle - 2 * std
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    signal = macd.ewm(span=9, adjust=False).mean()
+    out["MACD"], out["MACD_Signal"], out["MACD_Hist"] = macd, signal, macd - signal
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    out["RSI"] = 100 - 100 / (1 + gain / loss)
+    true_range = pd.concat([high - low, (high - close.shift()).abs(), (low - close.shift()).abs()],
+                           axis=1).max(axis=1)
+    out["ATR"] = true_range.ewm(alpha=1 / 14, adjust=False).mean()
+    out["OBV"] = (np.sign(close.diff().fillna(0)) * volume).cumsum()
+    return pd.DataFrame(out)
+
+
+def timed(fn):
+    fn()
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = fn()
+    return result, (time.perf_counter() - start) / REPEATS * 1000
+
+
+def main():
+    columns = TechnicalIndicators.overlay_columns(OVERLAYS)
+    print(f"{'bars':>7} {'pandas (ms)':>12} {'shared (ms)':>12} {'speedup':>8} {'cached (ms)':>12} "
+          f"{'max diff':>9}")
+    for n in (252, 1260, 23_400, 200_000):
+        data = history(n)
+        expected, pandas_ms = timed(lambda: pandas_per_indicator(data))
+
+        def shared():
+            indicators = IndicatorSet(data['Close'], data['Volume'], data['High'], data['Low'])
+            return indicators.matrix(columns)
+        matrix, shared_ms = timed(shared)
+
+        TechnicalIndicators.cache.clear()
+        TechnicalIndicators.compute(data, columns, "SYM")
+        _, cached_ms = timed(lambda: TechnicalIndicators.compute(data, columns, "SYM"))
+
+        # Compare where both are defined (the shared set masks warm-up bars)
+        reference = expected[columns].to_numpy()
+        both = ~np.isnan(matrix) & ~np.isnan(reference)
+        diff = np.abs(matrix[both] - reference[both]) / np.maximum(np.abs(reference[both]), 1.0)
+        print(f"{n:>7} {pandas_ms:>12.2f} {shared_ms:>12.2f} {pandas_ms / shared_ms:>7.1f}x "
+              f"{cached_ms:>12.3f} {diff.max():>9.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Fit/forecast time and holdout accuracy of every model backend on one universe.
+
+Synthetic daily histories stand in for market data; the last month of
+each is held out and forecast from the rest.
+
+    python -m benchmarks.bench_models
+"""
+import numpy as np
+import pandas as pd
+
+from utils.models import compare_backends
+
+SYMBOLS = 200
+BARS = 1260
+HOLDOUT = 21
+
+
+def universe(symbols=SYMBOLS, bars=BARS):
+    idx = pd.bdate_range(end="2024-06-28", periods=bars, name="Date")
+    rng = np.random.default_rng(0)
+    histories = {}
+    for i in range(symbols):
+        close = rng.uniform(20, 500) * np.exp(np.cumsum(rng.normal(0.0003, 0.015, bars)))
+        histories[f"SYM{i:03d}"] = pd.DataFrame({
+            "Close": close,
+            "Volume": rng.integers(100_000, 5_000_000, bars).astype(float),
+        }, index=idx)
+    return histories
+
+
+def main():
+    compare_backends(universe(2, 300), HOLDOUT)  # Pay the sklearn imports up front
+    print(f"{SYMBOLS} symbols x {BARS} bars, {HOLDOUT}-day holdout")
+    print(compare_backends(universe(), HOLDOUT).round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Risk matrix build time vs. basket size.
+
+Compares aligning the closes with one join (StockDataHandler.close_panel)
+against a merge per symbol pair, building the float32 return panel and
+rolling moments against a float64 pandas corr(), and pushing one new day
+into an existing model against rebuilding it.
+
+    python -m benchmarks.bench_risk
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data_handler import StockDataHandler
+from utils.risk import BasketRisk
+
+DAYS = 504  # Two years of bars
+PAIRWISE_MAX = 50  # Pairwise merges beyond this take too long to run
+
+
+def histories(n):
+    """Synthetic closes with a common market factor; a few days missing per symbol"""
+    rng = np.random.default_rng(n)
+    index = pd.bdate_range(end="2024-06-28", periods=DAYS + 1, tz="America/New_York", name="Date")
+    market = rng.normal(0, 0.01, len(index))
+    out = {"SPY": pd.DataFrame({"Close": 100 * np.cumprod(1 + market)}, index=index)}
+    for i in range(n):
+        returns = rng.uniform(0.5, 1.5) * market + rng.normal(0, 0.015, len(index))
+        frame = pd.DataFrame({"Close": 50 * np.cumprod(1 + returns)}, index=index)
+        out[f"S{i:04d}"] = frame.drop(frame.index[rng.integers(1, len(index) - 2, 3)])
+    return out
+
+
+def pairwise(hist):
+    """Correlation from one inner merge per symbol pair"""
+    symbols = [s for s in hist if s != "SPY"]
+    corr = np.eye(len(symbols))
+    for i in range(len(symbols)):
+        for j in range(i + 1, len(symbols)):
+            pair = pd.merge(hist[symbols[i]]["Close"], hist[symbols[j]]["Close"],
+                            left_index=True, right_index=True).pct_change().iloc[-252:]
+            corr[i, j] = corr[j, i] = pair.iloc[:, 0].corr(pair.iloc[:, 1])
+    return corr
+
+
+def timed(fn, repeats=3):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def main():
+    print(f"{'symbols':>7} {'align (ms)':>11} {'pairwise (ms)':>14} {'build (ms)':>11} "
+          f"{'pandas corr (ms)':>17} {'new day (ms)':>13} {'VaR (ms)':>9} {'panel MB':>9} {'max diff':>9}")
+    for n in (10, 50, 100, 250, 500, 1000):
+        hist = histories(n)
+        closes, align_ms = timed(lambda: StockDataHandler.close_panel(hist))
+        pairwise_ms = timed(lambda: pairwise(hist), 1)[1] if n <= PAIRWISE_MAX else float("nan")
+
+        model, build_ms = timed(lambda: BasketRisk(closes.iloc[:-1], "SPY"))
+        reference, pandas_ms = timed(lambda: closes.drop(columns="SPY").pct_change().iloc[-253:-1].corr())
+
+        # One new day: pushed into fresh models, best of three
+        models = [BasketRisk(closes.iloc[:-1], "SPY") for _ in range(3)]
+        update_ms = min(timed(lambda m=m: m.update(closes), 1)[1] for m in models)
+        _, var_ms = timed(lambda: models[0].value_at_risk())
+
+        diff = np.abs(model.correlation().to_numpy() - reference.to_numpy()).max()
+        print(f"{n:>7} {align_ms:>11.2f} {pairwise_ms:>14.1f} {build_ms:>11.2f} {pandas_ms:>17.2f} "
+              f"{update_ms:>13.3f} {var_ms:>9.2f} {model.returns.nbytes / 1e6:>9.2f} {diff:>9.1e}")
+
+
+if __name__ == "__main__":
+    main()
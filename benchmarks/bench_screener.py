@@ -0,0 +1,107 @@
+"""Universe screen: whole-panel vectorized snapshot vs. an IndicatorSet per symbol.
+
+Writes synthetic five-year histories for a universe to a temporary history
+store (some listed recently, some with missing days), then times the cold
+panel build from the Parquet files, a restart from the consolidated panel
+file, the first screen and warm screens, and checks the panel snapshot
+against per-symbol results.
+
+    python -m benchmarks.bench_screener [symbols]
+"""
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.history_store import HistoryStore
+from utils.indicators import IndicatorSet
+from utils.screener import SNAPSHOT_COLUMNS, StockScreener, UniversePanel, snapshot_frame
+
+BARS = 1260
+CONDITIONS = "RSI < 45\nClose > SMA_200\nVolume > Volume_SMA_20"
+REPEATS = 20
+
+
+def history(i, dates):
+    rng = np.random.default_rng(i)
+    n = len(dates) if i % 10 else int(rng.integers(30, 250))  # Every tenth symbol listed recently
+    close = 50 + 5 * rng.standard_normal(n).cumsum() / np.sqrt(n) + np.linspace(0, rng.normal(10, 20), n)
+    close = np.abs(close) + 5
+    frame = pd.DataFrame({
+        "Open": close, "High": close * (1 + rng.random(n) / 50), "Low": close * (1 - rng.random(n) / 50),
+        "Close": close, "Volume": rng.integers(10_000, 1_000_000, n).astype(float),
+    }, index=dates[-n:])
+    if i % 7 == 0:
+        frame = frame.drop(frame.index[-30:-25])  # A few missing days
+    return frame
+
+
+def per_symbol_snapshot(store, symbols, dates):
+    """The same metrics at the last bar, one history and IndicatorSet at a time"""
+    rows = {}
+    for symbol in symbols:
+        # Aligned like the panel: missing days repeat the last prices
+        h = store.load(symbol).reindex(dates).ffill()
+        ind = IndicatorSet(h["Close"], h["Volume"], h["High"], h["Low"])
+        rows[symbol] = {"RSI": ind.rsi()[-1], "SMA_200": ind.sma(200)[-1], "ATR": ind.atr()[-1],
+                        "MACD_Hist": ind.macd()[2][-1], "BB_Upper": ind.bollinger()[0][-1]}
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    dates = pd.bdate_range(end="2024-06-28", periods=BARS, tz="America/New_York", name="Date")
+    with tempfile.TemporaryDirectory() as root:
+        store = HistoryStore(root, offline=True)
+        symbols = [f"S{i:04d}" for i in range(n)]
+        for i, symbol in enumerate(symbols):
+            store.save(symbol, history(i, dates), None)
+
+        universe = StockScreener.universe = UniversePanel(store)
+        start = time.perf_counter()
+        panel = universe.get()
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        UniversePanel(store).get()
+        restart_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        rows, total = StockScreener.screen(CONDITIONS, "RSI", ascending=True)
+        first_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            StockScreener.screen(CONDITIONS, "RSI", ascending=True)
+        warm_ms = (time.perf_counter() - start) / REPEATS * 1000
+
+        start = time.perf_counter()
+        snapshot_frame(panel)
+        snapshot_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        expected = per_symbol_snapshot(store, symbols, dates[-panel['Close'].shape[0]:])
+        loop_ms = (time.perf_counter() - start) * 1000
+
+        snapshot = StockScreener.snapshot()
+        ours = snapshot.loc[expected.index, expected.columns].to_numpy()
+        reference = expected.to_numpy()
+        both = ~np.isnan(ours) & ~np.isnan(reference)
+        diff = np.abs(ours[both] - reference[both]) / np.maximum(np.abs(reference[both]), 1.0)
+        same_nan = (np.isnan(ours) == np.isnan(reference)).mean() * 100
+
+    print(f"{n} symbols, panel {panel['Close'].shape[0]} dates x {len(panel['symbols'])} symbols, "
+          f"{len(SNAPSHOT_COLUMNS)} snapshot columns")
+    print(f"cold panel build from Parquet: {cold_ms:8.1f} ms")
+    print(f"restart from panel file:       {restart_ms:8.1f} ms")
+    print(f"first screen (snapshot):       {first_ms:8.1f} ms  ({total} matches)")
+    print(f"warm screen:                   {warm_ms:8.2f} ms")
+    print(f"panel snapshot alone:          {snapshot_ms:8.1f} ms")
+    print(f"per-symbol loop (5 columns):   {loop_ms:8.1f} ms  ({loop_ms / snapshot_ms:.0f}x the panel)")
+    print(f"max diff vs per-symbol: {diff.max():.1e}, NaN pattern agrees on {same_nan:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Monte Carlo forecast bands: batched NumPy paths vs. a loop per path.
+
+Times 10,000 paths over a 12-month horizon for both simulation methods,
+against the same simulation written as one Python loop per path (run on
+a subset and scaled up). Then checks that a ten-year horizon simulated in
+chunks of steps matches the unchunked result for the same seed, while
+holding far smaller working arrays.
+
+    python -m benchmarks.bench_simulation
+"""
+import time
+
+import numpy as np
+
+from utils.simulation import BAND_QUANTILES, daily_log_returns, simulate_quantiles
+
+PATHS = 10_000
+HORIZON = 365  # Calendar days in 12 months, as the dashboard forecasts
+LONG_HORIZON = 3650
+LOOP_PATHS = 500  # Paths run through the per-path loop, scaled to PATHS
+
+
+def history(bars=1260):
+    rng = np.random.default_rng(0)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.02, bars)))
+
+
+def per_path(last_close, periods, returns, method, paths, seed=0):
+    """Reference simulation: one path at a time, one step at a time"""
+    rng = np.random.default_rng(seed)
+    residuals = returns - returns.mean()
+    drift, volatility = returns.mean(), returns.std(ddof=1)
+    prices = np.empty((periods, paths))
+    for p in range(paths):
+        level = np.log(last_close)
+        for t in range(periods):
+            if method == "gbm":
+                level += drift + volatility * rng.standard_normal()
+            else:
+                level += residuals[rng.integers(0, len(residuals))]
+            prices[t, p] = np.exp(level)
+    return np.quantile(prices, BAND_QUANTILES, axis=1)
+
+
+def best_of(fn, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    close = history()
+    returns = daily_log_returns(close)
+    last = close[-1]
+
+    for method in ("bootstrap", "gbm"):
+        batched = best_of(lambda: simulate_quantiles(last, HORIZON, returns, method,
+                                                     paths=PATHS, seed=0))
+        loop = best_of(lambda: per_path(last, HORIZON, returns, method, LOOP_PATHS), repeat=1)
+        loop *= PATHS / LOOP_PATHS
+        print(f"{method:9s} {PATHS:,} paths x {HORIZON} days: batched {batched * 1000:7.1f} ms, "
+              f"per-path loop ~{loop:6.1f} s ({loop / batched:,.0f}x)")
+
+    # Long horizon: shocks plus draw indices for every step at once would take ~560 MB
+    full_bytes = PATHS * LONG_HORIZON * 16
+    chunk_bytes = 16 * 2**20
+    start = time.perf_counter()
+    chunked = simulate_quantiles(last, LONG_HORIZON, returns, "bootstrap", paths=PATHS,
+                                 chunk_bytes=chunk_bytes, seed=1)
+    chunked_s = time.perf_counter() - start
+    whole = simulate_quantiles(last, LONG_HORIZON, returns, "bootstrap", paths=PATHS,
+                               chunk_bytes=full_bytes, seed=1)
+    print(f"bootstrap {PATHS:,} paths x {LONG_HORIZON} days in {chunk_bytes / 2**20:.0f} MB chunks: "
+          f"{chunked_s * 1000:.0f} ms (unchunked arrays ~{full_bytes / 2**20:.0f} MB); "
+          f"max difference from unchunked {np.abs(chunked / whole - 1).max():.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Time-to-first-render of main.py with and without a reachable database.
+
+Each measurement runs in a fresh interpreter so import costs are included.
+
+    python -m benchmarks.bench_startup
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+SCENARIOS = {
+    "reachable DB (SQLite)": f"sqlite:///{tempfile.mkdtemp()}/startup.db",
+    "unreachable DB": "mysql+pymysql://root@10.255.255.1/stockdb?connect_timeout=5",
+}
+
+IMPORT_UTILS = """
+import time
+start = time.perf_counter()
+import utils.auth, utils.data_handler, utils.prediction, utils.visualizations
+print(time.perf_counter() - start)
+"""
+
+FIRST_RENDER = """
+import time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+at = AppTest.from_file("main.py", default_timeout=120)
+at.run()
+assert not at.exception, at.exception
+print(time.perf_counter() - start)
+"""
+
+
+def measure(code, database_url):
+    env = dict(os.environ, DATABASE_URL=database_url, PYTHONPATH=os.getcwd())
+    result = subprocess.run([sys.executable, "-c", code], env=env,
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'scenario':>24} {'import utils (ms)':>18} {'first render (ms)':>18}")
+    for label, url in SCENARIOS.items():
+        imports = measure(IMPORT_UTILS, url)
+        render = measure(FIRST_RENDER, url)
+        print(f"{label:>24} {imports * 1e3:>18.0f} {render * 1e3:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
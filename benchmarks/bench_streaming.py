@@ -0,0 +1,79 @@
+"""Live mode cost: one shared poller for many viewers, delta vs. full chart updates.
+
+A replayed one-minute recording stands in for the upstream feed, so the
+numbers count upstream requests and measure server-side chart work only.
+
+    python -m benchmarks.bench_streaming
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.streaming import ReplayFeed, StreamHub
+from utils.visualizations import StockVisualizer
+
+BARS = 20_000
+WINDOW = 2000
+VIEWERS = 200
+TICKS = 100
+
+
+class CountingFeed(ReplayFeed):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests = 0
+
+    def poll(self, symbol, since=None):
+        self.requests += 1
+        return super().poll(symbol, since)
+
+
+def recording(bars=BARS):
+    idx = pd.date_range("2024-06-03 13:30", periods=bars, freq="min", tz="UTC")
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(bars).cumsum() * 0.05
+    return pd.DataFrame({"Open": close, "High": close + 0.05, "Low": close - 0.05,
+                         "Close": close, "Volume": rng.integers(100, 1000, bars).astype(float)},
+                        index=idx)
+
+
+def main():
+    feed = CountingFeed(recording(), bars_per_poll=1, initial_bars=WINDOW)
+    hub = StreamHub(feed, poll_interval=3600, window=WINDOW)
+
+    # Many viewers of one symbol render concurrently on every tick
+    charts = [None] * VIEWERS
+
+    def view(i):
+        series = hub.subscribe("AAPL")
+        charts[i] = StockVisualizer.update_live_chart(charts[i], series)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(view, range(VIEWERS)))
+        for _ in range(TICKS):
+            hub.poll_once()
+            list(pool.map(view, range(VIEWERS)))
+    series = hub.subscribe("AAPL")
+    print(f"{VIEWERS} viewers x {TICKS} ticks: {feed.requests} upstream requests, "
+          f"{series.version} bars seen, {len(series)} kept "
+          f"({series._bars.nbytes + series._features.nbytes + series._times.nbytes} bytes)")
+
+    chart = StockVisualizer.update_live_chart(None, series)
+    delta, full = [], []
+    for _ in range(TICKS):
+        hub.poll_once()
+        start = time.perf_counter()
+        chart = StockVisualizer.update_live_chart(chart, series)
+        delta.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        StockVisualizer.create_live_chart(series)
+        full.append(time.perf_counter() - start)
+    print(f"{'update':>8} {'median (ms)':>12}")
+    print(f"{'delta':>8} {np.median(delta) * 1e3:>12.2f}")
+    print(f"{'rebuild':>8} {np.median(full) * 1e3:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
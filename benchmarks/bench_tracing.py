@@ -0,0 +1,98 @@
+"""Tracing overhead per span (off and on) and a traced dashboard render.
+
+The render uses a stub provider with a short simulated latency, stores in
+a temporary directory and fresh caches for every symbol, so each render
+is a cold one: fetch, info, features, fit, forecast and chart.
+
+    python -m benchmarks.bench_tracing
+"""
+import os
+import tempfile
+import time
+
+from benchmarks.bench_get_many import StubProvider
+from utils.data_handler import StockDataHandler
+from utils.forecast_store import ForecastStore
+from utils.fundamentals import FundamentalsStore
+from utils.history_store import HistoryStore
+from utils.prediction import StockPredictor
+from utils.tracing import span, traced, tracer
+from utils.visualizations import StockVisualizer
+
+CALLS = 200_000
+
+
+def per_call(fn, calls=CALLS):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def noop():
+    pass
+
+
+traced_noop = traced("bench.noop")(noop)
+
+
+def with_span():
+    with span("bench.span"):
+        pass
+
+
+def render(symbol):
+    """What a dashboard rerun does for one symbol"""
+    data = StockDataHandler.get_stock_data(symbol, "1y")
+    history = data["history"]
+    predictions = StockPredictor.get_forecast(history, 182, symbol, "1y")
+    StockVisualizer.create_stock_chart(history, predictions, symbol=symbol)
+
+
+def main():
+    baseline = per_call(noop)
+    for enabled in (False, True):
+        tracer.enabled = enabled
+        print(f"tracing {'on ' if enabled else 'off'}: plain call {baseline:.0f} ns, "
+              f"traced call {per_call(traced_noop):.0f} ns, span {per_call(with_span):.0f} ns")
+    tracer.reset()
+
+    StockDataHandler.provider = StubProvider(latency=0.005)
+    store_dir = tempfile.mkdtemp()
+    StockDataHandler.history_store = HistoryStore(store_dir)
+    StockDataHandler.fundamentals_store = FundamentalsStore(store_dir)
+    StockPredictor.forecast_store = ForecastStore(os.path.join(store_dir, "forecasts"))
+
+    render("WARMUP")  # Imports and layout template
+    timings = {}
+    for enabled in (False, True):
+        tracer.enabled = enabled
+        tracer.reset()
+        symbols = [f"{'ON' if enabled else 'OFF'}{i}" for i in range(30)]
+        start = time.perf_counter()
+        for symbol in symbols:
+            render(symbol)
+        timings[enabled] = (time.perf_counter() - start) / len(symbols) * 1000
+    print(f"cold render: {timings[False]:.2f} ms untraced, {timings[True]:.2f} ms traced")
+
+    start = time.perf_counter()
+    for symbol in symbols:  # Rerun of the traced symbols, served from the caches
+        render(symbol)
+    print(f"warm render: {(time.perf_counter() - start) / len(symbols) * 1000:.2f} ms traced")
+
+    snap = tracer.snapshot()
+    print(f"\n{'stage':<24} {'count':>6} {'mean (ms)':>10} {'p95 (ms)':>9} {'total (ms)':>11}")
+    for name, stage in sorted(snap["stages"].items(), key=lambda item: -item[1]["total_ms"]):
+        print(f"{name:<24} {stage['count']:>6} {stage['mean_ms']:>10.2f} {stage['p95_ms']:>9.2f} "
+              f"{stage['total_ms']:>11.1f}")
+    print(f"\n{'cache':<16} {'hits':>6} {'misses':>7} {'hit rate':>9}")
+    for name, cache in sorted(snap["caches"].items()):
+        print(f"{name:<16} {cache['hits']:>6} {cache['misses']:>7} {cache['hit_rate']:>9.2f}")
+
+    path = os.path.join(store_dir, "metrics.prom")
+    tracer.write(path)
+    print(f"\nPrometheus export: {os.path.getsize(path)} bytes ({path})")
+
+
+if __name__ == "__main__":
+    main()
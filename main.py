@@ -1,12 +1,18 @@
 import streamlit as st
 
 # Reminder to run the app using the command: streamlit run main.py [ARGUMENTS]
-from utils.auth import create_user, get_user_by_username
+from utils.auth import authenticate, create_user
 import pandas as pd
 from utils.data_handler import StockDataHandler
 from utils.visualizations import StockVisualizer
 from utils.prediction import StockPredictor
+from utils.simulation import BAND_LABELS, SIMULATION_METHODS
+from utils.tracing import render_admin_panel
+from utils.export import DataExporter, EXPORT_FORMATS
+from utils.indicators import MODEL_INDICATORS, OVERLAYS
+from functools import partial
 import os
+import time
 
 # Page config
 st.set_page_config(
@@ -80,8 +86,8 @@ if not st.session_state.logged_in:
             submit = st.form_submit_button("Login")
 
             if submit:
-                user = get_user_by_username(username)
-                if user and user.check_password(password):
+                user = authenticate(username, password)
+                if user:
                     st.success("Login successful!")
                     st.session_state.username = username
                     login()
@@ -169,24 +175,46 @@ else:
             # Stock chart with predictions
             st.subheader("Price Chart & Predictions")
             historical_data = data["history"]
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                overlays = st.multiselect("Chart Indicators", options=list(OVERLAYS))
+            with col2:
+                model_indicators = st.multiselect("Model Indicator Features", options=MODEL_INDICATORS,
+                                                  default=[i for i in StockPredictor.default_indicators
+                                                           if i in MODEL_INDICATORS])
+            with col3:
+                # Monte Carlo 5-95% range around the forecast
+                bands = st.selectbox("Prediction Bands", options=(None,) + SIMULATION_METHODS,
+                                     format_func=lambda m: BAND_LABELS[m])
 
             # Generate predictions
             prediction_days = int(prediction_months * 30.44)  # Average days per month
-            predictions = StockPredictor.predict_future(historical_data, prediction_days)
+            predictions = StockPredictor.get_forecast(historical_data, prediction_days, symbol, period,
+                                                      indicators=model_indicators, bands=bands)
 
             # Create combined chart
-            chart = StockVisualizer.create_stock_chart(historical_data, predictions)
+            start = time.perf_counter()
+            chart = StockVisualizer.create_stock_chart(historical_data, predictions, symbol=symbol,
+                                                       overlays=overlays)
+            build_ms = (time.perf_counter() - start) * 1000
             st.plotly_chart(chart, use_container_width=True)
+            st.caption(f"Chart built in {build_ms:.1f} ms, "
+                       f"{predictions.attrs['source'] if predictions is not None else 'no'} forecast")
 
             # Download data
             st.subheader("Download Data")
-            csv = data["history"].to_csv()
+            export_format = st.radio("Format", options=list(EXPORT_FORMATS), format_func=str.upper,
+                                     horizontal=True, key="export_format")
+            # The file is only built when the button is clicked, and cached per data fingerprint
             st.download_button(
-                label="Download CSV",
-                data=csv,
-                file_name=f"{symbol}_stock_data.csv",
-                mime="text/csv"
+                label=f"Download {export_format.upper()}",
+                data=partial(DataExporter.export, historical_data, export_format, symbol),
+                file_name=DataExporter.file_name(symbol, export_format),
+                mime=DataExporter.mime(export_format)
             )
 
         else:
             st.error("Failed to fetch stock data. Please check the symbol and try again. Ensure that the stock symbol is valid and try again later.")
+
+    # Hidden performance panel (?admin=1, STOCK_ADMIN_USERS)
+    render_admin_panel(st.session_state.username)
@@ -1,10 +1,17 @@
 import streamlit as st
 import pandas as pd
 from utils.data_handler import StockDataHandler
+from utils.tracing import render_admin_panel
 from utils.visualizations import StockVisualizer
 from utils.prediction import StockPredictor
+from utils.simulation import BAND_LABELS, SIMULATION_METHODS
+from utils.export import DataExporter, EXPORT_FORMATS
+from utils.indicators import MODEL_INDICATORS, OVERLAYS
+from functools import partial
 from utils.auth import get_user_by_username
+from utils.streaming import LIVE_INTERVALS, STREAM_POLL_INTERVAL, get_hub
 import os
+import time
 
 # Check authentication
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
@@ -41,8 +48,45 @@ with col2:
 with col3:
     prediction_months = st.number_input("Prediction Period (months)", min_value=1, max_value=12, value=6)
 
+col1, col2 = st.columns([1, 3])
+with col1:
+    live_mode = st.toggle("Live intraday mode")
+with col2:
+    if live_mode:
+        live_interval = st.selectbox("Bar Size", options=list(LIVE_INTERVALS), index=0)
+
+@st.fragment(run_every=STREAM_POLL_INTERVAL)
+def live_view(symbol, interval):
+    """Reruns on its own every poll interval, touching only the live chart"""
+    # Every viewer of a symbol reads from the same series and upstream poller
+    series = get_hub(interval).subscribe(symbol)
+    if not len(series):
+        st.warning(f"No intraday data available for {symbol}")
+        return
+
+    # Only the bars this session has not seen yet are appended to its figure
+    key = f"live_chart_{symbol}_{interval}"
+    chart = StockVisualizer.update_live_chart(st.session_state.get(key), series,
+                                              title=f"{symbol} live ({interval} bars)")
+    st.session_state[key] = chart
+
+    latest = series.latest_features()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Last Price", f"${latest['Close']:.2f}")
+    with col2:
+        st.metric("SMA 20", f"{latest['SMA_20']:.2f}")
+    with col3:
+        st.metric("RSI", f"{latest['RSI']:.1f}")
+
+    st.plotly_chart(chart["figure"], use_container_width=True, key=f"{key}_plot")
+    st.caption(f"{chart['new_bars']} new bars, chart updated in {chart['build_ms']:.1f} ms")
+
 # Fetch data
-if symbol:
+if symbol and live_mode:
+    st.subheader(f"{symbol} Live")
+    live_view(symbol, live_interval)
+elif symbol:
     data = StockDataHandler.get_stock_data(symbol, period)
 
     if data and not data["history"].empty:
@@ -80,33 +124,58 @@ if symbol:
 
             # Stock chart with predictions
             st.subheader("Price Chart & Predictions")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                overlays = st.multiselect("Chart Indicators", options=list(OVERLAYS))
+            with col2:
+                model_indicators = st.multiselect("Model Indicator Features", options=MODEL_INDICATORS,
+                                                  default=[i for i in StockPredictor.default_indicators
+                                                           if i in MODEL_INDICATORS])
+            with col3:
+                # Monte Carlo 5-95% range around the forecast
+                bands = st.selectbox("Prediction Bands", options=(None,) + SIMULATION_METHODS,
+                                     format_func=lambda m: BAND_LABELS[m])
 
             # Add prediction button
             if st.button("Generate Price Predictions"):
                 with st.spinner("Generating predictions..."):
                     # Generate predictions
                     prediction_days = int(prediction_months * 30.44)  # Average days per month
-                    predictions = StockPredictor.predict_future(historical_data, prediction_days)
+                    predictions = StockPredictor.get_forecast(historical_data, prediction_days, symbol, period,
+                                                              indicators=model_indicators, bands=bands)
 
                     # Create combined chart
-                    chart = StockVisualizer.create_stock_chart(historical_data, predictions)
+                    start = time.perf_counter()
+                    chart = StockVisualizer.create_stock_chart(historical_data, predictions, symbol=symbol,
+                                                               overlays=overlays)
+                    build_ms = (time.perf_counter() - start) * 1000
                     st.plotly_chart(chart, use_container_width=True)
+                    st.caption(f"Chart built in {build_ms:.1f} ms, "
+                               f"{predictions.attrs['source'] if predictions is not None else 'no'} forecast")
             else:
                 # Show chart without predictions
-                chart = StockVisualizer.create_stock_chart(historical_data)
+                start = time.perf_counter()
+                chart = StockVisualizer.create_stock_chart(historical_data, symbol=symbol, overlays=overlays)
+                build_ms = (time.perf_counter() - start) * 1000
                 st.plotly_chart(chart, use_container_width=True)
+                st.caption(f"Chart built in {build_ms:.1f} ms")
 
             # Download data
             st.subheader("Download Data")
-            csv = data["history"].to_csv()
+            export_format = st.radio("Format", options=list(EXPORT_FORMATS), format_func=str.upper,
+                                     horizontal=True, key="export_format")
+            # The file is only built when the button is clicked, and cached per data fingerprint
             st.download_button(
-                label="Download CSV",
-                data=csv,
-                file_name=f"{symbol}_stock_data.csv",
-                mime="text/csv"
+                label=f"Download {export_format.upper()}",
+                data=partial(DataExporter.export, historical_data, export_format, symbol),
+                file_name=DataExporter.file_name(symbol, export_format),
+                mime=DataExporter.mime(export_format)
             )
 
         else:
             st.warning("Not enough historical data available for this stock.")
     else:
-        st.error("Failed to fetch stock data. Please check the symbol and try again.")
\ No newline at end of file
+        st.error("Failed to fetch stock data. Please check the symbol and try again.")
+
+# Hidden performance panel (?admin=1, STOCK_ADMIN_USERS)
+render_admin_panel(st.session_state.username)
@@ -1,5 +1,14 @@
+import pandas as pd
 import streamlit as st
-from utils.auth import get_user_by_username
+from utils.alerts import ALERT_KINDS
+from utils.auth import (
+    get_user_by_username, get_watchlist, add_to_watchlist, remove_from_watchlist,
+    get_alert_rules, add_alert_rule, delete_alert_rules,
+)
+from utils.data_handler import StockDataHandler
+from utils.tracing import render_admin_panel
+from utils.export import DataExporter, EXPORT_FORMATS
+from functools import partial
 
 # Check authentication
 if 'logged_in' not in st.session_state or not st.session_state.logged_in:
@@ -38,20 +47,96 @@ with col2:
 
 st.markdown("</div>", unsafe_allow_html=True)
 
-# Future features placeholder
-st.markdown("### 🔜 Coming Soon")
-col1, col2 = st.columns(2)
+def watchlist_bundle(symbols, period, fmt):
+    """Zip the histories of every watchlist symbol"""
+    histories, _ = StockDataHandler.get_histories(symbols, period)
+    return DataExporter.bundle(histories, fmt)
+
+# Watchlist section
+st.markdown("### ⭐ Watchlist")
+col1, col2 = st.columns([3, 1])
+with col1:
+    new_symbol = st.text_input("Add a stock symbol to your watchlist", key="watchlist_symbol")
+with col2:
+    st.write("")
+    if st.button("Add to Watchlist") and new_symbol:
+        add_to_watchlist(user.id, new_symbol)
+        st.rerun()
+
+watchlist = get_watchlist(user.id)
+if watchlist:
+    # All quotes come from one batched provider request plus the history store
+    quotes = StockDataHandler.get_quotes(watchlist)
+    st.dataframe(
+        quotes.style.format({"Price": "${:.2f}", "Change": "{:+.2f}", "Change %": "{:+.2f}%"}),
+        use_container_width=True
+    )
+    missing = [s for s in watchlist if s not in quotes.index]
+    if missing:
+        st.warning(f"No quote data for: {', '.join(missing)}")
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        bundle_period = st.selectbox("Bundle Period", options=["1mo", "3mo", "6mo", "1y", "2y", "5y"],
+                                     index=3, key="bundle_period")
+    with col2:
+        bundle_format = st.selectbox("Bundle Format", options=list(EXPORT_FORMATS),
+                                     format_func=str.upper, key="bundle_format")
+    with col3:
+        st.write("")
+        # Histories are fetched and zipped only when the button is clicked
+        st.download_button(
+            label="Download Watchlist Bundle",
+            data=partial(watchlist_bundle, tuple(watchlist), bundle_period, bundle_format),
+            file_name=f"watchlist_{bundle_period}_{bundle_format}.zip",
+            mime="application/zip"
+        )
+
+    to_remove = st.multiselect("Remove symbols", options=watchlist)
+    if st.button("Remove Selected") and to_remove:
+        remove_from_watchlist(user.id, to_remove)
+        st.rerun()
+else:
+    st.info("Your watchlist is empty. Add a symbol above to start tracking it.")
+
+# Price alerts section
+st.markdown("### 🔔 Price Alerts")
+col1, col2, col3, col4 = st.columns([2, 3, 2, 1])
 with col1:
-    st.markdown("""
-    <div class="feature-card">
-        <h4>Watchlist</h4>
-        <p>Create and manage your stock watchlist</p>
-    </div>
-    """, unsafe_allow_html=True)
+    alert_symbol = st.text_input("Symbol", key="alert_symbol")
 with col2:
-    st.markdown("""
-    <div class="feature-card">
-        <h4>Alert Settings</h4>
-        <p>Set up price alerts for your favorite stocks</p>
-    </div>
-    """, unsafe_allow_html=True)
+    alert_kind = st.selectbox("Condition", options=list(ALERT_KINDS),
+                              format_func=ALERT_KINDS.get, key="alert_kind")
+with col3:
+    alert_threshold = st.number_input("Threshold", min_value=0.0, value=0.0, key="alert_threshold")
+with col4:
+    st.write("")
+    if st.button("Create Alert") and alert_symbol:
+        if add_alert_rule(user.id, alert_symbol, alert_kind, alert_threshold):
+            st.rerun()
+
+rules = get_alert_rules(user.id)
+if rules:
+    st.dataframe(
+        pd.DataFrame([{
+            "Symbol": rule.symbol,
+            "Condition": ALERT_KINDS.get(rule.kind, rule.kind),
+            "Threshold": rule.threshold,
+            "Last Triggered": rule.last_triggered_at,
+            "Value": rule.last_triggered_value,
+        } for rule in rules]),
+        use_container_width=True,
+        hide_index=True
+    )
+
+    labels = {rule.id: f"{rule.symbol} · {ALERT_KINDS.get(rule.kind, rule.kind)} {rule.threshold:g}"
+              for rule in rules}
+    to_delete = st.multiselect("Delete alerts", options=list(labels), format_func=labels.get)
+    if st.button("Delete Selected") and to_delete:
+        delete_alert_rules(user.id, to_delete)
+        st.rerun()
+else:
+    st.info("You have no price alerts. Create one above to be notified of price moves.")
+
+# Hidden performance panel (?admin=1, STOCK_ADMIN_USERS)
+render_admin_panel(st.session_state.username)
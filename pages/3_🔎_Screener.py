@@ -0,0 +1,76 @@
+import math
+
+import streamlit as st
+from utils.screener import SNAPSHOT_COLUMNS, StockScreener
+from utils.tracing import render_admin_panel
+
+# Check authentication
+if 'logged_in' not in st.session_state or not st.session_state.logged_in:
+    st.error("Please login to access the screener")
+    st.stop()
+
+# Page config
+st.set_page_config(
+    page_title="Stock Screener",
+    page_icon="🔎",
+    layout="wide"
+)
+
+# Load custom CSS
+with open("styles/style.css") as f:
+    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+
+st.title("🔎 Stock Screener")
+st.markdown("Screen every symbol in the local history store by its latest indicator values.")
+
+col1, col2 = st.columns([2, 1])
+with col1:
+    conditions = st.text_area(
+        "Conditions (one per line)",
+        value="RSI < 30\nVolume > Volume_SMA_20",
+        help="Compare a column with a number or another column using <, <=, >, >=, == or !=",
+    )
+    st.caption("Columns: " + ", ".join(SNAPSHOT_COLUMNS))
+with col2:
+    sort_by = st.selectbox("Rank By", options=SNAPSHOT_COLUMNS, index=SNAPSHOT_COLUMNS.index("RSI"))
+    ascending = st.toggle("Ascending", value=True)
+    page_size = st.selectbox("Results Per Page", options=[25, 50, 100], index=0)
+
+# Page number is kept per query, so editing the conditions starts again at page 1
+query = (conditions, sort_by, ascending, page_size)
+if st.session_state.get("screener_query") != query:
+    st.session_state.screener_query = query
+    st.session_state.screener_page = 1
+
+try:
+    rows, total = StockScreener.screen(conditions, sort_by, ascending,
+                                       st.session_state.screener_page, page_size)
+except ValueError as e:
+    st.error(str(e))
+    rows, total = None, 0
+
+if rows is not None:
+    universe = len(StockScreener.snapshot())
+    if not universe:
+        st.warning("The history store is empty. Open symbols on the dashboard or run the "
+                   "nightly precompute job to fill it.")
+    else:
+        pages = max(math.ceil(total / page_size), 1)
+        st.markdown(f"**{total}** of {universe} symbols match")
+        st.dataframe(rows, use_container_width=True,
+                     column_config={"As_Of": st.column_config.DateColumn("As Of")})
+
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀ Previous", disabled=st.session_state.screener_page <= 1):
+                st.session_state.screener_page -= 1
+                st.rerun()
+        with col2:
+            st.caption(f"Page {st.session_state.screener_page} of {pages}")
+        with col3:
+            if st.button("Next ▶", disabled=st.session_state.screener_page >= pages):
+                st.session_state.screener_page += 1
+                st.rerun()
+
+# Hidden performance panel (?admin=1, STOCK_ADMIN_USERS)
+render_admin_panel(st.session_state.username)
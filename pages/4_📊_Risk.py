@@ -0,0 +1,87 @@
+import streamlit as st
+from utils.auth import get_user_by_username, get_watchlist
+from utils.risk import BETA_WINDOW, RISK_BENCHMARK, RISK_WINDOW, RiskAnalytics
+from utils.tracing import render_admin_panel
+from utils.visualizations import StockVisualizer
+
+# Check authentication
+if 'logged_in' not in st.session_state or not st.session_state.logged_in:
+    st.error("Please login to access risk analytics")
+    st.stop()
+
+# Page config
+st.set_page_config(
+    page_title="Portfolio Risk",
+    page_icon="📊",
+    layout="wide"
+)
+
+# Load custom CSS
+with open("styles/style.css") as f:
+    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
+
+st.title("📊 Portfolio Risk")
+
+# The basket starts from the user's watchlist
+user = get_user_by_username(st.session_state.username)
+watchlist = get_watchlist(user.id) if user else []
+default_basket = ", ".join(watchlist) if len(watchlist) >= 2 else "AAPL, MSFT, GOOGL, AMZN, NVDA"
+
+col1, col2, col3 = st.columns([3, 1, 1])
+with col1:
+    basket = st.text_area("Basket (comma separated symbols)", value=default_basket)
+with col2:
+    period = st.selectbox("Historical Data Period", options=["1y", "2y", "5y"], index=1)
+with col3:
+    benchmark = st.text_input("Benchmark", value=RISK_BENCHMARK).strip().upper()
+
+symbols = [s for s in basket.replace("\n", ",").split(",") if s.strip()]
+if len(symbols) < 2:
+    st.info("Enter at least two symbols.")
+else:
+    with st.spinner("Loading histories..."):
+        model, errors = RiskAnalytics.basket(symbols, period, benchmark or None)
+    if errors:
+        st.warning("Skipped: " + "; ".join(errors.values()))
+
+    if model is None:
+        st.error("Not enough overlapping history for this basket.")
+    else:
+        if model.excluded:
+            st.warning(f"Less than {RISK_WINDOW} days of history: {', '.join(model.excluded)}")
+        table = model.value_at_risk()
+        portfolio = table.loc["Portfolio"]
+
+        st.subheader("Equal-Weight Portfolio")
+        cols = st.columns(4)
+        with cols[0]:
+            st.metric("1-Day VaR 95%", f"{portfolio['VaR 95%']:.2f}%")
+        with cols[1]:
+            st.metric("1-Day VaR 99%", f"{portfolio['VaR 99%']:.2f}%")
+        with cols[2]:
+            st.metric("Annualized Volatility", f"{portfolio['Volatility']:.1f}%")
+        with cols[3]:
+            if "Beta" in table.columns:
+                st.metric(f"Beta vs {model.benchmark}", f"{portfolio['Beta']:.2f}")
+
+        st.subheader("Correlation")
+        st.plotly_chart(StockVisualizer.create_correlation_heatmap(model.correlation()),
+                        use_container_width=True)
+
+        betas = model.rolling_beta()
+        if len(betas):
+            st.subheader(f"Rolling {BETA_WINDOW}-Day Beta")
+            shown = st.multiselect("Symbols", options=model.symbols, default=model.symbols[:5])
+            st.plotly_chart(StockVisualizer.create_beta_chart(betas[shown], model.benchmark),
+                            use_container_width=True)
+
+        st.subheader("Risk by Symbol")
+        st.caption(f"Historical one-day VaR and expected shortfall over the last {model.window} "
+                   "trading days, in % of position value")
+        st.dataframe(table.style.format("{:.2f}"), use_container_width=True)
+
+        with st.expander("Annualized Covariance"):
+            st.dataframe(model.covariance(), use_container_width=True)
+
+# Hidden performance panel (?admin=1, STOCK_ADMIN_USERS)
+render_admin_panel(st.session_state.username)
@@ -12,7 +12,7 @@ source venv/bin/activate
 
 # Install dependencies
 echo "Installing required packages..."
-pip install streamlit pandas yfinance plotly scikit-learn flask-login sqlalchemy psycopg2-binary werkzeug
+pip install streamlit pandas pyarrow yfinance plotly scikit-learn flask-login sqlalchemy psycopg2-binary werkzeug
 
 # Create necessary directories
 echo "Creating project directories..."
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from utils.alerts import AlertScheduler, RuleBook
+
+
+def history(closes, end="2024-06-28"):
+    index = pd.bdate_range(end=end, periods=len(closes), tz="America/New_York", name="Date")
+    return pd.DataFrame({"Close": np.asarray(closes, dtype=float)}, index=index)
+
+
+def rule(rule_id, threshold=100.0, kind="price_above", last_triggered_at=None):
+    return SimpleNamespace(id=rule_id, user_id=1, symbol="X", kind=kind, threshold=threshold,
+                           last_triggered_at=last_triggered_at)
+
+
+def scheduler(rules, frames):
+    return AlertScheduler(lambda: rules(), lambda symbols, period: ({s: frames[s] for s in symbols}, {}))
+
+
+def test_crossing_fires_once_per_bar():
+    frames = {"X": history([99.0, 101.0])}
+    alerts = scheduler(lambda: [rule(1)], frames)
+
+    assert [e.rule_id for e in alerts.run_cycle()] == [1]
+    assert alerts.run_cycle() == []
+
+
+def test_restart_does_not_refire_on_persisted_bar():
+    frames = {"X": history([99.0, 101.0])}
+    # Fired on the last bar before the restart; recorded in UTC wall-clock time
+    fired_at = frames["X"].index[-1].tz_convert("UTC").tz_localize(None) + pd.Timedelta(hours=18)
+    alerts = scheduler(lambda: [rule(1, last_triggered_at=fired_at.to_pydatetime())], frames)
+    assert alerts.run_cycle() == []
+
+    frames["X"] = history([99.0, 101.0, 99.0, 102.0], end="2024-07-02")
+    assert [e.rule_id for e in alerts.run_cycle()] == [1]
+
+
+def test_rules_are_reloaded_every_pass():
+    rules = [rule(1)]
+    frames = {"X": history([99.0, 101.0])}
+    alerts = scheduler(lambda: list(rules), frames)
+    alerts.run_cycle()
+
+    rules.append(rule(2, threshold=100.5))
+    assert [e.rule_id for e in alerts.run_cycle()] == [2]
+
+
+def test_reload_keeps_fired_state():
+    previous = RuleBook([rule(1)])
+    previous.last_fired[:] = 5
+    assert RuleBook([rule(1), rule(2)], previous).last_fired.tolist() == [5, np.iinfo(np.int64).min]
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from tests.test_features import history
+from utils import backtest
+from utils.backtest import WalkForwardBacktest, walk_forward
+from utils.forecasting import WINDOW
+from utils.models import get_backend
+
+
+class SpyBackend:
+    """The linear backend, recording what every fold trains on and forecasts from"""
+
+    def __init__(self):
+        self.backend = get_backend("linear")
+        self.targets, self.windows, self.predictions = [], None, None
+
+    def fit(self, X, y):
+        self.targets.append(np.asarray(y).copy())
+        return self.backend.fit(X, y)
+
+    def forecast(self, models, closes, volumes, periods):
+        self.windows = closes.copy()
+        self.predictions = self.backend.forecast(models, closes, volumes, periods)
+        return self.predictions
+
+
+@pytest.fixture
+def spy(monkeypatch):
+    spy = SpyBackend()
+    monkeypatch.setattr(backtest, "get_backend", lambda name: spy)
+    return spy
+
+
+@pytest.fixture
+def data():
+    frame = history(bars=400, seed=3)
+    return frame["Close"].to_numpy(), frame["Volume"].to_numpy()
+
+
+@pytest.mark.parametrize("mode", ["expanding", "rolling"])
+def test_folds_only_see_bars_before_their_origin(spy, data, mode):
+    close, volume = data
+    position = {value: i for i, value in enumerate(close)}
+    walk_forward(close, volume, (1, 5), mode=mode, train_window=100, min_train=252, step=21)
+
+    origins = list(range(252, len(close) - 1, 21))
+    assert len(spy.targets) == len(origins)
+    for origin, targets, window in zip(origins, spy.targets, spy.windows):
+        bars = np.array([position[value] for value in targets])
+        # The last target is the close just before the origin, known when the fold is fitted
+        assert bars.max() == origin - 1
+        if mode == "rolling":
+            assert bars.min() == origin - 100
+        else:
+            assert bars.min() == 20  # SMA_20 is first defined on bar 19, which predicts bar 20
+        np.testing.assert_array_equal(window, close[origin - WINDOW:origin])
+
+
+def test_horizon_counts_stop_at_the_last_bar(data):
+    close, volume = data
+    abs_err, sq_err, hits, counts = walk_forward(close, volume, (1, 5, 21, 200), step=21)
+
+    origins = np.arange(252, len(close) - 1, 21)
+    expected = [(origins + h - 1 < len(close)).sum() for h in (1, 5, 21, 200)]
+    np.testing.assert_array_equal(counts, expected)
+    assert counts[-1] == 0 and abs_err[-1] == 0
+    assert (hits[:-1] <= counts[:-1]).all()
+
+
+def test_bars_from_the_origin_on_do_not_change_a_fold(spy, data):
+    close, volume = data
+    walk_forward(close, volume, (1, 21), step=21)
+    predictions = spy.predictions
+
+    for k, origin in enumerate(range(252, len(close) - 1, 21)):
+        later = close.copy()
+        later[origin:] *= 3
+        walk_forward(later, volume, (1, 21), step=21)
+        np.testing.assert_array_equal(spy.predictions[k], predictions[k])
+
+
+def test_process_pool_matches_serial_run():
+    histories = {f"S{seed}": history(bars=320, seed=seed) for seed in range(3)}
+    serial = WalkForwardBacktest(horizons=(1, 5), step=10, workers=1).run(histories)
+    pooled = WalkForwardBacktest(horizons=(1, 5), step=10, workers=2).run(histories)
+
+    assert list(serial.index.get_level_values("symbol").unique()) == ["S0", "S1", "S2"]
+    np.testing.assert_allclose(pooled.to_numpy(), serial.to_numpy(), rtol=1e-12)
@@ -0,0 +1,43 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.compact_history import CompactHistory
+
+
+@pytest.fixture
+def history():
+    index = pd.bdate_range(end="2024-06-28", periods=50, tz="America/New_York", name="Date")
+    close = np.linspace(100, 120, 50)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": np.arange(50) * 1000.0, "Dividends": 0.0}, index=index)
+
+
+def test_frame_round_trips_ohlcv(history):
+    frame = CompactHistory.from_frame(history).frame()
+    assert list(frame.columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert frame.index.equals(history.index)
+    np.testing.assert_allclose(frame["Close"], history["Close"], rtol=1e-6)
+
+
+def test_callers_do_not_see_each_others_edits(history):
+    compact = CompactHistory.from_frame(history)
+    first = compact.frame()
+    first["SMA"] = first["Close"].rolling(5).mean()
+    first["Close"] = 0.0
+    try:
+        first.loc[first.index[0], "Open"] = -1.0
+    except ValueError:
+        pass  # Writing into the read-only buffer may raise instead of copying
+
+    second = compact.frame()
+    assert "SMA" not in second.columns
+    assert second["Close"].iloc[0] == pytest.approx(100.0)
+    assert second["Open"].iloc[0] == pytest.approx(100.0)
+
+
+def test_pickle_round_trip(history):
+    compact = pickle.loads(pickle.dumps(CompactHistory.from_frame(history)))
+    pd.testing.assert_frame_equal(compact.frame(), CompactHistory.from_frame(history).frame())
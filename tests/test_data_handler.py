@@ -0,0 +1,104 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_handler import StockDataHandler
+from utils.fundamentals import FundamentalsStore
+from utils.history_store import HistoryStore
+
+
+def bars(symbol, periods=60):
+    index = pd.bdate_range(end=pd.Timestamp.now(tz="America/New_York").normalize(),
+                           periods=periods, name="Date")
+    close = 100 + np.arange(periods, dtype=float) + len(symbol)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": 1e6, "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+
+
+class FakeProvider:
+    """Bulk downloads that leave out unknown symbols, like Yahoo Finance does"""
+
+    def __init__(self, empty=(), unknown=(), info_errors=(), download_error=None):
+        self.empty, self.unknown, self.info_errors = set(empty), set(unknown), set(info_errors)
+        self.download_error = download_error
+        self.downloads, self.histories = [], []
+        self._lock = threading.Lock()
+
+    def _frame(self, symbol):
+        return bars(symbol).iloc[:0] if symbol in self.empty else bars(symbol)
+
+    def download(self, symbols, period=None, start=None):
+        self.downloads.append(list(symbols))
+        if self.download_error is not None:
+            raise self.download_error
+        return {s: self._frame(s) for s in symbols if s not in self.unknown}
+
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        self.histories.append(symbol)
+        return self._frame(symbol)
+
+    def info(self, symbol):
+        with self._lock:
+            if symbol in self.info_errors:
+                raise ConnectionError("info unavailable")
+            return {"longName": f"{symbol} Inc.", "sector": "Technology"}
+
+
+@pytest.fixture
+def provider(tmp_path, monkeypatch):
+    monkeypatch.setattr(StockDataHandler, "history_store", HistoryStore(tmp_path / "history"))
+    monkeypatch.setattr(StockDataHandler, "fundamentals_store", FundamentalsStore(tmp_path / "info"))
+
+    def install(**kwargs):
+        fake = FakeProvider(**kwargs)
+        monkeypatch.setattr(StockDataHandler, "provider", fake)
+        return fake
+    return install
+
+
+def test_get_histories_downloads_in_bulk(provider):
+    fake = provider()
+    histories, errors = StockDataHandler.get_histories(["aapl", " MSFT", "AAPL", ""], "1mo")
+
+    assert list(histories) == ["AAPL", "MSFT"]
+    assert not errors
+    assert fake.downloads == [["AAPL", "MSFT"]]
+    assert fake.histories == []
+    assert histories["MSFT"].index[-1] == bars("MSFT").index[-1]
+
+    StockDataHandler.get_histories(["AAPL", "MSFT"], "1mo")
+    assert len(fake.downloads) == 1  # Served from the store
+
+
+def test_get_histories_reports_each_bad_symbol(provider):
+    provider(empty={"EMPTY"}, unknown={"NOPE"})
+    histories, errors = StockDataHandler.get_histories(["AAPL", "NOPE", "EMPTY", "../etc"], "1mo")
+
+    assert list(histories) == ["AAPL"]
+    assert set(errors) == {"NOPE", "EMPTY", "../ETC"}
+    assert errors["NOPE"] == "No data available for NOPE"
+    assert errors["EMPTY"] == "No data available for EMPTY"
+    assert "Invalid symbol" in errors["../ETC"]
+
+
+def test_failed_bulk_download_is_an_error_per_symbol(provider):
+    provider(download_error=ConnectionError("upstream down"))
+    histories, errors = StockDataHandler.get_histories(["AAPL", "MSFT"], "1mo")
+
+    assert not histories
+    assert errors == {s: f"Error fetching data for {s}: upstream down" for s in ("AAPL", "MSFT")}
+
+
+def test_get_many_pairs_history_with_info(provider):
+    provider(unknown={"NOPE"}, info_errors={"MSFT"})
+    results, errors = StockDataHandler.get_many(["AAPL", "MSFT", "NOPE"], "1y")
+
+    assert list(results) == ["AAPL", "MSFT"]
+    assert list(errors) == ["NOPE"]
+    assert results["AAPL"]["info"]["longName"] == "AAPL Inc."
+    pd.testing.assert_frame_equal(results["AAPL"]["history"], bars("AAPL"), check_freq=False)
+    # A failed info request still returns the history, with empty info
+    assert results["MSFT"]["info"] == {}
+    assert len(results["MSFT"]["history"]) == 60
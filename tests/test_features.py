@@ -0,0 +1,111 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.features import FeatureEngine, compute_features
+from utils.prediction import StockPredictor
+
+FEATURES = ['Close', 'Volume', 'SMA_5', 'SMA_20', 'RSI', 'Volatility']
+
+
+def bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2024-06-28", periods=n)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return index, close, rng.integers(100_000, 5_000_000, n).astype(float)
+
+
+def history(bars=300, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2024-06-28", periods=bars, name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                         "Volume": rng.integers(100_000, 5_000_000, bars).astype(float)}, index=index)
+
+
+def pandas_features(close, volume):
+    """The feature frame of the original pandas prepare_data"""
+    df = pd.DataFrame({"Close": close, "Volume": volume})
+    df['SMA_5'] = df['Close'].rolling(window=5).mean()
+    df['SMA_20'] = df['Close'].rolling(window=20).mean()
+    delta = df['Close'].diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    df['RSI'] = 100 - (100 / (1 + gain / loss))
+    df['Volatility'] = df['Close'].pct_change().rolling(window=5).std()
+    return df[FEATURES]
+
+
+def pandas_prepare(data):
+    """The original pandas prepare_data: features and next-day targets"""
+    df = data.dropna().copy()
+    df['Target'] = df['Close'].shift(-1)
+    df = df.dropna()
+    df = pd.concat([pandas_features(df['Close'], df['Volume']), df['Target']], axis=1).dropna()
+    return df[FEATURES].to_numpy(), df['Target'].to_numpy()
+
+
+@pytest.mark.parametrize("symbol", [None, "PARITY"])
+def test_prepare_data_matches_pandas(symbol):
+    data = history()
+    X, y = StockPredictor.prepare_data(data, symbol)
+    X_ref, y_ref = pandas_prepare(data)
+
+    assert X.shape == X_ref.shape
+    np.testing.assert_allclose(X, X_ref, rtol=1e-10, atol=1e-10)
+    np.testing.assert_array_equal(y, y_ref)
+
+
+def test_prepare_data_incremental_matches_full():
+    data = history(seed=1)
+    StockPredictor.prepare_data(data.iloc[:-5], "INCREMENTAL")
+    X, _ = StockPredictor.prepare_data(data, "INCREMENTAL")
+    X_ref, _ = pandas_prepare(data)
+    np.testing.assert_allclose(X, X_ref, rtol=1e-10, atol=1e-10)
+
+
+def test_concurrent_extensions_match_batch_features():
+    index, close, volume = bars(400)
+    engine = FeatureEngine()
+    engine.features("X", index[:300], close[:300], volume[:300])
+
+    barrier = threading.Barrier(8)
+    results = []
+
+    def extend(n):
+        barrier.wait()
+        results.append((n, engine.features("X", index[:n], close[:n], volume[:n]).copy()))
+
+    threads = [threading.Thread(target=extend, args=(n,)) for n in (310, 310, 320, 320, 350, 350, 400, 400)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected = compute_features(close, volume)
+    for n, rows in results:
+        np.testing.assert_allclose(rows, expected[:n], rtol=1e-9, equal_nan=True)
+    later = engine.features("X", index, close, volume)
+    np.testing.assert_allclose(later, expected, rtol=1e-9, equal_nan=True)
+
+
+def test_periods_are_cached_separately():
+    index, close, volume = bars(400, seed=1)
+    engine = FeatureEngine()
+    engine.features("X", index, close, volume, "2y")
+    engine.features("X", index[-250:], close[-250:], volume[-250:], "1y")
+
+    assert set(engine._entries) == {("X", "2y"), ("X", "1y")}
+    assert engine._entries[("X", "2y")]["n"] == 400
+
+
+def test_entries_are_bounded():
+    index, close, volume = bars(60, seed=2)
+    engine = FeatureEngine(max_entries=2)
+    for symbol in ("A", "B", "C"):
+        engine.features(symbol, index, close, volume)
+
+    assert list(engine._entries) == [("B", None), ("C", None)]
+    assert set(engine._locks) == {("B", None), ("C", None)}
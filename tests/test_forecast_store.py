@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.test_features import history
+from utils.forecast_store import ForecastStore
+from utils.prediction import StockPredictor
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ForecastStore(tmp_path)
+    monkeypatch.setattr(StockPredictor, "forecast_store", store)
+    monkeypatch.setattr(StockPredictor, "default_backend", "linear")
+    return store
+
+
+def test_round_trip(store):
+    as_of = pd.Timestamp("2024-06-28", tz="America/New_York")
+    store.save("1y", "linear", {"AAA": (as_of, np.arange(5.0))})
+
+    entry = store.get("AAA", "1y", "linear", as_of=as_of)
+    assert entry["as_of"] == as_of
+    np.testing.assert_array_equal(entry["values"], np.arange(5.0))
+    assert store.get("AAA", "1y", "ridge") is None
+    assert store.get("BBB", "1y") is None
+    assert store.get("AAA", "2y") is None
+
+
+def test_old_or_stale_forecasts_are_not_served(store):
+    as_of = pd.Timestamp("2024-06-28")
+    store.save("1y", "linear", {"AAA": (as_of, np.arange(5.0))})
+
+    assert store.get("AAA", "1y", as_of=as_of + pd.Timedelta(days=1)) is None
+    assert store.get("AAA", "1y", max_age=-1) is None
+
+
+def test_get_forecast_reads_the_store_for_the_same_bar(store):
+    data = history()
+    values = np.linspace(1, 2, 400)
+    store.save("1y", "linear", {"AAA": (data.index[-1], values)})
+
+    forecast = StockPredictor.get_forecast(data, 30, "AAA", "1y")
+    assert forecast.attrs["source"] == "precomputed"
+    np.testing.assert_allclose(forecast.to_numpy(), values[:30], rtol=1e-6)
+    assert forecast.index[0] == data.index[-1] + pd.Timedelta(days=1)
+
+    banded = StockPredictor.get_forecast(data, 30, "AAA", "1y", bands="bootstrap")
+    assert banded.attrs["source"] == "precomputed"
+    np.testing.assert_allclose(banded["Predicted"].to_numpy(), values[:30], rtol=1e-6)
+
+
+def test_get_forecast_falls_back_when_history_has_a_newer_bar(store):
+    data = history()
+    store.save("1y", "linear", {"AAA": (data.index[-2], np.linspace(1, 2, 400))})
+
+    forecast = StockPredictor.get_forecast(data, 30, "AAA", "1y")
+    assert forecast.attrs["source"] == "live"
+    assert forecast.index[0] > data.index[-1]
+    assert forecast.iloc[0] > 10  # The model's forecast, not the stored values
@@ -0,0 +1,48 @@
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+from tests.test_features import history, pandas_features, pandas_prepare
+from utils.forecasting import WINDOW, RecursiveForecaster
+from utils.models import get_backend
+
+
+def pandas_forecast(model, close, volume, periods):
+    """Reference recursion: rebuild the pandas features after every prediction"""
+    closes = list(close[-WINDOW:])
+    volumes = list(volume[-WINDOW:])
+    expected_volume = np.mean(volume[-20:])
+    out = []
+    for _ in range(periods):
+        row = pandas_features(np.array(closes), np.array(volumes)).iloc[-1].to_numpy()
+        if np.isnan(row[4]):
+            row[4] = 50.0
+        prediction = model.predict(row[None, :])[0]
+        out.append(prediction)
+        closes.append(prediction)
+        volumes.append(expected_volume)
+    return np.array(out)
+
+
+def test_recursive_forecast_matches_pandas_recursion():
+    data = history(seed=2)
+    X, y = pandas_prepare(data)
+    model = LinearRegression().fit(X, y)
+    close, volume = data['Close'].to_numpy(), data['Volume'].to_numpy()
+
+    expected = pandas_forecast(model, close, volume, 60)
+    forecast = RecursiveForecaster.from_models([model]).forecast(close[None, -WINDOW:],
+                                                                 volume[None, -WINDOW:], 60)[0]
+    np.testing.assert_allclose(forecast, expected, rtol=1e-9)
+
+
+def test_batched_forecast_matches_single_symbols():
+    backend = get_backend("linear")
+    datas = [history(seed=s) for s in range(3)]
+    models = [backend.fit(*pandas_prepare(d)) for d in datas]
+    closes = np.stack([d['Close'].to_numpy()[-WINDOW:] for d in datas])
+    volumes = np.stack([d['Volume'].to_numpy()[-WINDOW:] for d in datas])
+
+    batched = backend.forecast(models, closes, volumes, 365)
+    for i in range(3):
+        single = backend.forecast([models[i]], closes[i:i + 1], volumes[i:i + 1], 365)[0]
+        np.testing.assert_allclose(batched[i], single, rtol=1e-10, atol=1e-9)
@@ -0,0 +1,194 @@
+import json
+
+import pandas as pd
+import pytest
+
+from utils.history_store import HistoryStore, period_start
+
+
+def bars(end, periods, close=100.0, tz="America/New_York"):
+    index = pd.bdate_range(end=end, periods=periods, tz=tz, name="Date")
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": 1e6, "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+
+
+class Provider:
+    """Serves slices of a fixed history and records every call"""
+
+    def __init__(self, history):
+        self.history = history
+        self.calls = []
+
+    def __call__(self, symbol, period=None, start=None):
+        self.calls.append({"period": period, "start": start})
+        if start is not None:
+            return self.history[self.history.index >= pd.Timestamp(start, tz=self.history.index.tz)]
+        return self.history
+
+
+def expire(store, symbol):
+    """Make the stored bars old enough for the next read to refresh the tail"""
+    meta = store.load_meta(symbol)
+    meta["fetched_at"] = 0
+    with open(store._meta_path(symbol), "w") as f:
+        json.dump(meta, f)
+
+
+@pytest.fixture
+def today():
+    return pd.Timestamp.now().normalize()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(tmp_path)
+
+
+def test_covers_with_tz_naive_metadata(store):
+    start = pd.Timestamp("2024-01-02", tz="America/New_York")
+    assert store.covers({"covered_from": "2024-01-01T00:00:00"}, start)
+    assert not store.covers({"covered_from": "2024-01-03T00:00:00"}, start)
+
+
+def test_covers_without_record_or_with_max(store):
+    start = pd.Timestamp("2024-01-02", tz="UTC")
+    assert not store.covers({}, start)
+    assert store.covers({"covered_from": None}, start)
+    assert not store.covers({"covered_from": "2024-01-01T00:00:00"}, None)
+
+
+def test_fresh_history_is_served_from_disk(store, today):
+    provider = Provider(bars(today, 60))
+    first = store.get_history("X", "1mo", provider)
+    second = store.get_history("X", "1mo", provider)
+
+    assert len(provider.calls) == 1
+    pd.testing.assert_frame_equal(first, second, check_freq=False)
+    assert store.pending_fetch("X", "1mo") is None
+    assert store.pending_fetch("X", "1y") == {"period": "1y"}
+
+
+def test_stale_history_fetches_and_merges_tail(store, today):
+    full = bars(today, 60)
+    full.iloc[-3:, :4] = [[101.0, 102.0, 100.0, 101.0]] * 3
+    provider = Provider(full.iloc[:-2])
+    store.get_history("X", "1mo", provider)
+
+    expire(store, "X")
+    provider.history = full
+    history = store.get_history("X", "1mo", provider)
+
+    assert provider.calls[-1] == {"period": None, "start": full.index[-3].strftime("%Y-%m-%d")}
+    assert history.index[-1] == full.index[-1]
+    assert store.load("X").index.equals(full.index)
+    assert not store.load("X").index.duplicated().any()
+
+
+def test_offline_store_serves_without_fetching(tmp_path, today):
+    HistoryStore(tmp_path).get_history("X", "1mo", Provider(bars(today, 60)))
+
+    offline = HistoryStore(tmp_path, offline=True)
+    expire(offline, "X")
+
+    def unreachable(symbol, period=None, start=None):
+        raise AssertionError("offline store must not fetch")
+
+    assert len(offline.get_history("X", "1mo", unreachable)) > 0
+    assert offline.get_history("Y", "1mo", unreachable) is None
+    assert offline.pending_fetch("X", "1mo") is None
+
+
+def test_provider_error_serves_stored_bars(store, today):
+    store.get_history("X", "1mo", Provider(bars(today, 60)))
+
+    def failing(symbol, period=None, start=None):
+        raise ConnectionError("upstream down")
+
+    assert len(store.get_history("X", "1y", failing)) > 0
+    with pytest.raises(ConnectionError):
+        store.get_history("Y", "1mo", failing)
+
+
+def test_split_in_tail_redownloads_adjusted_history(store, today):
+    raw = bars(today, 60)
+    provider = Provider(raw.iloc[:-2])
+    store.get_history("X", "3mo", provider)
+
+    # Upstream re-adjusts every bar for a 2:1 split on the second to last day
+    adjusted = raw.copy()
+    adjusted.iloc[:, :4] /= 2
+    adjusted.iloc[-2, adjusted.columns.get_loc("Stock Splits")] = 2.0
+    provider.history = adjusted
+    expire(store, "X")
+    history = store.get_history("X", "3mo", provider)
+
+    assert provider.calls[-1]["start"] == pd.Timestamp(store.load_meta("X")["covered_from"]).strftime("%Y-%m-%d")
+    assert (history["Close"] == 50.0).all()
+    assert (store.load("X")["Close"] == 50.0).all()
+
+
+def test_dividend_adjusted_overlap_redownloads(store, today):
+    raw = bars(today, 60)
+    provider = Provider(raw.iloc[:-2])
+    store.get_history("X", "3mo", provider)
+
+    # The dividend bar itself is not in the tail, but the overlapping bar moved
+    adjusted = raw.copy()
+    adjusted.iloc[:, :4] *= 0.99
+    provider.history = adjusted
+    expire(store, "X")
+    history = store.get_history("X", "3mo", provider)
+
+    assert len(provider.calls) == 3
+    assert (history["Close"] == 99.0).all()
+
+
+def test_unchanged_overlap_only_merges_tail(store, today):
+    raw = bars(today, 60)
+    provider = Provider(raw.iloc[:-2])
+    store.get_history("X", "3mo", provider)
+
+    # The last stored bar's Close moved intraday; that is not an adjustment
+    provider.history = raw.copy()
+    provider.history.iloc[-3, provider.history.columns.get_loc("Close")] = 103.0
+    expire(store, "X")
+    history = store.get_history("X", "3mo", provider)
+
+    assert len(provider.calls) == 2
+    assert history["Close"].iloc[-3] == 103.0
+
+
+def test_period_start_maps_ytd_and_rejects_unknown_periods():
+    now = pd.Timestamp("2024-06-14 15:30", tz="America/New_York")
+    assert period_start("ytd", now) == pd.Timestamp("2024-01-01", tz="America/New_York")
+    assert period_start("max", now) is None
+    for period in ("1yr", "", None):
+        with pytest.raises(ValueError):
+            period_start(period, now)
+
+
+def test_ytd_is_not_stored_as_max(store, today):
+    store.get_history("X", "ytd", Provider(bars(today, 300)))
+    assert store.load_meta("X")["covered_from"] is not None
+    assert store.pending_fetch("X", "2y") == {"period": "2y"}
+
+
+@pytest.mark.parametrize("symbol", ["../X", "a/b", "..", "", "X" * 21, None])
+def test_symbols_that_are_not_tickers_are_rejected(store, today, symbol):
+    with pytest.raises(ValueError):
+        store.get_history(symbol, "1mo", Provider(bars(today, 60)))
+    assert not store.root.exists() or not any(store.root.iterdir())
+
+
+def test_empty_tail_only_touches_metadata(store, today):
+    provider = Provider(bars(today, 60))
+    store.get_history("X", "1mo", provider)
+    mtime = store._history_path("X").stat().st_mtime_ns
+
+    expire(store, "X")
+    provider.history = provider.history.iloc[:0]
+    store.get_history("X", "1mo", provider)
+
+    assert store._history_path("X").stat().st_mtime_ns == mtime
+    assert store.load_meta("X")["fetched_at"] > 0
+    assert store.pending_fetch("X", "1mo") is None
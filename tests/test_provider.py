@@ -0,0 +1,52 @@
+import sys
+import threading
+
+import pytest
+
+from utils.provider import ProviderClient
+
+
+class CountingProvider:
+    def __init__(self, failures=0):
+        self.failures = failures
+
+    def info(self, symbol):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("429 Too Many Requests")
+        return {"symbol": symbol}
+
+
+@pytest.fixture
+def switch_often():
+    # Switch threads every few bytecodes, so unlocked read-modify-writes interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+def test_counters_are_exact_under_concurrent_calls(switch_often):
+    client = ProviderClient(CountingProvider(), rate=1e9, burst=10**6)
+    barrier = threading.Barrier(8)
+
+    def calls(worker):
+        barrier.wait()
+        for i in range(500):
+            client.info(f"S{worker}-{i}")
+
+    threads = [threading.Thread(target=calls, args=(w,)) for w in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.stats()["upstream_calls"] == 4000
+
+
+def test_throttled_calls_are_retried_and_counted():
+    client = ProviderClient(CountingProvider(failures=2), rate=1e9, burst=10, backoff=0)
+
+    assert client.info("AAPL") == {"symbol": "AAPL"}
+    stats = client.stats()
+    assert stats["retries"] == 2 and stats["upstream_calls"] == 3
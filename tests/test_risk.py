@@ -0,0 +1,74 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.risk import BasketRisk
+
+
+@pytest.fixture
+def closes():
+    rng = np.random.default_rng(7)
+    index = pd.bdate_range(end="2024-06-28", periods=320, tz="America/New_York", name="Date")
+    market = rng.normal(0, 0.01, len(index))
+    columns = {"SPY": 100 * np.cumprod(1 + market)}
+    for i in range(4):
+        columns[f"S{i}"] = 50 * np.cumprod(1 + (i + 1) * 0.4 * market + rng.normal(0, 0.015, len(index)))
+    return pd.DataFrame(columns, index=index)
+
+
+def test_concurrent_updates_push_each_day_once(closes):
+    model = BasketRisk(closes.iloc[:-5], "SPY", window=100)
+    push = model.moments.push
+
+    def slow_push(row):
+        time.sleep(0.002)  # Lets the other threads run while a day is pushed
+        push(row)
+
+    model.moments.push = slow_push
+    barrier = threading.Barrier(8)
+
+    def update():
+        barrier.wait()
+        assert model.update(closes)
+
+    threads = [threading.Thread(target=update) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    rebuilt = BasketRisk(closes, "SPY", window=100)
+    assert model.dates.equals(rebuilt.dates)
+    assert len(model.market) == len(rebuilt.market)
+    np.testing.assert_allclose(model.covariance(), rebuilt.covariance(), rtol=1e-5)
+
+
+def test_rolling_moments_match_pandas_rolling(closes):
+    returns = closes.pct_change().iloc[1:].astype(np.float32)
+    window = 60
+    model = BasketRisk(closes.iloc[:window + 1], window=window)
+    # Push well past one window, so the periodic rebuild of the sums is covered
+    for day in range(window + 1, len(closes)):
+        assert model.update(closes.iloc[:day + 1])
+        expected = returns.iloc[day - window:day].astype(float)
+        np.testing.assert_allclose(model.covariance(annualize=False), expected.cov(), rtol=1e-4, atol=1e-9)
+
+    # The last day's block of pandas' rolling covariance and correlation
+    rolling = returns.astype(float).rolling(window)
+    last = returns.index[-1]
+    np.testing.assert_allclose(model.covariance(annualize=False), rolling.cov().loc[last], rtol=1e-4, atol=1e-9)
+    np.testing.assert_allclose(model.correlation(), rolling.corr().loc[last], rtol=1e-4)
+    np.testing.assert_array_equal(model.moments.ordered(), returns.iloc[-window:].to_numpy())
+
+
+def test_update_rejects_revised_history(closes):
+    model = BasketRisk(closes.iloc[:-3], "SPY", window=100)
+    revised = closes.copy()
+    revised.iloc[-4, 1] *= 0.5  # A past price changed, e.g. adjusted for a split
+
+    assert not model.update(revised)
+    assert not model.update(closes.drop(columns="S3"))
+    assert model.update(closes)
@@ -0,0 +1,162 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from utils.shared_cache import (RELEASE_LOCK_SCRIPT, ArrowFileCacheBackend, MemoryCacheBackend,
+                                RedisCacheBackend, SQLiteCacheBackend, cache_backend_from_env)
+
+
+class FakeRedis:
+    """The few Redis calls the lock uses; expiry is driven by the test"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        with self.lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def eval(self, script, numkeys, key, token):
+        assert script == RELEASE_LOCK_SCRIPT and numkeys == 1
+        with self.lock:
+            if self.data.get(key) == token:
+                del self.data[key]
+                return 1
+            return 0
+
+
+@pytest.fixture
+def backend():
+    return RedisCacheBackend(client=FakeRedis(), lock_timeout=0.2)
+
+
+def test_lock_is_released_by_its_holder(backend):
+    with backend.lock("k"):
+        assert backend.client.get("lock:k") is not None
+    assert backend.client.get("lock:k") is None
+
+
+def test_timed_out_waiter_leaves_other_lock_alone(backend):
+    backend.client.set("lock:k", b"other", nx=True)
+    with backend.lock("k"):
+        pass
+    assert backend.client.get("lock:k") == b"other"
+
+
+def test_expired_lock_retaken_by_another_holder_is_kept(backend):
+    with backend.lock("k"):
+        # Our lock expired and another process took it
+        backend.client.data["lock:k"] = b"other"
+    assert backend.client.get("lock:k") == b"other"
+
+
+def stale_backend():
+    backend = MemoryCacheBackend(stale_ttl=60)
+    backend.set("k", "old", ttl=-1)  # Expired but still within the stale window
+    return backend
+
+
+def wait_for_refresh(backend):
+    for thread in threading.enumerate():
+        if thread.name == "cache-refresh":
+            thread.join(timeout=5)
+
+
+def test_stale_read_refreshes_with_the_refresh_loader():
+    backend = stale_backend()
+    value = backend.get_or_compute("k", 60, lambda: pytest.fail("compute must not run"),
+                                   refresh=lambda: "new")
+    wait_for_refresh(backend)
+
+    assert value == "old"
+    assert backend.get("k") == "new"
+    assert backend.metrics["refresh_failures"] == 0
+
+
+def test_failed_background_refresh_is_counted():
+    backend = stale_backend()
+
+    def failing():
+        raise ConnectionError("upstream down")
+
+    assert backend.get_or_compute("k", 60, failing) == "old"
+    wait_for_refresh(backend)
+    assert backend.get_or_compute("k", 60, lambda: None) == "old"
+    wait_for_refresh(backend)
+
+    stats = backend.stats()
+    assert stats["background_refreshes"] == 2
+    assert stats["refresh_failures"] == 2
+    assert stats["last_refresh_error"] == "No data returned for k"
+
+
+def test_hit_counts_are_exact_under_concurrent_reads():
+    backend = MemoryCacheBackend()
+    backend.set("k", "v", ttl=60)
+    barrier = threading.Barrier(8)
+
+    def read():
+        barrier.wait()
+        for _ in range(500):
+            backend.get_or_compute("k", 60, lambda: pytest.fail("compute must not run"))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.stats()["hits"] == 4000
+
+
+def entry():
+    index = pd.bdate_range(end="2024-06-28", periods=5, name="Date")
+    return {"history": pd.DataFrame({"Close": [1.0, 2.0, 3.0, 4.0, 5.0]}, index=index), "info": {}}
+
+
+def test_backend_url_options(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("STOCK_CACHE_BACKEND", "arrow:///cache?zero_copy=1")
+    arrow = cache_backend_from_env()
+    assert isinstance(arrow, ArrowFileCacheBackend) and arrow.zero_copy
+    assert str(arrow.root) == "cache"
+
+    arrow.set("k", entry(), ttl=60)
+    assert isinstance(arrow.get("k")["history"]["Close"].dtype, pd.ArrowDtype)
+
+    monkeypatch.setenv("STOCK_CACHE_BACKEND", "arrow:///cache")
+    assert not cache_backend_from_env().zero_copy
+
+    monkeypatch.setenv("STOCK_CACHE_BACKEND", "sqlite:///cache.db?prune_interval=5")
+    sqlite = cache_backend_from_env()
+    assert isinstance(sqlite, SQLiteCacheBackend)
+    assert sqlite.path.name == "cache.db" and sqlite.prune_interval == 5
+
+
+def test_sqlite_prunes_expired_rows(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.db", stale_ttl=0, prune_interval=0)
+    backend.set("old", entry(), ttl=-1)
+    backend.set("new", entry(), ttl=60)  # This write prunes "old"
+
+    keys = [row[0] for row in backend._connect().execute("SELECT key FROM cache")]
+    assert keys == ["new"]
+    assert backend.get("new") is not None
+
+
+def test_sqlite_keeps_stale_rows_until_they_expire(tmp_path):
+    backend = SQLiteCacheBackend(tmp_path / "cache.db", stale_ttl=60, prune_interval=3600)
+    backend.set("stale", entry(), ttl=-1)
+
+    assert backend.prune() == 0
+    assert backend.get_item("stale") is not None
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.test_features import history
+from utils.prediction import StockPredictor
+from utils.simulation import daily_log_returns, simulate_quantiles
+
+
+@pytest.fixture
+def returns():
+    return daily_log_returns(history(seed=4)["Close"].to_numpy())
+
+
+@pytest.mark.parametrize("method", ["bootstrap", "gbm"])
+def test_chunked_simulation_matches_unchunked(returns, method):
+    paths, periods = 2000, 50
+    whole = simulate_quantiles(100.0, periods, returns, method, paths=paths, seed=3,
+                               chunk_bytes=paths * periods * 16)
+    # Blocks of 7 steps, the last one shorter
+    chunked = simulate_quantiles(100.0, periods, returns, method, paths=paths, seed=3,
+                                 chunk_bytes=paths * 7 * 16)
+    np.testing.assert_allclose(chunked, whole, rtol=1e-12)
+
+
+@pytest.mark.parametrize("method", ["bootstrap", "gbm"])
+def test_quantiles_are_ordered_and_widen(returns, method):
+    bands = simulate_quantiles(100.0, 120, returns, method, paths=5000, seed=0)
+
+    assert bands.shape == (3, 120)
+    assert (bands[0] <= bands[1]).all() and (bands[1] <= bands[2]).all()
+    width = bands[2] / bands[0]
+    assert width[-1] > width[9] > width[0] > 1
+
+
+@pytest.mark.parametrize("method", ["bootstrap", "gbm"])
+def test_median_follows_the_center(returns, method):
+    center = np.linspace(100.0, 130.0, 60)
+    bands = simulate_quantiles(100.0, 60, returns, method, center=center, paths=20000, seed=1)
+    np.testing.assert_allclose(bands[1], center, rtol=0.02)
+
+
+def test_gbm_without_center_applies_the_drift():
+    returns = np.random.default_rng(2).normal(0.002, 0.01, 252)
+    bands = simulate_quantiles(100.0, 250, returns, "gbm", paths=20000, seed=1)
+    np.testing.assert_allclose(bands[1, -1], 100.0 * np.exp(250 * returns.mean()), rtol=0.02)
+
+
+def test_invalid_inputs_raise(returns):
+    with pytest.raises(ValueError):
+        simulate_quantiles(100.0, 10, returns, "heston")
+    with pytest.raises(ValueError):
+        simulate_quantiles(100.0, 10, returns[:1])
+
+
+def test_forecast_bands_frame():
+    data = history(seed=5)
+    predictions = pd.Series(np.linspace(data["Close"].iloc[-1], 120.0, 30),
+                            index=StockPredictor.future_dates(data, 30))
+    frame = StockPredictor.with_bands(data, predictions, "bootstrap")
+
+    assert list(frame.columns) == ["Predicted", "P5", "P50", "P95"]
+    assert frame.index.equals(predictions.index)
+    pd.testing.assert_frame_equal(frame, StockPredictor.with_bands(data, predictions, "bootstrap"))
+    assert StockPredictor.with_bands(data, predictions, None) is predictions
@@ -0,0 +1,34 @@
+import threading
+
+from tests.test_visualizations import recording
+from utils.streaming import ReplayFeed, StreamHub
+
+
+class FlakyFeed(ReplayFeed):
+    """Fails every poll after the first one for a symbol"""
+
+    def poll(self, symbol, since=None):
+        if since is not None:
+            raise ConnectionError("feed down")
+        return super().poll(symbol, since)
+
+
+def test_counters_cover_session_loads_and_poller_errors():
+    hub = StreamHub(FlakyFeed(recording(), initial_bars=30), poll_interval=3600, window=50)
+    barrier = threading.Barrier(8)
+
+    def subscribe(i):
+        barrier.wait()
+        hub.subscribe(f"S{i}")
+
+    threads = [threading.Thread(target=subscribe, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    hub.poll_once()
+    hub.stop()
+
+    stats = hub.stats()
+    assert stats["polls"] == 8 and stats["bars"] == 8 * 30
+    assert stats["errors"] == 8 and stats["last_error"] == "feed down"
@@ -0,0 +1,12 @@
+import socket
+
+from utils import tracing
+
+
+def test_busy_metrics_port_logs_a_warning(monkeypatch, caplog):
+    monkeypatch.setattr(tracing, "_exporters_started", False)
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        tracing.start_exporters(port=taken.getsockname()[1])
+    assert "Metrics endpoint not started" in caplog.text
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.streaming import ReplayFeed, StreamHub
+from utils.visualizations import StockVisualizer
+
+
+def recording(bars=400):
+    index = pd.date_range("2024-06-03 13:30", periods=bars, freq="min", tz="UTC")
+    close = 100 + np.random.default_rng(0).standard_normal(bars).cumsum() * 0.05
+    return pd.DataFrame({"Open": close, "High": close + 0.05, "Low": close - 0.05,
+                         "Close": close, "Volume": np.arange(bars, dtype=float)}, index=index)
+
+
+def assert_shows(chart, frame):
+    candlestick, volume = chart["figure"].data
+    assert list(candlestick.x) == list(frame.index)
+    assert list(volume.x) == list(frame.index)
+    for name in ("open", "high", "low", "close"):
+        np.testing.assert_array_equal(getattr(candlestick, name), frame[name.title()].to_numpy())
+    np.testing.assert_array_equal(volume.y, frame["Volume"].to_numpy())
+
+
+@pytest.mark.parametrize("bars_per_poll", [1, 7])
+def test_live_chart_updates_match_the_series_window(bars_per_poll):
+    feed = ReplayFeed(recording(), bars_per_poll=bars_per_poll, initial_bars=30)
+    hub = StreamHub(feed, poll_interval=3600, window=50)
+    series = hub.subscribe("AAPL")
+    chart = StockVisualizer.update_live_chart(None, series)
+    assert_shows(chart, series.frame())
+
+    # Enough ticks to compact the ring buffers several times
+    for _ in range(40):
+        hub.poll_once()
+        chart = StockVisualizer.update_live_chart(chart, series)
+        assert chart["new_bars"] == bars_per_poll
+        assert_shows(chart, series.frame())
+    assert len(chart["figure"].data[0].x) == 50
+    assert chart["build_ms"] >= 0
+
+
+def test_live_chart_without_new_bars_is_unchanged():
+    hub = StreamHub(ReplayFeed(recording(), initial_bars=30), poll_interval=3600, window=50)
+    series = hub.subscribe("AAPL")
+    chart = StockVisualizer.update_live_chart(None, series)
+    again = StockVisualizer.update_live_chart(chart, series)
+
+    assert again["new_bars"] == 0
+    assert again["figure"] is chart["figure"]
+    assert_shows(again, series.frame())
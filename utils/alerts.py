@@ -0,0 +1,290 @@
+import argparse
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.data_handler import StockDataHandler
+from utils.prediction import StockPredictor
+from utils.tracing import traced, tracer
+
+# Rule kinds, in the order of their integer codes
+ALERT_KINDS = {
+    "price_above": "Price crosses above",
+    "price_below": "Price crosses below",
+    "pct_move": "Daily move of at least (%)",
+    "rsi_above": "RSI crosses above",
+    "rsi_below": "RSI crosses below",
+}
+KIND_CODES = {kind: code for code, kind in enumerate(ALERT_KINDS)}
+
+# History fetched per cycle: enough bars for a 14-day RSI and the bar before it
+ALERT_PERIOD = "3mo"
+
+
+@dataclass(frozen=True)
+class AlertEvent:
+    """A rule that fired on a bar"""
+    rule_id: int
+    user_id: int
+    symbol: str
+    kind: str
+    threshold: float
+    value: float
+    bar: pd.Timestamp
+
+
+def compute_signals(histories, symbols):
+    """Last/previous close and RSI for each symbol, as arrays aligned with symbols.
+
+    The closes are aligned into one wide frame so RSI is computed for every
+    symbol in a single calculate_rsi call; symbols without data get NaN.
+    """
+    n = len(symbols)
+    signals = {name: np.full(n, np.nan) for name in ("last", "prev", "rsi", "prev_rsi")}
+    signals["bar"] = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+    if not histories:
+        return signals
+
+    closes = StockDataHandler.close_panel(histories).reindex(columns=list(symbols))
+    rsi = StockPredictor.calculate_rsi(closes)
+    tail = closes.to_numpy(dtype=float)[-2:]
+    rsi_tail = rsi.to_numpy(dtype=float)[-2:]
+    signals["last"], signals["rsi"] = tail[-1], rsi_tail[-1]
+    if len(tail) > 1:
+        signals["prev"], signals["prev_rsi"] = tail[-2], rsi_tail[-2]
+
+    for i, symbol in enumerate(symbols):
+        history = histories.get(symbol)
+        if history is not None and len(history):
+            signals["bar"][i] = history.index[-1].value
+    return signals
+
+
+def evaluate_rules(kinds, thresholds, last, prev, rsi, prev_rsi):
+    """Vectorized rule check; every argument is an array with one entry per rule.
+
+    Returns ``(fired, value)`` where value is the price, % move or RSI the
+    rule was compared against. Crossing rules fire on the bar that crosses
+    the threshold, not on every bar beyond it.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pct = (last - prev) / prev * 100
+        choices = [kinds == code for code in range(len(ALERT_KINDS))]
+        fired = np.select(choices, [
+            (prev < thresholds) & (last >= thresholds),
+            (prev > thresholds) & (last <= thresholds),
+            np.abs(pct) >= thresholds,
+            (prev_rsi < thresholds) & (rsi >= thresholds),
+            (prev_rsi > thresholds) & (rsi <= thresholds),
+        ], False)
+        value = np.select(choices, [last, last, pct, rsi, rsi], np.nan)
+    return fired, value
+
+
+class RuleBook:
+    """Active rules compiled into column arrays, grouped by symbol.
+
+    Rules are sorted by symbol, so the rules of any contiguous range of
+    symbols are one slice of each array. ``last_fired`` remembers the bar
+    each rule last fired on, so a rule fires at most once per bar. It is
+    seeded from the rule's persisted ``last_triggered_at``, so a restart
+    does not fire again on bars up to that time.
+    """
+
+    def __init__(self, rules, previous=None):
+        rules = [r for r in rules if r.kind in KIND_CODES]
+        symbols, symbol_pos = np.unique(np.array([r.symbol for r in rules], dtype=object),
+                                        return_inverse=True)
+        order = np.argsort(symbol_pos, kind="stable")
+
+        self.symbols = list(symbols)
+        self.symbol_pos = symbol_pos[order].astype(np.int64)
+        self.ids = np.array([r.id for r in rules], dtype=np.int64)[order]
+        self.user_ids = np.array([r.user_id for r in rules], dtype=np.int64)[order]
+        self.kinds = np.array([KIND_CODES[r.kind] for r in rules], dtype=np.int8)[order]
+        self.thresholds = np.array([r.threshold for r in rules], dtype=float)[order]
+        # starts[i]:starts[i + 1] are the rules for symbols[i]
+        self.starts = np.searchsorted(self.symbol_pos, np.arange(len(self.symbols) + 1))
+
+        never = np.iinfo(np.int64).min
+        triggered = [getattr(r, "last_triggered_at", None) for r in rules]
+        # Naive trigger times are UTC, as are the bars' epoch values
+        self.last_fired = np.array([never if t is None else pd.Timestamp(t).value for t in triggered],
+                                   dtype=np.int64)[order]
+        if previous is not None and len(previous.ids) and len(self.ids):
+            # Keep the fired state of rules that survived the reload
+            known = dict(zip(previous.ids.tolist(), previous.last_fired.tolist()))
+            self.last_fired = np.maximum(self.last_fired,
+                                         [known.get(i, never) for i in self.ids.tolist()])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def evaluate(self, first, stop, signals):
+        """Check the rules of symbols[first:stop] against their signals"""
+        lo, hi = self.starts[first], self.starts[stop]
+        pos = self.symbol_pos[lo:hi] - first
+        bar = signals["bar"][pos]
+        fired, value = evaluate_rules(
+            self.kinds[lo:hi], self.thresholds[lo:hi],
+            signals["last"][pos], signals["prev"][pos],
+            signals["rsi"][pos], signals["prev_rsi"][pos],
+        )
+        fired &= bar > self.last_fired[lo:hi]
+        hits = np.flatnonzero(fired)
+        self.last_fired[lo + hits] = bar[hits]
+
+        kinds = list(ALERT_KINDS)
+        return [
+            AlertEvent(int(self.ids[lo + i]), int(self.user_ids[lo + i]),
+                       self.symbols[first + pos[i]], kinds[self.kinds[lo + i]],
+                       float(self.thresholds[lo + i]), float(value[i]), pd.Timestamp(bar[i]))
+            for i in hits
+        ]
+
+
+class AlertScheduler:
+    """Background evaluation of every active alert rule.
+
+    Each cycle takes the next ``max_symbols_per_cycle`` symbols (round
+    robin), fetches their histories with one bulk request and checks all
+    of their rules at once, so the work per cycle is bounded no matter
+    how many rules exist. Rules are reloaded at the start of every pass
+    over the symbols, picking up rules added or deleted elsewhere.
+    """
+
+    def __init__(self, load_rules, fetch_histories, interval=60.0, max_symbols_per_cycle=500,
+                 on_trigger=None, period=ALERT_PERIOD):
+        self.load_rules = load_rules
+        self.fetch_histories = fetch_histories
+        self.interval = interval
+        self.max_symbols_per_cycle = max_symbols_per_cycle
+        self.on_trigger = on_trigger
+        self.period = period
+        self.book = None
+        self._cursor = 0
+        self._reload = True
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.metrics = {"cycles": 0, "rules": 0, "rules_checked": 0, "triggered": 0,
+                        "errors": 0, "last_cycle_ms": 0.0, "last_error": None}
+
+    def reload_rules(self):
+        """Pick up added or deleted rules on the next cycle"""
+        self._reload = True
+
+    @traced("alerts.cycle")
+    def run_cycle(self):
+        """Evaluate the next batch of symbols and return the events that fired"""
+        start = time.perf_counter()
+        with self._lock:
+            if self._reload or self.book is None or self._cursor == 0:
+                self._reload = False
+                self.book = RuleBook(self.load_rules(), previous=self.book)
+                self._cursor = 0
+            book = self.book
+            if not book.symbols:
+                return []
+
+            first = self._cursor if self._cursor < len(book.symbols) else 0
+            stop = min(first + self.max_symbols_per_cycle, len(book.symbols))
+            self._cursor = stop % len(book.symbols)
+
+            symbols = book.symbols[first:stop]
+            histories, _ = self.fetch_histories(symbols, self.period)
+            events = book.evaluate(first, stop, compute_signals(histories, symbols))
+
+        if events and self.on_trigger is not None:
+            self.on_trigger(events)
+
+        self.metrics["cycles"] += 1
+        self.metrics["rules"] = len(book)
+        self.metrics["rules_checked"] += int(book.starts[stop] - book.starts[first])
+        self.metrics["triggered"] += len(events)
+        self.metrics["last_cycle_ms"] = (time.perf_counter() - start) * 1000
+        return events
+
+    def run(self):
+        """Evaluate cycles every interval until stopped"""
+        while not self._stop.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                self.metrics["errors"] += 1
+                self.metrics["last_error"] = str(e)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the background thread (no-op if it is running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="alert-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def record_triggers(events):
+    """Persist when each rule fired"""
+    from utils.auth import record_alert_triggers
+    now = datetime.utcnow()
+    record_alert_triggers([(e.rule_id, now, e.value) for e in events])
+
+
+def get_scheduler():
+    """Return the process-wide alert scheduler, created on first use.
+
+    It is not started here: exactly one process should evaluate the rules,
+    so it runs from its own entry point (python -m utils.alerts) rather
+    than from every Streamlit worker. ALERT_INTERVAL sets the seconds
+    between cycles (default 60) and ALERT_MAX_SYMBOLS the number of
+    symbols evaluated per cycle (default 500).
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from utils.auth import load_active_alert_rules
+            _scheduler = AlertScheduler(
+                load_active_alert_rules,
+                StockDataHandler.get_histories,
+                interval=float(os.environ.get("ALERT_INTERVAL", "60")),
+                max_symbols_per_cycle=int(os.environ.get("ALERT_MAX_SYMBOLS", "500")),
+                on_trigger=record_triggers,
+            )
+            tracer.register_counters("alerts", lambda: dict(_scheduler.metrics))
+    return _scheduler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Evaluate price alert rules in the background (run exactly one per deployment)")
+    parser.add_argument("--once", action="store_true", help="run a single cycle and exit")
+    args = parser.parse_args(argv)
+
+    scheduler = get_scheduler()
+    if args.once:
+        events = scheduler.run_cycle()
+        print(f"{len(events)} alerts fired, {scheduler.metrics['rules']} rules active")
+        return
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
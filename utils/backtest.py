@@ -0,0 +1,216 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from utils.features import compute_features
+from utils.forecasting import WINDOW
+from utils.history_store import HistoryStore, period_start
+from utils.models import MODEL_BACKENDS, get_backend
+
+BACKTEST_MODES = ("expanding", "rolling")
+
+
+def walk_forward(close, volume, horizons, mode="expanding", train_window=252, min_train=252, step=21,
+                 backend="linear"):
+    """Walk-forward evaluation of the StockPredictor model on one symbol.
+
+    At every ``step`` bars from ``min_train`` on, a model is fitted on the
+    bars before the fold origin (all of them, or the last ``train_window``
+    with ``mode="rolling"``) and the following ``max(horizons)`` closes are
+    forecast recursively, exactly as predict_future does with the same
+    model ``backend`` (see utils.models). Returns
+    ``(abs_errors, sq_errors, hits, counts)`` arrays, one entry per horizon.
+    """
+    backend = get_backend(backend)
+    horizons = np.asarray(horizons)
+    n_h = len(horizons)
+    sums = [np.zeros(n_h), np.zeros(n_h), np.zeros(n_h), np.zeros(n_h, dtype=np.int64)]
+    max_h = int(horizons.max())
+    n = len(close)
+
+    # Features only look back, so one pass serves every fold without leakage
+    X = compute_features(close, volume)
+    valid = ~np.isnan(X).any(axis=1)
+
+    models, origins = [], []
+    for origin in range(max(min_train, WINDOW), n - 1, step):
+        # Rows t < origin - 1 have a known target close[t + 1] before the origin
+        lo = 0 if mode == "expanding" else max(0, origin - 1 - train_window)
+        rows = np.arange(lo, origin - 1)
+        rows = rows[valid[rows]]
+        if len(rows) < 2:
+            continue
+        models.append(backend.fit(X[rows], close[rows + 1]))
+        origins.append(origin)
+    if not models:
+        return sums
+
+    # Forecast every fold of the symbol in one batched recurrence
+    origins = np.asarray(origins)
+    recent = origins[:, None] + np.arange(-WINDOW, 0)
+    predictions = backend.forecast(models, close[recent], volume[recent], max_h)
+
+    last_known = close[origins - 1]
+    for j, h in enumerate(horizons):
+        target = origins + h - 1
+        inside = target < n
+        if not inside.any():
+            continue
+        predicted = predictions[inside, h - 1]
+        actual = close[target[inside]]
+        base = last_known[inside]
+        error = predicted - actual
+        sums[0][j] = np.abs(error).sum()
+        sums[1][j] = np.square(error).sum()
+        sums[2][j] = (np.sign(predicted - base) == np.sign(actual - base)).sum()
+        sums[3][j] = inside.sum()
+    return sums
+
+
+# Arrays of the process pool workers, attached once per worker
+_shared = {}
+
+
+def _attach(name, size):
+    shm = shared_memory.SharedMemory(name=name)
+    _shared["shm"] = shm
+    _shared["data"] = np.ndarray((2, size), dtype=np.float64, buffer=shm.buf)
+
+
+def _run_chunk(tasks, options):
+    data = _shared["data"]
+    return [(i, walk_forward(data[0, lo:hi], data[1, lo:hi], **options)) for i, lo, hi in tasks]
+
+
+class WalkForwardBacktest:
+    """Walk-forward backtest of StockPredictor over many symbols and horizons.
+
+    Histories are packed into one shared-memory block that every worker of
+    a process pool maps without copying; each worker evaluates a chunk of
+    symbols and only the per-horizon error sums travel back.
+    """
+
+    def __init__(self, horizons=(1, 5, 21), mode="expanding", train_window=252,
+                 min_train=252, step=21, workers=None, backend="linear"):
+        if mode not in BACKTEST_MODES:
+            raise ValueError(f"mode must be one of {BACKTEST_MODES}")
+        self.options = {
+            "horizons": tuple(int(h) for h in horizons),
+            "mode": mode,
+            "train_window": train_window,
+            "min_train": min_train,
+            "step": step,
+            "backend": backend,
+        }
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, histories):
+        """Backtest a dict of symbol -> history DataFrame.
+
+        Returns a DataFrame indexed by (symbol, horizon) with MAE, RMSE,
+        directional accuracy and the number of folds.
+        """
+        symbols, columns = [], []
+        for symbol, history in histories.items():
+            df = history[['Close', 'Volume']].dropna()
+            if len(df) > WINDOW + 1:
+                symbols.append(symbol)
+                columns.append(df.to_numpy(dtype=float).T)
+        if not symbols:
+            return self._frame([], [])
+
+        offsets = np.concatenate([[0], np.cumsum([c.shape[1] for c in columns])])
+        tasks = [(i, int(offsets[i]), int(offsets[i + 1])) for i in range(len(symbols))]
+
+        if self.workers <= 1 or len(symbols) == 1:
+            results = [(i, walk_forward(c[0], c[1], **self.options)) for i, c in enumerate(columns)]
+            return self._frame(symbols, results)
+
+        size = int(offsets[-1])
+        shm = shared_memory.SharedMemory(create=True, size=2 * size * 8)
+        try:
+            data = np.ndarray((2, size), dtype=np.float64, buffer=shm.buf)
+            for (i, lo, hi), c in zip(tasks, columns):
+                data[:, lo:hi] = c
+            # A few chunks per worker keeps the pool busy when symbol lengths differ
+            chunks = [tasks[k::self.workers * 4] for k in range(min(len(tasks), self.workers * 4))]
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_attach,
+                                     initargs=(shm.name, size)) as pool:
+                futures = [pool.submit(_run_chunk, chunk, self.options) for chunk in chunks]
+                results = [r for future in futures for r in future.result()]
+            del data
+        finally:
+            shm.close()
+            shm.unlink()
+        return self._frame(symbols, results)
+
+    def run_store(self, symbols=None, period="5y", store=None):
+        """Backtest histories straight from the history store, without any network access"""
+        store = store or HistoryStore()
+        histories = {}
+        for symbol in symbols or store.symbols():
+            history = store.load(symbol)
+            if history is None or history.empty:
+                continue
+            start = period_start(period, history.index[-1])
+            histories[symbol] = history if start is None else history[history.index >= start]
+        return self.run(histories)
+
+    def _frame(self, symbols, results):
+        horizons = self.options["horizons"]
+        rows = []
+        for i, (abs_err, sq_err, hits, counts) in sorted(results, key=lambda r: r[0]):
+            for j, h in enumerate(horizons):
+                if counts[j]:
+                    rows.append((symbols[i], h, abs_err[j] / counts[j],
+                                 np.sqrt(sq_err[j] / counts[j]), hits[j] / counts[j], int(counts[j])))
+        frame = pd.DataFrame(rows, columns=["symbol", "horizon", "mae", "rmse",
+                                            "directional_accuracy", "folds"])
+        return frame.set_index(["symbol", "horizon"])
+
+
+def summarize(results):
+    """Fold-weighted metrics per horizon across all symbols"""
+    if results.empty:
+        return results
+    weights = results["folds"]
+    grouped = results.assign(
+        abs_err=results["mae"] * weights,
+        sq_err=np.square(results["rmse"]) * weights,
+        hits=results["directional_accuracy"] * weights,
+    ).groupby(level="horizon")
+    totals = grouped[["abs_err", "sq_err", "hits", "folds"]].sum()
+    return pd.DataFrame({
+        "mae": totals["abs_err"] / totals["folds"],
+        "rmse": np.sqrt(totals["sq_err"] / totals["folds"]),
+        "directional_accuracy": totals["hits"] / totals["folds"],
+        "folds": totals["folds"],
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtest over the local history store")
+    parser.add_argument("symbols", nargs="*", help="symbols to test (default: every stored symbol)")
+    parser.add_argument("--period", default="5y")
+    parser.add_argument("--horizons", type=int, nargs="+", default=[1, 5, 21])
+    parser.add_argument("--mode", choices=BACKTEST_MODES, default="expanding")
+    parser.add_argument("--train-window", type=int, default=252)
+    parser.add_argument("--step", type=int, default=21)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--backend", choices=list(MODEL_BACKENDS), default="linear")
+    args = parser.parse_args(argv)
+
+    backtest = WalkForwardBacktest(args.horizons, args.mode, args.train_window,
+                                   step=args.step, workers=args.workers, backend=args.backend)
+    results = backtest.run_store([s.upper() for s in args.symbols], args.period)
+    print(results.to_string())
+    print()
+    print(summarize(results).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+PRICE_COLUMNS = ("Open", "High", "Low", "Close")
+COLUMNS = PRICE_COLUMNS + ("Volume",)
+
+
+class CompactHistory:
+    """OHLCV bars packed into one contiguous, read-only NumPy buffer.
+
+    The buffer holds the index as int64 epoch nanoseconds, then Open, High,
+    Low and Close as float32 (one contiguous run per column), then Volume
+    as uint32 (uint64 if a bar does not fit). Columns the app never reads,
+    such as Dividends and Stock Splits, are dropped: 28 bytes per bar
+    instead of the 64 of a float64 frame with seven columns.
+
+    frame() returns a new DataFrame on every call whose price and volume
+    columns are views of the buffer; only the tz-aware index is
+    materialized, once. Callers may add columns or reassign values on
+    their frame without affecting anyone else, and the shared buffer itself
+    is read-only.
+    """
+
+    def __init__(self, buffer, length, volume_dtype, tz=None, name=None):
+        self.buffer = buffer
+        self.length = length
+        self.volume_dtype = np.dtype(volume_dtype)
+        self.tz = tz
+        self.name = name
+        self._index = None
+
+    def __reduce__(self):
+        # The index is rebuilt on demand rather than pickled along
+        return CompactHistory, (self.buffer, self.length, self.volume_dtype.str, self.tz, self.name)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes
+
+    @classmethod
+    def from_frame(cls, history):
+        """Pack the OHLCV columns of a history with a DatetimeIndex"""
+        n = len(history)
+        index = pd.DatetimeIndex(history.index)
+        volume = history["Volume"].to_numpy(dtype=float) if "Volume" in history.columns else np.zeros(n)
+        volume = np.nan_to_num(volume, nan=0.0).clip(min=0)
+        volume_dtype = np.uint32 if not n or volume.max() <= np.iinfo(np.uint32).max else np.uint64
+
+        buffer = np.empty(n * (8 + 4 * len(PRICE_COLUMNS)) + n * np.dtype(volume_dtype).itemsize,
+                          dtype=np.uint8)
+        compact = cls(buffer, n, volume_dtype, index.tz, index.name)
+        compact.index_values[:] = index.as_unit("ns").asi8
+        prices = compact.prices
+        for i, column in enumerate(PRICE_COLUMNS):
+            prices[i] = history[column].to_numpy(dtype=np.float32) if column in history.columns else np.nan
+        compact.volume[:] = np.rint(volume)
+        buffer.flags.writeable = False
+        return compact
+
+    @property
+    def index_values(self):
+        return self.buffer[:8 * self.length].view(np.int64)
+
+    @property
+    def prices(self):
+        """(4, bars) float32 view: Open, High, Low, Close"""
+        n = self.length
+        return self.buffer[8 * n:(8 + 4 * len(PRICE_COLUMNS)) * n].view(np.float32).reshape(
+            len(PRICE_COLUMNS), n)
+
+    @property
+    def volume(self):
+        return self.buffer[(8 + 4 * len(PRICE_COLUMNS)) * self.length:].view(self.volume_dtype)
+
+    @property
+    def index(self):
+        """The DatetimeIndex of the bars (immutable, so built once and shared)"""
+        if self._index is None:
+            index = pd.DatetimeIndex(self.index_values.view("M8[ns]"), name=self.name)
+            if self.tz is not None:
+                index = index.tz_localize("UTC").tz_convert(self.tz)
+            self._index = index
+        return self._index
+
+    def frame(self):
+        """The bars as a new DataFrame of views into the read-only buffer"""
+        prices = self.prices
+        columns = {column: prices[i] for i, column in enumerate(PRICE_COLUMNS)}
+        columns["Volume"] = self.volume
+        return pd.DataFrame(columns, index=self.index, copy=False)
@@ -1,31 +1,277 @@
-import yfinance as yf
+import hashlib
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import streamlit as st
+from utils.compact_history import CompactHistory
+from utils.fundamentals import FundamentalsStore
+from utils.history_store import HistoryStore
+from utils.provider import ProviderClient, YahooProvider
+from utils.shared_cache import cache_backend_from_env
+from utils.tracing import cache_event, span, traced, tracer
 
 class StockDataHandler:
+    # Market data provider behind request coalescing and rate limiting;
+    # replace with a stub for tests and benchmarks
+    provider = ProviderClient.from_env(YahooProvider())
+    # Persistent OHLCV store shared by every session and worker on the host
+    history_store = HistoryStore()
+    # Trimmed company info, persisted with a long TTL
+    fundamentals_store = FundamentalsStore()
+    # Upper bound on concurrent `info` requests in get_many
+    max_workers = 8
+    # Cache shared by sessions (memory) or by every process on the host
+    # (SQLite, Arrow files, Redis); see STOCK_CACHE_BACKEND
+    cache_backend = cache_backend_from_env()
+    cache_ttl = 300  # Cache data for 5 minutes
+
     @staticmethod
-    @st.cache_data(ttl=300)  # Cache data for 5 minutes
+    @traced("data.get_stock_data")
     def get_stock_data(symbol: str, period: str = "1y"):
-        """Fetch stock data from Yahoo Finance"""
+        """Fetch stock data, served from the shared cache when possible"""
+        # Concurrent cold misses for the same key are fetched only once
+        data = StockDataHandler.cache_backend.get_or_compute(
+            f"stock:{symbol}:{period}",
+            StockDataHandler.cache_ttl,
+            lambda: StockDataHandler.load_stock_data(symbol, period),
+            refresh=lambda: StockDataHandler.refresh_stock_data(symbol, period),
+        )
+        if data and isinstance(data["history"], CompactHistory):
+            # Each caller gets its own frame of views into the cached buffer
+            data = {"history": data["history"].frame(), "info": data["info"]}
+        return data
+
+    @staticmethod
+    @traced("data.load_stock_data")
+    def load_stock_data(symbol: str, period: str = "1y"):
+        """Fetch stock data from the local history store, topped up from Yahoo Finance"""
         try:
-            stock = yf.Ticker(symbol)
-            hist_data = stock.history(period=period)
+            provider = StockDataHandler.provider
+            with span("data.history"):
+                hist_data = StockDataHandler.history_store.get_history(
+                    symbol, period, provider.history
+                )
 
-            if hist_data.empty:
+            if hist_data is None or hist_data.empty:
                 st.error(f"No data available for {symbol}")
                 return None
 
-            info = stock.info
+            info = StockDataHandler.get_company_info(symbol)
 
+            # Cached entries keep only the OHLCV columns, packed into one buffer
             return {
-                "history": hist_data,
+                "history": CompactHistory.from_frame(hist_data),
                 "info": info
             }
         except Exception as e:
             st.error(f"Error fetching data for {symbol}: {str(e)}")
             return None
 
+    @staticmethod
+    def refresh_stock_data(symbol: str, period: str = "1y"):
+        """Background refresh of a cached entry: like load_stock_data, without Streamlit.
+
+        Runs on a cache thread with no script context, so errors are raised
+        to the cache (which counts them) instead of going to st.error, and
+        company info bypasses the st.cache_data wrapper.
+        """
+        hist_data = StockDataHandler.history_store.get_history(
+            symbol, period, StockDataHandler.provider.history
+        )
+        if hist_data is None or hist_data.empty:
+            return None
+        return {
+            "history": CompactHistory.from_frame(hist_data),
+            "info": StockDataHandler.load_company_info(symbol)
+        }
+
+    @staticmethod
+    @traced("data.info")
+    def load_company_info(symbol: str):
+        """Load trimmed company info from the fundamentals store or provider"""
+        return StockDataHandler.fundamentals_store.get(
+            symbol, StockDataHandler.provider.info
+        )
+
+    @staticmethod
+    @st.cache_data(ttl=86400)  # Company info changes about once a day
+    def get_company_info(symbol: str):
+        """Fetch company name, sector and key metric fields"""
+        return StockDataHandler.load_company_info(symbol)
+
+    @staticmethod
+    def normalize_symbols(symbols):
+        """Upper-case, strip and de-duplicate symbols, keeping their order"""
+        return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+    @staticmethod
+    @traced("data.get_histories")
+    def get_histories(symbols, period: str = "1y"):
+        """Fetch histories for many symbols with bulk downloads.
+
+        Histories missing from the history store are downloaded in at most
+        two bulk requests (full periods and tails). Returns a
+        ``(histories, errors)`` pair of dicts keyed by symbol.
+        """
+        symbols = StockDataHandler.normalize_symbols(symbols)
+        store = StockDataHandler.history_store
+        histories, errors = {}, {}
+
+        # Group the downloads the store needs into bulk requests
+        full, tails = [], {}
+        for symbol in symbols:
+            try:
+                pending = store.pending_fetch(symbol, period)
+            except ValueError as e:
+                errors[symbol] = f"Error fetching data for {symbol}: {str(e)}"
+                continue
+            cache_event("history_store", pending is None)
+            if pending is None:
+                continue
+            if "start" in pending:
+                tails[symbol] = pending["start"]
+            else:
+                full.append(symbol)
+
+        fetched, fetch_errors = {}, {}
+        if not store.offline:
+            requests = []
+            if full:
+                requests.append((full, {"period": period}))
+            if tails:
+                requests.append((list(tails), {"start": min(tails.values())}))
+            for batch, kwargs in requests:
+                try:
+                    fetched.update(StockDataHandler.provider.download(batch, **kwargs))
+                except Exception as e:
+                    for symbol in batch:
+                        fetch_errors[symbol] = e
+
+        def prefetched(symbol, period=None, start=None):
+            if symbol in fetch_errors:
+                raise fetch_errors[symbol]
+            if symbol in tails and (period is not None or start < min(tails.values())):
+                # The store wants more than the bulk tail, e.g. to re-download
+                # a history re-adjusted for a split or dividend
+                return StockDataHandler.provider.history(symbol, period=period, start=start)
+            return fetched.get(symbol)
+
+        for symbol in symbols:
+            if symbol in errors:
+                continue
+            try:
+                hist_data = store.get_history(symbol, period, prefetched)
+            except Exception as e:
+                errors[symbol] = f"Error fetching data for {symbol}: {str(e)}"
+                continue
+            if hist_data is None or hist_data.empty:
+                errors[symbol] = f"No data available for {symbol}"
+                continue
+            histories[symbol] = hist_data
+
+        return histories, errors
+
+    @staticmethod
+    def get_many(symbols, period: str = "1y"):
+        """Fetch stock data for many symbols with bulk history downloads.
+
+        Histories come from get_histories, while stale company info is
+        fetched concurrently on a bounded thread pool. Returns a
+        ``(results, errors)`` pair of dicts keyed by symbol, so one bad
+        symbol does not break the batch.
+        """
+        symbols = StockDataHandler.normalize_symbols(symbols)
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=StockDataHandler.max_workers) as pool:
+            info_futures = {
+                symbol: pool.submit(StockDataHandler.load_company_info, symbol)
+                for symbol in symbols
+            }
+            histories, errors = StockDataHandler.get_histories(symbols, period)
+
+            for symbol, hist_data in histories.items():
+                try:
+                    info = info_futures[symbol].result()
+                except Exception:
+                    info = {}
+                results[symbol] = {
+                    "history": hist_data,
+                    "info": info
+                }
+
+        return results, errors
+
+    @staticmethod
+    def close_panel(histories):
+        """Align the closes of many histories into one wide frame (one column per symbol)"""
+        frames = list(histories.values())
+        index = frames[0].index
+        if all(h.index.equals(index) for h in frames[1:]):
+            # Common case (one market calendar): stack into a single block directly
+            closes = np.column_stack([h["Close"].to_numpy(dtype=float) for h in frames])
+        elif all(isinstance(h.index, pd.DatetimeIndex) and h.index.tz == index.tz for h in frames):
+            # One join on the union of the dates, each column scattered in by position
+            # (pd.concat aligns the columns one at a time)
+            stamps = [h.index.as_unit("ns").asi8 for h in frames]
+            union = np.unique(np.concatenate(stamps))
+            closes = np.full((len(union), len(frames)), np.nan)
+            for j, (h, own) in enumerate(zip(frames, stamps)):
+                closes[np.searchsorted(union, own), j] = h["Close"].to_numpy(dtype=float)
+            index = pd.DatetimeIndex(pd.to_datetime(union, utc=index.tz is not None), name=index.name)
+            if index.tz is not None:
+                index = index.tz_convert(frames[0].index.tz)
+            index = index.as_unit(frames[0].index.unit)
+        else:
+            panel = pd.concat({s: h["Close"] for s, h in histories.items()}, axis=1)
+            index, closes = panel.index, panel.to_numpy(dtype=float)
+        return pd.DataFrame(closes, index=index, columns=list(histories)).ffill()
+
+    @staticmethod
+    @traced("data.get_quotes")
+    def get_quotes(symbols):
+        """Latest price and daily change for many symbols.
+
+        Histories are fetched with one bulk request (plus the history store),
+        aligned into a single wide frame of closes and the changes computed
+        column-wise. Returns a DataFrame indexed by symbol with Price,
+        Change and Change % columns; symbols without data are left out.
+        """
+        histories, _ = StockDataHandler.get_histories(symbols, "5d")
+        columns = ["Price", "Change", "Change %"]
+        if not histories:
+            return pd.DataFrame(columns=columns)
+
+        closes = StockDataHandler.close_panel(histories)
+        if len(closes) < 2:
+            last, previous = closes.iloc[-1], closes.iloc[-1]
+        else:
+            last, previous = closes.iloc[-1], closes.iloc[-2]
+        change = last - previous
+        return pd.DataFrame({
+            "Price": last,
+            "Change": change,
+            "Change %": change / previous * 100,
+        })[columns]
+
+    @staticmethod
+    def provider_metrics():
+        """Coalescing, throttling and stale-serve counters for the data path"""
+        metrics = {}
+        if hasattr(StockDataHandler.provider, "stats"):
+            metrics.update(StockDataHandler.provider.stats())
+        metrics.update(StockDataHandler.cache_backend.stats())
+        return metrics
+
+    @staticmethod
+    def data_fingerprint(history):
+        """Cheap fingerprint of a history: its length, first and last bar"""
+        if history is None or len(history) == 0:
+            return None
+        parts = (len(history), history.index[0], history.index[-1], tuple(history.iloc[-1]))
+        return hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+
     @staticmethod
     def format_number(number):
         """Format large numbers with K, M, B suffixes"""
@@ -53,4 +299,13 @@ class StockDataHandler:
             "Avg Volume": stock_info.get("averageVolume"),
         }
 
-        return {k: StockDataHandler.format_number(v) for k, v in metrics.items()}
\ No newline at end of file
+        return {k: StockDataHandler.format_number(v) for k, v in metrics.items()}
+
+
+def _stock_data_cache_counts():
+    stats = StockDataHandler.cache_backend.stats()
+    return stats["hits"] + stats["stale_serves"], stats["misses"]
+
+
+tracer.register_cache("stock_data", _stock_data_cache_counts)
+tracer.register_counters("provider", StockDataHandler.provider_metrics)
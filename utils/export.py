@@ -0,0 +1,119 @@
+import io
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+
+from utils.data_handler import StockDataHandler
+from utils.tracing import cache_event, span, traced
+
+# Format -> (MIME type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+# Rows written per chunk when serializing CSV
+CSV_CHUNK_ROWS = 50_000
+
+# Bundles are built in memory up to this size, then spill to a temporary file
+BUNDLE_SPOOL_BYTES = 32 * 1024 * 1024
+
+
+class DataExporter:
+    """Builds history downloads on demand, cached per data fingerprint.
+
+    Nothing is serialized until a download is requested: the pages hand
+    st.download_button a callable. Each file is written straight into a
+    binary buffer in chunks instead of going through one big string.
+    """
+
+    # (symbol, fingerprint, format) -> bytes, least recently used first
+    cache = OrderedDict()
+    cache_max_bytes = 128 * 1024 * 1024
+    _cache_bytes = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def write(history, fmt, sink):
+        """Serialize a history to a binary file-like object"""
+        if fmt == "csv":
+            text = io.TextIOWrapper(sink, encoding="utf-8", newline="", write_through=True)
+            history.to_csv(text, chunksize=CSV_CHUNK_ROWS)
+            text.flush()
+            text.detach()  # Leave the sink open for the caller
+        elif fmt == "parquet":
+            history.to_parquet(sink, compression="zstd")
+        elif fmt == "arrow":
+            import pyarrow as pa
+            table = pa.Table.from_pandas(history, preserve_index=True)
+            options = pa.ipc.IpcWriteOptions(compression="zstd")
+            with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table, max_chunksize=CSV_CHUNK_ROWS)
+        else:
+            raise ValueError(f"Unknown export format {fmt!r}")
+
+    @staticmethod
+    def export(history, fmt="csv", symbol=None):
+        """Return the history as bytes in the given format.
+
+        With a symbol, the result is cached until the history changes.
+        """
+        key = None
+        if symbol is not None:
+            key = (symbol, StockDataHandler.data_fingerprint(history), fmt)
+            with DataExporter._lock:
+                payload = DataExporter.cache.get(key)
+                cache_event("export", payload is not None)
+                if payload is not None:
+                    DataExporter.cache.move_to_end(key)
+                    return payload
+
+        buffer = io.BytesIO()
+        with span(f"export.{fmt}"):
+            DataExporter.write(history, fmt, buffer)
+        payload = buffer.getvalue()
+
+        if key is not None and len(payload) <= DataExporter.cache_max_bytes:
+            with DataExporter._lock:
+                if key not in DataExporter.cache:
+                    DataExporter.cache[key] = payload
+                    DataExporter._cache_bytes += len(payload)
+                while DataExporter._cache_bytes > DataExporter.cache_max_bytes:
+                    _, dropped = DataExporter.cache.popitem(last=False)
+                    DataExporter._cache_bytes -= len(dropped)
+        return payload
+
+    @staticmethod
+    def clear_cache():
+        with DataExporter._lock:
+            DataExporter.cache.clear()
+            DataExporter._cache_bytes = 0
+
+    @staticmethod
+    @traced("export.bundle")
+    def bundle(histories, fmt="csv"):
+        """Zip many histories, one member per symbol, written one at a time.
+
+        Returns a file object positioned at the start; it stays in memory
+        for small bundles and spills to a temporary file for large ones.
+        """
+        ext = EXPORT_FORMATS[fmt][1]
+        spool = tempfile.SpooledTemporaryFile(max_size=BUNDLE_SPOOL_BYTES)
+        # Parquet and Arrow are already compressed; deflating them again is wasted work
+        compression = zipfile.ZIP_DEFLATED if fmt == "csv" else zipfile.ZIP_STORED
+        with zipfile.ZipFile(spool, "w", compression=compression) as archive:
+            for symbol, history in histories.items():
+                with archive.open(f"{symbol}.{ext}", "w", force_zip64=True) as member:
+                    DataExporter.write(history, fmt, member)
+        spool.seek(0)
+        return spool
+
+    @staticmethod
+    def file_name(symbol, fmt):
+        return f"{symbol}_stock_data.{EXPORT_FORMATS[fmt][1]}"
+
+    @staticmethod
+    def mime(fmt):
+        return EXPORT_FORMATS[fmt][0]
@@ -0,0 +1,260 @@
+from collections import OrderedDict, deque
+import math
+import threading
+
+import numpy as np
+
+# Feature columns used by StockPredictor, in model order
+FEATURES = ['Close', 'Volume', 'SMA_5', 'SMA_20', 'RSI', 'Volatility']
+
+SMA_SHORT = 5
+SMA_LONG = 20
+RSI_PERIOD = 14
+VOLATILITY_WINDOW = 5
+
+# Bars needed to rebuild every rolling window from scratch
+WARMUP_BARS = max(SMA_LONG, RSI_PERIOD + 1, VOLATILITY_WINDOW + 1) + 1
+
+
+def rolling_mean(values, window):
+    """Trailing rolling mean, NaN until the window is full"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = np.convolve(values, np.full(window, 1.0 / window), 'valid')
+    return out
+
+
+def rolling_std(values, window):
+    """Trailing rolling sample standard deviation, NaN until the window is full"""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        # Centre first so the sum-of-squares form stays numerically stable;
+        # any NaN in a window makes it undefined, as with pandas min_periods
+        finite = values[np.isfinite(values)]
+        centred = values - (finite.mean() if len(finite) else 0.0)
+        ones = np.ones(window)
+        sums = np.convolve(centred, ones, 'valid')
+        squares = np.convolve(centred * centred, ones, 'valid')
+        variance = (squares - sums * sums / window) / (window - 1)
+        out[window - 1:] = np.sqrt(np.maximum(variance, 0.0))
+    return out
+
+
+def rsi_from_means(avg_gain, avg_loss):
+    """RSI from average gains and losses (100 when there are no losses)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+
+def compute_features(close, volume):
+    """Vectorized feature matrix for a full history.
+
+    Produces the same values as the pandas rolling operations historically
+    used in StockPredictor.prepare_data; rows are NaN until every window
+    is full.
+    """
+    close = np.asarray(close, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+    n = len(close)
+
+    delta = np.empty(n)
+    delta[:1] = np.nan
+    delta[1:] = np.diff(close)
+    # Like pandas `where`, the undefined first change counts as zero
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    returns = np.empty(n)
+    returns[:1] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = close[1:] / close[:-1] - 1
+
+    features = np.empty((n, len(FEATURES)))
+    features[:, 0] = close
+    features[:, 1] = volume
+    features[:, 2] = rolling_mean(close, SMA_SHORT)
+    features[:, 3] = rolling_mean(close, SMA_LONG)
+    features[:, 4] = rsi_from_means(rolling_mean(gain, RSI_PERIOD),
+                                    rolling_mean(loss, RSI_PERIOD))
+    features[:, 5] = rolling_std(returns, VOLATILITY_WINDOW)
+    return features
+
+
+class RollingWindow:
+    """Fixed-size window with a running sum"""
+
+    # Recompute the sum from the window every so often to stop float drift
+    RESYNC_EVERY = 4096
+
+    def __init__(self, size):
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.updates = 0
+
+    @property
+    def full(self):
+        return len(self.values) == self.values.maxlen
+
+    def push(self, value):
+        if self.full:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        self.updates += 1
+        if self.updates % self.RESYNC_EVERY == 0:
+            self.total = math.fsum(self.values)
+
+    def mean(self):
+        return self.total / len(self.values) if self.full else math.nan
+
+
+class RollingVariance:
+    """Fixed-size window with a sliding Welford mean/variance"""
+
+    def __init__(self, size):
+        self.values = deque(maxlen=size)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, value):
+        if len(self.values) == self.values.maxlen:
+            old = self.values.popleft()
+            n = len(self.values)
+            if n:
+                delta = old - self.mean
+                self.mean -= delta / n
+                self.m2 -= delta * (old - self.mean)
+            else:
+                self.mean = self.m2 = 0.0
+        self.values.append(value)
+        n = len(self.values)
+        delta = value - self.mean
+        self.mean += delta / n
+        self.m2 += delta * (value - self.mean)
+
+    def std(self):
+        if len(self.values) < self.values.maxlen:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (len(self.values) - 1))
+
+
+class FeatureState:
+    """Rolling-window state producing one feature row per appended bar in O(1)"""
+
+    def __init__(self):
+        self.sma_short = RollingWindow(SMA_SHORT)
+        self.sma_long = RollingWindow(SMA_LONG)
+        self.gains = RollingWindow(RSI_PERIOD)
+        self.losses = RollingWindow(RSI_PERIOD)
+        self.returns = RollingVariance(VOLATILITY_WINDOW)
+        self.last_close = None
+
+    def update(self, close, volume):
+        """Append one bar and return its feature row"""
+        if self.last_close is None:
+            change = 0.0
+        else:
+            change = close - self.last_close
+            self.returns.push(close / self.last_close - 1 if self.last_close else math.nan)
+        self.gains.push(change if change > 0 else 0.0)
+        self.losses.push(-change if change < 0 else 0.0)
+        self.sma_short.push(close)
+        self.sma_long.push(close)
+        self.last_close = close
+
+        avg_gain, avg_loss = self.gains.mean(), self.losses.mean()
+        if math.isnan(avg_gain):
+            rsi = math.nan
+        elif avg_loss == 0:
+            rsi = 100.0 if avg_gain > 0 else math.nan
+        else:
+            rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+
+        return (close, volume, self.sma_short.mean(), self.sma_long.mean(),
+                rsi, self.returns.std())
+
+    @classmethod
+    def from_history(cls, close, volume):
+        """Rebuild the state at the last bar from the trailing warm-up bars"""
+        state = cls()
+        for c, v in zip(close[-WARMUP_BARS:], volume[-WARMUP_BARS:]):
+            state.update(float(c), float(v))
+        return state
+
+
+class FeatureEngine:
+    """Per-symbol feature cache that only processes newly appended bars.
+
+    The first call for a symbol and period (or any call where earlier bars
+    changed) takes the vectorized batch path; later calls with the same
+    history plus new bars update the rolling state in O(1) per appended
+    bar. Each (symbol, period) is extended under its own lock, since
+    sessions share the state, and the least recently used entries are
+    dropped beyond ``max_entries``.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def features(self, symbol, index, close, volume, period=None):
+        """Return the feature matrix for a symbol's full (cleaned) history"""
+        key = (symbol, period)
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            n = len(close)
+            if entry is not None and self._extends(entry, index, close):
+                rows = entry["rows"]
+                start = entry["n"]
+                if n > len(rows):
+                    grown = np.empty((max(n, 2 * len(rows)), len(FEATURES)))
+                    grown[:start] = rows[:start]
+                    rows = grown
+                state = entry["state"]
+                for i in range(start, n):
+                    rows[i] = state.update(float(close[i]), float(volume[i]))
+            else:
+                rows = compute_features(close, volume)
+                state = FeatureState.from_history(close, volume)
+
+            entry = {
+                "state": state,
+                "rows": rows,
+                "n": n,
+                "first": index[0] if n else None,
+                "last": index[n - 1] if n else None,
+                "last_close": float(close[n - 1]) if n else None,
+            }
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    evicted, _ = self._entries.popitem(last=False)
+                    self._locks.pop(evicted, None)
+        return rows[:n]
+
+    @staticmethod
+    def _extends(entry, index, close):
+        """Check that a history is the cached one plus zero or more new bars"""
+        n = entry["n"]
+        return (
+            n > 0
+            and len(index) >= n
+            and index[0] == entry["first"]
+            and index[n - 1] == entry["last"]
+            and float(close[n - 1]) == entry["last_close"]
+        )
+
+    def clear(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == symbol]:
+                    del self._entries[key]
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+class ForecastStore:
+    """Precomputed forecasts written by the nightly job, one Parquet file per period.
+
+    Each row holds a symbol's forecast as a float32 list, the bar it was
+    made from (``as_of``), the model backend and when it was generated.
+    Files are read once and kept in memory until they change on disk, so
+    lookups from the UI cost a dictionary access.
+    """
+
+    def __init__(self, root=None, max_age=36 * 3600):
+        if root is None:
+            root = Path(os.environ.get("STOCK_STORE_DIR", ".stock_store")) / "forecasts"
+        self.root = Path(root)
+        self.max_age = max_age
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def _path(self, period):
+        return self.root / f"{period}.parquet"
+
+    def save(self, period, backend, forecasts):
+        """Replace the forecasts for a period.
+
+        ``forecasts`` maps symbol -> (as_of timestamp, array of closes).
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        symbols = list(forecasts)
+        frame = pd.DataFrame({
+            "as_of": [pd.Timestamp(forecasts[s][0]).isoformat() for s in symbols],
+            "backend": backend,
+            "generated_at": time.time(),
+            "values": [np.asarray(forecasts[s][1], dtype=np.float32) for s in symbols],
+        }, index=pd.Index(symbols, name="symbol"))
+        path = self._path(period)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    def load(self, period):
+        """All stored forecasts for a period as a dict keyed by symbol"""
+        path = self._path(period)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {}
+        with self._lock:
+            cached = self._loaded.get(period)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        try:
+            frame = pd.read_parquet(path)
+        except Exception:
+            return {}
+        entries = {
+            symbol: {
+                "as_of": pd.Timestamp(row.as_of),
+                "backend": row.backend,
+                "generated_at": row.generated_at,
+                "values": np.asarray(row.values, dtype=float),
+            }
+            for symbol, row in zip(frame.index, frame.itertuples(index=False))
+        }
+        with self._lock:
+            self._loaded[period] = (mtime, entries)
+        return entries
+
+    def get(self, symbol, period, backend=None, max_age=None, as_of=None):
+        """Return a fresh forecast entry for a symbol, or None.
+
+        With ``as_of`` (the last bar of the caller's history), a forecast
+        made from any other bar is stale too.
+        """
+        entry = self.load(period).get(symbol)
+        if entry is None:
+            return None
+        if backend is not None and entry["backend"] != backend:
+            return None
+        if as_of is not None and entry["as_of"] != pd.Timestamp(as_of):
+            return None
+        max_age = self.max_age if max_age is None else max_age
+        if time.time() - entry["generated_at"] > max_age:
+            return None
+        return entry
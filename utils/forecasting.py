@@ -0,0 +1,179 @@
+import math
+
+import numpy as np
+
+from utils.features import (
+    FEATURES, RSI_PERIOD, SMA_LONG, SMA_SHORT, VOLATILITY_WINDOW, WARMUP_BARS,
+)
+
+# Closes that must be known before the first forecast step
+WINDOW = WARMUP_BARS
+
+
+class RecursiveForecaster:
+    """Recursive multi-step forecaster for linear models on many symbols at once.
+
+    Each step predicts the next close as ``features @ coef + intercept`` and
+    then recomputes every feature (SMA_5, SMA_20, RSI, Volatility) from a
+    buffer holding the recent closes plus the predictions so far. All
+    symbols advance together, so a step costs a handful of NumPy operations
+    regardless of how many symbols are forecast.
+    """
+
+    def __init__(self, coef=None, intercept=None, predict=None):
+        self.predict = predict
+        if predict is None:
+            self.coef = np.atleast_2d(np.asarray(coef, dtype=float))
+            self.intercept = np.atleast_1d(np.asarray(intercept, dtype=float))
+
+    @classmethod
+    def from_models(cls, models):
+        """Build a forecaster from fitted linear models (one per symbol)"""
+        return cls([m.coef_ for m in models], [m.intercept_ for m in models])
+
+    @classmethod
+    def from_function(cls, predict):
+        """Build a forecaster around any model.
+
+        ``predict`` maps the (symbols, features) matrix of a step to the
+        next close of every symbol.
+        """
+        return cls(predict=predict)
+
+    def forecast(self, closes, volumes, periods, extra=None):
+        """Forecast `periods` closes per symbol.
+
+        ``closes`` and ``volumes`` are (symbols, n) arrays of the most recent
+        bars with n >= WINDOW. The first step uses the last bar's actual
+        features; volume is exogenous to the model, so later steps hold it
+        at its trailing SMA_LONG-bar average. ``extra`` (an
+        utils.indicators.IndicatorStepper) appends indicator columns after
+        the base features and is advanced with every prediction. Returns a
+        (symbols, periods) array.
+        """
+        closes = np.atleast_2d(np.asarray(closes, dtype=float))[:, -WINDOW:]
+        volumes = np.atleast_2d(np.asarray(volumes, dtype=float))
+        if closes.shape[1] < WINDOW:
+            raise ValueError(f"At least {WINDOW} recent closes are required")
+        expected_volume = volumes[:, -SMA_LONG:].mean(axis=1)
+
+        if closes.shape[0] == 1 and self.predict is None and extra is None:
+            # One linear model: plain floats beat NumPy calls on length-1 arrays
+            out = self._forecast_one(closes[0].tolist(), float(volumes[0, -1]),
+                                     float(expected_volume[0]), periods)
+            return np.array(out, dtype=float).reshape(1, periods)
+
+        # Recent closes followed by the predictions, written in place, with
+        # their daily changes and returns alongside
+        buffer = np.empty((closes.shape[0], WINDOW + periods))
+        buffer[:, :WINDOW] = closes
+        changes = np.empty_like(buffer)
+        changes[:, 1:WINDOW] = np.diff(closes, axis=1)
+        returns = np.empty_like(buffer)
+        returns[:, 1:WINDOW] = closes[:, 1:] / closes[:, :-1] - 1
+
+        # Running window sums, updated in place in O(1) per step
+        recent_changes = changes[:, WINDOW - RSI_PERIOD:WINDOW]
+        recent_returns = returns[:, WINDOW - VOLATILITY_WINDOW:WINDOW]
+        sums = (
+            closes[:, -SMA_SHORT:].sum(axis=1),
+            closes[:, -SMA_LONG:].sum(axis=1),
+            np.maximum(recent_changes, 0.0).sum(axis=1),
+            np.maximum(-recent_changes, 0.0).sum(axis=1),
+            recent_returns.sum(axis=1),
+            (recent_returns * recent_returns).sum(axis=1),
+        )
+
+        features = np.empty((closes.shape[0], len(FEATURES) + (extra.width if extra is not None else 0)))
+        features[:, 1] = volumes[:, -1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for step in range(periods):
+                self._step(buffer, changes, returns, WINDOW + step, features, sums, extra,
+                           expected_volume)
+                features[:, 1] = expected_volume
+        return buffer[:, WINDOW:]
+
+    def _step(self, buffer, changes, returns, end, features, sums, extra=None, expected_volume=None):
+        """Predict buffer[:, end] and slide the window sums past it"""
+        sum_short, sum_long, sum_gain, sum_loss, sum_returns, sum_squares = sums
+        last = buffer[:, end - 1]
+
+        features[:, 0] = last
+        features[:, 2] = sum_short / SMA_SHORT
+        features[:, 3] = sum_long / SMA_LONG
+        rsi = features[:, 4]
+        np.divide(sum_gain, sum_loss, out=rsi)
+        rsi += 1
+        np.divide(-100, rsi, out=rsi)
+        rsi += 100
+        nan = np.isnan(rsi)
+        if nan.any():
+            # A perfectly flat window has no defined RSI; treat it as neutral
+            rsi[nan] = 50.0
+        variance = (sum_squares - sum_returns * sum_returns / VOLATILITY_WINDOW) / (VOLATILITY_WINDOW - 1)
+        np.sqrt(np.maximum(variance, 0.0, out=variance), out=features[:, 5])
+        if extra is not None:
+            features[:, len(FEATURES):] = extra.row(buffer, end)
+
+        if self.predict is None:
+            prediction = (features * self.coef).sum(axis=1) + self.intercept
+        else:
+            prediction = np.asarray(self.predict(features), dtype=float)
+        buffer[:, end] = prediction
+        if extra is not None:
+            extra.push(prediction, last, expected_volume)
+
+        # Slide every window forward by the new close
+        change = changes[:, end] = prediction - last
+        ret = returns[:, end] = prediction / last - 1
+        sum_short += prediction - buffer[:, end - SMA_SHORT]
+        sum_long += prediction - buffer[:, end - SMA_LONG]
+        dropped = changes[:, end - RSI_PERIOD]
+        sum_gain += np.maximum(change, 0.0) - np.maximum(dropped, 0.0)
+        sum_loss += np.maximum(-change, 0.0) - np.maximum(-dropped, 0.0)
+        dropped = returns[:, end - VOLATILITY_WINDOW]
+        sum_returns += ret - dropped
+        sum_squares += ret * ret - dropped * dropped
+
+    def _forecast_one(self, closes, volume, expected_volume, periods):
+        """The recurrence of forecast() for a single linear model, on Python floats"""
+        c_close, c_volume, c_short, c_long, c_rsi, c_volatility = self.coef[0].tolist()
+        intercept = float(self.intercept[0])
+        changes = [b - a for a, b in zip(closes, closes[1:])]
+        returns = [b / a - 1 for a, b in zip(closes, closes[1:])]
+
+        sum_short = sum(closes[-SMA_SHORT:])
+        sum_long = sum(closes[-SMA_LONG:])
+        sum_gain = sum(d for d in changes[-RSI_PERIOD:] if d > 0)
+        sum_loss = sum(-d for d in changes[-RSI_PERIOD:] if d < 0)
+        sum_returns = sum(returns[-VOLATILITY_WINDOW:])
+        sum_squares = sum(r * r for r in returns[-VOLATILITY_WINDOW:])
+
+        volume_term = c_volume * volume
+        for _ in range(periods):
+            last = closes[-1]
+            if sum_loss:
+                rsi = 100 - 100 / (1 + sum_gain / sum_loss)
+            else:
+                # No losses: 100, or neutral for a perfectly flat window
+                rsi = 100.0 if sum_gain else 50.0
+            variance = (sum_squares - sum_returns * sum_returns / VOLATILITY_WINDOW) / (VOLATILITY_WINDOW - 1)
+            prediction = (c_close * last + volume_term + c_short * (sum_short / SMA_SHORT)
+                          + c_long * (sum_long / SMA_LONG) + c_rsi * rsi
+                          + c_volatility * math.sqrt(max(variance, 0.0)) + intercept)
+            volume_term = c_volume * expected_volume
+
+            change = prediction - last
+            ret = prediction / last - 1
+            sum_short += prediction - closes[-SMA_SHORT]
+            sum_long += prediction - closes[-SMA_LONG]
+            dropped = changes[-RSI_PERIOD]
+            sum_gain += max(change, 0.0) - max(dropped, 0.0)
+            sum_loss += max(-change, 0.0) - max(-dropped, 0.0)
+            dropped = returns[-VOLATILITY_WINDOW]
+            sum_returns += ret - dropped
+            sum_squares += ret * ret - dropped * dropped
+            closes.append(prediction)
+            changes.append(change)
+            returns.append(ret)
+        return closes[-periods:] if periods else []
@@ -0,0 +1,70 @@
+import json
+import os
+import time
+from pathlib import Path
+
+# The only company info fields the app reads (header and get_key_metrics)
+INFO_FIELDS = (
+    "longName",
+    "sector",
+    "industry",
+    "marketCap",
+    "trailingPE",
+    "fiftyTwoWeekHigh",
+    "fiftyTwoWeekLow",
+    "volume",
+    "averageVolume",
+)
+
+
+def trim_info(info):
+    """Keep only the company info fields used by the app"""
+    return {field: info.get(field) for field in INFO_FIELDS if info.get(field) is not None}
+
+
+class FundamentalsStore:
+    """Long-lived on-disk cache of trimmed company info, one JSON file per symbol"""
+
+    def __init__(self, root=None, ttl=86400):
+        root = root or os.environ.get("STOCK_STORE_DIR", ".stock_store")
+        self.root = Path(root) / "info"
+        self.ttl = ttl
+
+    def _path(self, symbol):
+        return self.root / f"{symbol}.json"
+
+    def load(self, symbol, max_age=None):
+        """Return stored info younger than max_age (default: the TTL), else None"""
+        max_age = self.ttl if max_age is None else max_age
+        try:
+            with open(self._path(symbol)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - record.get("fetched_at", 0) > max_age:
+            return None
+        return record.get("info")
+
+    def save(self, symbol, info):
+        """Atomically store the trimmed info for a symbol"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(symbol)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"fetched_at": time.time(), "info": info}, f)
+        os.replace(tmp_path, path)
+
+    def get(self, symbol, fetch):
+        """Return info for a symbol, calling ``fetch(symbol)`` only when stale.
+
+        Stale info is still served if the provider is unreachable.
+        """
+        info = self.load(symbol)
+        if info is not None:
+            return info
+        try:
+            info = trim_info(fetch(symbol) or {})
+        except Exception:
+            return self.load(symbol, max_age=float("inf")) or {}
+        self.save(symbol, info)
+        return info
@@ -0,0 +1,259 @@
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Calendar span covered by each period accepted by the dashboards
+PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1),
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+# Ticker characters used by Yahoo Finance symbols (BRK-B, ^GSPC, EURUSD=X, RDS.A)
+SYMBOL_PATTERN = re.compile(r"[A-Za-z0-9^=.\-]{1,20}")
+# Relative move of an overlapping bar's Open taken to mean the provider re-adjusted the history
+ADJUSTMENT_TOLERANCE = 1e-4
+
+
+def period_start(period, now):
+    """Return the first timestamp covered by a period (None for "max")"""
+    if period == "max":
+        return None
+    if period == "ytd":
+        return now.normalize().replace(month=1, day=1)
+    offset = PERIOD_OFFSETS.get(period)
+    if offset is None:
+        raise ValueError(f"Unknown period: {period!r}")
+    return (now - offset).normalize()
+
+
+def check_symbol(symbol):
+    """Return a symbol that is safe to use as a file name, or raise ValueError"""
+    if not isinstance(symbol, str) or not SYMBOL_PATTERN.fullmatch(symbol) or not symbol.strip("."):
+        raise ValueError(f"Invalid symbol: {symbol!r}")
+    return symbol
+
+
+class HistoryStore:
+    """On-disk OHLCV store with one Parquet file per symbol.
+
+    Bars that were already downloaded are kept between restarts and shared
+    by every worker on the host. Any period is served by slicing the stored
+    frame, and only the tail since the last stored bar is requested again.
+    """
+
+    def __init__(self, root=None, refresh_after=300, offline=None):
+        self.root = Path(root or os.environ.get("STOCK_STORE_DIR", ".stock_store"))
+        self.refresh_after = refresh_after
+        if offline is None:
+            offline = os.environ.get("STOCK_STORE_OFFLINE", "") == "1"
+        self.offline = offline
+
+    def _history_path(self, symbol):
+        return self.root / f"{check_symbol(symbol)}.parquet"
+
+    def _meta_path(self, symbol):
+        return self.root / f"{check_symbol(symbol)}.json"
+
+    def load(self, symbol):
+        """Load all stored bars for a symbol, or None if nothing is stored"""
+        path = self._history_path(symbol)
+        if not path.exists():
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception:
+            return None
+
+    def symbols(self):
+        """Symbols with stored bars, sorted"""
+        if not self.root.exists():
+            return []
+        return sorted(path.stem for path in self.root.glob("*.parquet"))
+
+    def load_meta(self, symbol):
+        """Load the bookkeeping record stored next to a symbol's bars"""
+        try:
+            with open(self._meta_path(symbol)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, symbol, history, covered_from):
+        """Atomically replace the stored bars and metadata for a symbol"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._history_path(symbol)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        history.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        self.save_meta(symbol, covered_from, history.index[-1] if len(history) else None)
+
+    def save_meta(self, symbol, covered_from, last_bar):
+        """Atomically replace a symbol's metadata, marking its bars as just fetched"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "covered_from": None if covered_from is None else covered_from.isoformat(),
+            "fetched_at": time.time(),
+            "last_bar": None if last_bar is None else last_bar.isoformat(),
+        }
+        meta_path = self._meta_path(symbol)
+        tmp_meta = meta_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_meta, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+
+    def covers(self, meta, start):
+        """Check whether the stored bars reach back to the requested start"""
+        if "covered_from" not in meta:
+            return False
+        covered_from = meta["covered_from"]
+        if covered_from is None:  # A "max" download covers every period
+            return True
+        if start is None:
+            return False
+        covered_from = pd.Timestamp(covered_from)
+        if covered_from.tzinfo is None and start.tzinfo is not None:
+            covered_from = covered_from.tz_localize(start.tzinfo)
+        return covered_from <= start
+
+    def pending_fetch(self, symbol, period):
+        """Describe the download needed to serve a period from the store.
+
+        Returns None when the stored bars can be served as they are, a
+        ``{"start": ...}`` dict when only the tail is missing, and a
+        ``{"period": ...}`` dict when the full period has to be downloaded.
+        Only the small metadata file is read, so this is cheap to call for
+        a whole universe of symbols.
+        """
+        meta = self.load_meta(symbol)
+        last_bar = meta.get("last_bar")
+        if last_bar is None or not self._history_path(symbol).exists():
+            return {"period": period}
+
+        last_bar = pd.Timestamp(last_bar)
+        start = period_start(period, pd.Timestamp.now(tz=last_bar.tzinfo))
+        if not self.covers(meta, start):
+            return {"period": period}
+        if self.offline or time.time() - meta.get("fetched_at", 0) < self.refresh_after:
+            return None
+        return {"start": last_bar.strftime("%Y-%m-%d")}
+
+    def get_history(self, symbol, period, fetch):
+        """Return bars for a period, fetching only what the store is missing.
+
+        ``fetch(symbol, period=None, start=None)`` downloads bars from the
+        provider and may raise; the stored bars are served when it does.
+        """
+        stored = self.load(symbol)
+        meta = self.load_meta(symbol) if stored is not None else {}
+
+        tz = stored.index.tz if stored is not None and len(stored) else None
+        now = pd.Timestamp.now(tz=tz)
+        start = period_start(period, now)
+
+        if stored is not None and len(stored) and self.covers(meta, start):
+            fresh = time.time() - meta.get("fetched_at", 0) < self.refresh_after
+            if not (fresh or self.offline):
+                stored = self._refresh_tail(symbol, stored, meta, fetch)
+            return self._slice(stored, start)
+
+        if self.offline:
+            return None if stored is None else self._slice(stored, start)
+
+        try:
+            history = fetch(symbol, period=period)
+        except Exception:
+            # Serve whatever is on disk when the provider is unreachable
+            if stored is not None and len(stored):
+                return self._slice(stored, start)
+            raise
+
+        if history is None or history.empty:
+            return history
+
+        covered_from = period_start(period, pd.Timestamp.now(tz=history.index.tz))
+        if stored is not None and len(stored):
+            history = self._merge(stored, history)
+        self.save(symbol, history, covered_from)
+        return self._slice(history, covered_from)
+
+    def _refresh_tail(self, symbol, stored, meta, fetch):
+        """Download bars from the last stored bar onwards and merge them in"""
+        last_bar = stored.index[-1]
+        try:
+            tail = fetch(symbol, start=last_bar.strftime("%Y-%m-%d"))
+        except Exception:
+            return stored
+
+        covered_from = meta.get("covered_from")
+        covered_from = None if covered_from is None else pd.Timestamp(covered_from)
+        if tail is None or tail.empty:
+            # Nothing new upstream; remember that we checked without rewriting the bars
+            self.save_meta(symbol, covered_from, last_bar)
+            return stored
+
+        if self._readjusted(stored, tail):
+            # Bars are split/dividend adjusted: the stored ones are stale too
+            try:
+                if covered_from is None:
+                    history = fetch(symbol, period="max")
+                else:
+                    history = fetch(symbol, start=covered_from.strftime("%Y-%m-%d"))
+            except Exception:
+                return stored
+            if history is None or history.empty:
+                return stored
+            self.save(symbol, history, covered_from)
+            return history
+
+        merged = self._merge(stored, tail)
+        self.save(symbol, merged, covered_from)
+        return merged
+
+    @staticmethod
+    def _readjusted(stored, tail):
+        """Check whether a tail was adjusted differently from the stored bars.
+
+        True when a new bar carries a split or dividend, or when a bar
+        present in both moved. Only Open is compared, since the Close of
+        the last stored bar legitimately changes while its session is open.
+        """
+        if stored.index.tz is not None and tail.index.tz is not None:
+            tail = tail.tz_convert(stored.index.tz)
+        new = tail[tail.index > stored.index[-1]]
+        for column in ("Stock Splits", "Dividends"):
+            if column in new.columns and (new[column].fillna(0) != 0).any():
+                return True
+
+        overlap = tail.index.intersection(stored.index)
+        if len(overlap) and "Open" in tail.columns and "Open" in stored.columns:
+            before = stored.loc[overlap, "Open"].to_numpy(dtype=float)
+            after = tail.loc[overlap, "Open"].to_numpy(dtype=float)
+            if not np.allclose(before, after, rtol=ADJUSTMENT_TOLERANCE, atol=0, equal_nan=True):
+                return True
+        return False
+
+    @staticmethod
+    def _merge(stored, fresh):
+        """Combine stored bars with newer ones, preferring the fresh values"""
+        if stored.index.tz is not None and fresh.index.tz is not None:
+            fresh = fresh.tz_convert(stored.index.tz)
+        columns = [c for c in stored.columns if c in fresh.columns]
+        merged = pd.concat([stored[stored.index < fresh.index[0]], fresh[columns]])
+        return merged[~merged.index.duplicated(keep="last")].sort_index()
+
+    @staticmethod
+    def _slice(history, start):
+        if start is None:
+            return history
+        return history[history.index >= start]
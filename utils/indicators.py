@@ -0,0 +1,358 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.data_handler import StockDataHandler
+from utils.tracing import cache_event, traced
+
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+BOLLINGER_WINDOW = 20
+BOLLINGER_WIDTH = 2.0
+ATR_PERIOD = 14
+RSI_PERIOD = 14
+
+# Indicator groups offered as chart overlays -> (columns, chart pane);
+# "price" overlays share the candlestick pane, the others get a pane each
+OVERLAYS = {
+    "SMA": (["SMA_20", "SMA_50"], "price"),
+    "EMA": ([f"EMA_{MACD_FAST}", f"EMA_{MACD_SLOW}"], "price"),
+    "Bollinger Bands": (["BB_Upper", "BB_Middle", "BB_Lower"], "price"),
+    "MACD": (["MACD", "MACD_Signal", "MACD_Hist"], "MACD"),
+    "RSI": (["RSI"], "RSI"),
+    "ATR": (["ATR"], "ATR"),
+    "OBV": (["OBV"], "OBV"),
+}
+
+# Columns that can be added to the model features: each can be rolled
+# forward from predicted closes alone (ATR is held at its last value,
+# since future highs and lows are unknown)
+MODEL_INDICATORS = [
+    f"EMA_{MACD_FAST}", f"EMA_{MACD_SLOW}", "MACD", "MACD_Signal", "MACD_Hist",
+    "BB_Upper", "BB_Lower", "ATR", "OBV",
+]
+
+
+def _cumsum0(values):
+    """Cumulative sum down the first axis, with a leading row of zeros"""
+    out = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+def ema_filter(values, alpha):
+    """Exponential moving average seeded with the first value (down each column for 2-D)"""
+    if values.ndim == 1:
+        # The recursion has no closed NumPy form; ewm runs it in compiled code
+        return pd.Series(values, dtype=float).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+    # A wide panel steps every column together, one row at a time (ewm would
+    # loop over the columns); each column starts at its first value and
+    # holds its level through NaNs
+    out = np.empty(values.shape)
+    state = np.full(values.shape[1], np.nan)
+    for t, row in enumerate(values):
+        step = np.where(np.isnan(state), row, state + alpha * (row - state))
+        state = np.where(np.isnan(row), state, step)
+        out[t] = state
+    return out
+
+
+class IndicatorSet:
+    """Technical indicators over one history, computed on demand.
+
+    Intermediates (close changes, gains and losses, cumulative sums, raw
+    EMAs, true range) are computed at most once per set and shared: MACD
+    reuses EMA_12 and EMA_26, Bollinger Bands reuse the SMA's cumulative
+    sum, and every SMA window is a difference of the same cumsum. Finished
+    columns are memoized too, so asking again costs a dictionary lookup.
+    Values are NaN until an indicator's window is full.
+
+    The inputs may also be (dates, symbols) panels: every indicator is then
+    computed down each column at once. NaN bars (before a symbol's first
+    trade, or gaps) leave the windows that contain them NaN.
+    """
+
+    def __init__(self, close, volume=None, high=None, low=None):
+        self.close = np.asarray(close, dtype=float)
+        self.volume = None if volume is None else np.asarray(volume, dtype=float)
+        self.high = None if high is None else np.asarray(high, dtype=float)
+        self.low = None if low is None else np.asarray(low, dtype=float)
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.close)
+
+    def _cached(self, key, compute):
+        value = self._memo.get(key)
+        if value is None:
+            value = self._memo[key] = compute()
+        return value
+
+    def _warm(self, values, bars):
+        """Copy of values with each column's first `bars` traded bars set to NaN"""
+        out = values.copy()
+        if self.gaps():
+            out[self.seen() <= bars] = np.nan
+        else:
+            out[:bars] = np.nan
+        return out
+
+    # Shared intermediates
+
+    def gaps(self):
+        """Whether any close is missing"""
+        return self._cached("gaps", lambda: bool(np.isnan(self.close).any()))
+
+    def seen(self):
+        """Number of known closes up to and including each bar"""
+        return self._cached("seen", lambda: np.cumsum(~np.isnan(self.close), axis=0))
+
+    def change(self):
+        """Close-to-close change, 0 for the first bar (and the first after a gap)"""
+        def compute():
+            out = np.zeros(self.close.shape)
+            out[1:] = np.diff(self.close, axis=0)
+            if self.gaps():
+                out[np.isnan(out) & ~np.isnan(self.close)] = 0.0
+            return out
+        return self._cached("change", compute)
+
+    def centred(self):
+        """(closes minus their mean, the mean), centred so cumulative sums stay precise"""
+        def compute():
+            known = ~np.isnan(self.close)
+            mean = np.where(known, self.close, 0.0).sum(axis=0) / np.maximum(known.sum(axis=0), 1)
+            return self.close - mean, mean
+        return self._cached("centred", compute)
+
+    def rolling_sum(self, key, values, window):
+        """Trailing window sums of an intermediate, NaN until the window is full"""
+        def compute():
+            v = values() if callable(values) else values
+            known = ~np.isnan(v)
+            gaps = not known.all()
+            cumsum = _cumsum0(np.where(known, v, 0.0) if gaps else v)
+            out = np.full(v.shape, np.nan)
+            if len(v) >= window:
+                out[window - 1:] = cumsum[window:] - cumsum[:-window]
+                if gaps:
+                    counts = _cumsum0(known)
+                    out[window - 1:][counts[window:] - counts[:-window] < window] = np.nan
+            return out
+        return self._cached(("rolling_sum", key, window), compute)
+
+    def ema_raw(self, span):
+        """EMA of the closes from the first bar, without the warm-up mask"""
+        return self._cached(("ema_raw", span), lambda: ema_filter(self.close, 2.0 / (span + 1)))
+
+    def true_range(self):
+        def compute():
+            if self.high is None or self.low is None:
+                return np.abs(self.change())
+            previous = np.concatenate([self.close[:1], self.close[:-1]])
+            if self.gaps():
+                previous = np.where(np.isnan(previous), self.close, previous)
+            return np.maximum(self.high - self.low,
+                              np.maximum(np.abs(self.high - previous), np.abs(self.low - previous)))
+        return self._cached("true_range", compute)
+
+    # Indicators
+
+    def sma(self, window):
+        def compute():
+            centred, mean = self.centred()
+            return self.rolling_sum("centred", centred, window) / window + mean
+        return self._cached(("sma", window), compute)
+
+    def rolling_std(self, window):
+        """Population standard deviation of the closes over a trailing window"""
+        def compute():
+            centred, _ = self.centred()
+            s = self.rolling_sum("centred", centred, window)
+            squares = self.rolling_sum("centred_sq", lambda: centred * centred, window)
+            variance = (squares - s * s / window) / window
+            return np.sqrt(np.maximum(variance, 0.0))
+        return self._cached(("std", window), compute)
+
+    def ema(self, span):
+        return self._cached(("ema", span), lambda: self._warm(self.ema_raw(span), span - 1))
+
+    def macd(self, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+        """(MACD line, signal line, histogram)"""
+        def compute():
+            line = self.macd_line_raw(fast, slow)
+            signal_line = self.macd_signal_raw(fast, slow, signal)
+            return (self._warm(line, slow - 1), self._warm(signal_line, slow + signal - 2),
+                    self._warm(line - signal_line, slow + signal - 2))
+        return self._cached(("macd", fast, slow, signal), compute)
+
+    def macd_line_raw(self, fast=MACD_FAST, slow=MACD_SLOW):
+        return self._cached(("macd_line_raw", fast, slow),
+                            lambda: self.ema_raw(fast) - self.ema_raw(slow))
+
+    def macd_signal_raw(self, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+        return self._cached(("macd_signal_raw", fast, slow, signal), lambda: ema_filter(
+            self.macd_line_raw(fast, slow), 2.0 / (signal + 1)))
+
+    def bollinger(self, window=BOLLINGER_WINDOW, width=BOLLINGER_WIDTH):
+        """(upper, middle, lower) bands"""
+        def compute():
+            middle, std = self.sma(window), self.rolling_std(window)
+            return middle + width * std, middle, middle - width * std
+        return self._cached(("bollinger", window, width), compute)
+
+    def rsi(self, period=RSI_PERIOD):
+        """RSI from simple average gains and losses, as used by the model features"""
+        def compute():
+            change = self.change()
+            gains = self.rolling_sum("gain", lambda: np.maximum(change, 0.0), period)
+            losses = self.rolling_sum("loss", lambda: np.maximum(-change, 0.0), period)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return 100 - 100 / (1 + gains / losses)
+        return self._cached(("rsi", period), compute)
+
+    def atr_raw(self, period=ATR_PERIOD):
+        return self._cached(("atr_raw", period), lambda: ema_filter(self.true_range(), 1.0 / period))
+
+    def atr(self, period=ATR_PERIOD):
+        """Average true range with Wilder smoothing"""
+        return self._cached(("atr", period), lambda: self._warm(self.atr_raw(period), period - 1))
+
+    def obv(self):
+        """On-balance volume (missing bars add nothing)"""
+        def compute():
+            volume = self.volume if self.volume is not None else np.zeros(self.close.shape)
+            flow = np.sign(self.change()) * volume
+            return np.cumsum(np.nan_to_num(flow) if self.gaps() else flow, axis=0)
+        return self._cached("obv", compute)
+
+    def column(self, name):
+        """One indicator column by name (SMA_n and EMA_n accept any window)"""
+        prefix, _, window = name.partition("_")
+        if prefix == "SMA" and window.isdigit():
+            return self.sma(int(window))
+        if prefix == "EMA" and window.isdigit():
+            return self.ema(int(window))
+        if name in ("MACD", "MACD_Signal", "MACD_Hist"):
+            return self.macd()[("MACD", "MACD_Signal", "MACD_Hist").index(name)]
+        if name in ("BB_Upper", "BB_Middle", "BB_Lower"):
+            return self.bollinger()[("BB_Upper", "BB_Middle", "BB_Lower").index(name)]
+        if name == "RSI":
+            return self.rsi()
+        if name == "ATR":
+            return self.atr()
+        if name == "OBV":
+            return self.obv()
+        raise ValueError(f"Unknown indicator {name!r}")
+
+    def matrix(self, names):
+        """Indicator columns side by side, shape (bars, len(names))"""
+        with self._lock:
+            return np.column_stack([self.column(name) for name in names]) if names \
+                else np.empty((len(self.close), 0))
+
+    def forecast_state(self):
+        """Recursive state at the last bar, for rolling indicators past it"""
+        with self._lock:
+            return {
+                "ema_fast": self.ema_raw(MACD_FAST)[-1],
+                "ema_slow": self.ema_raw(MACD_SLOW)[-1],
+                "signal": self.macd_signal_raw()[-1],
+                "atr": self.atr_raw()[-1],
+                "obv": self.obv()[-1],
+            }
+
+
+class IndicatorStepper:
+    """Rolls model indicator columns forward with predicted closes, many symbols at once.
+
+    Used by RecursiveForecaster: ``row`` gives the indicator values at the
+    last bar in the forecast buffer and ``push`` advances the recursive
+    state by one predicted close. Volume is held at its expected value, as
+    for the base features.
+    """
+
+    def __init__(self, names, states):
+        unknown = [name for name in names if name not in MODEL_INDICATORS]
+        if unknown:
+            raise ValueError(f"Indicators {', '.join(unknown)} cannot be used as model features")
+        self.names = list(names)
+        self.state = {key: np.array([s[key] for s in states], dtype=float) for key in states[0]}
+
+    @property
+    def width(self):
+        return len(self.names)
+
+    def row(self, buffer, end):
+        s = self.state
+        recent = buffer[:, end - BOLLINGER_WINDOW:end]
+        middle = recent.mean(axis=1)
+        std = recent.std(axis=1)
+        macd = s["ema_fast"] - s["ema_slow"]
+        values = {
+            f"EMA_{MACD_FAST}": s["ema_fast"],
+            f"EMA_{MACD_SLOW}": s["ema_slow"],
+            "MACD": macd,
+            "MACD_Signal": s["signal"],
+            "MACD_Hist": macd - s["signal"],
+            "BB_Upper": middle + BOLLINGER_WIDTH * std,
+            "BB_Lower": middle - BOLLINGER_WIDTH * std,
+            "ATR": s["atr"],
+            "OBV": s["obv"],
+        }
+        return np.column_stack([values[name] for name in self.names])
+
+    def push(self, prediction, last, volume):
+        s = self.state
+        s["ema_fast"] += 2.0 / (MACD_FAST + 1) * (prediction - s["ema_fast"])
+        s["ema_slow"] += 2.0 / (MACD_SLOW + 1) * (prediction - s["ema_slow"])
+        s["signal"] += 2.0 / (MACD_SIGNAL + 1) * (s["ema_fast"] - s["ema_slow"] - s["signal"])
+        s["obv"] += np.sign(prediction - last) * volume
+
+
+class TechnicalIndicators:
+    # Indicator sets keyed by symbol and data fingerprint, least recently used first
+    cache = OrderedDict()
+    cache_size = 32
+    _lock = threading.Lock()
+
+    @staticmethod
+    def indicator_set(data, symbol=None):
+        """Indicator set for a history, shared by every caller while the data is unchanged"""
+        key = None
+        if symbol is not None:
+            key = (symbol, StockDataHandler.data_fingerprint(data))
+            with TechnicalIndicators._lock:
+                indicators = TechnicalIndicators.cache.get(key)
+                cache_event("indicators", indicators is not None)
+                if indicators is not None:
+                    TechnicalIndicators.cache.move_to_end(key)
+                    return indicators
+
+        columns = {name: data[name] for name in ("Volume", "High", "Low") if name in data.columns}
+        indicators = IndicatorSet(data['Close'], columns.get("Volume"), columns.get("High"),
+                                  columns.get("Low"))
+        if key is not None:
+            with TechnicalIndicators._lock:
+                TechnicalIndicators.cache[key] = indicators
+                while len(TechnicalIndicators.cache) > TechnicalIndicators.cache_size:
+                    TechnicalIndicators.cache.popitem(last=False)
+        return indicators
+
+    @staticmethod
+    @traced("indicators.compute")
+    def compute(data, names, symbol=None):
+        """Indicator columns for a history as a DataFrame on the same index"""
+        names = list(names)
+        matrix = TechnicalIndicators.indicator_set(data, symbol).matrix(names)
+        return pd.DataFrame(matrix, index=data.index, columns=names)
+
+    @staticmethod
+    def overlay_columns(overlays):
+        """Columns needed for a selection of overlay groups, in display order"""
+        return [column for overlay in overlays for column in OVERLAYS[overlay][0]]
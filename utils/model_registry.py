@@ -0,0 +1,94 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class ModelRegistry:
+    """LRU cache of fitted models and the state needed to forecast from them.
+
+    Entries are keyed by (symbol, period, data fingerprint), so a model is
+    reused until a new bar arrives. With ``persist_dir`` set, entries are
+    also pickled to disk and survive restarts.
+    """
+
+    def __init__(self, max_size=64, persist_dir=None):
+        self.max_size = max_size
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return self.persist_dir / f"{digest}.pkl"
+
+    def get(self, key):
+        """Return the cached entry for a key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        entry = self._load(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        """Cache an entry, evicting the least recently used ones over the cap"""
+        with self._lock:
+            self._insert(key, entry)
+        if self.persist_dir is not None:
+            try:
+                self.persist_dir.mkdir(parents=True, exist_ok=True)
+                path = self._path(key)
+                tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_path, "wb") as f:
+                    pickle.dump((key, entry), f)
+                os.replace(tmp_path, path)
+            except OSError:
+                pass
+
+    def _insert(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _load(self, key):
+        if self.persist_dir is None:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                stored_key, entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        return entry if stored_key == key else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "evictions": self.evictions,
+            }
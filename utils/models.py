@@ -0,0 +1,305 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.features import FEATURES, compute_features
+from utils.forecasting import WINDOW, RecursiveForecaster
+
+# Linear model in raw feature space; RecursiveForecaster.from_models accepts it
+LinearModel = namedtuple("LinearModel", ["coef_", "intercept_"])
+
+
+def training_rows(close, volume):
+    """Feature rows and next-day close targets, warm-up rows dropped"""
+    X = compute_features(close, volume)
+    X, y = X[:-1], close[1:]
+    valid = ~np.isnan(X).any(axis=1)
+    return X[valid], y[valid]
+
+
+def relative_features(X):
+    """Scale-free version of the feature matrix, comparable across symbols.
+
+    Price features become distances from the close, volume is logged and
+    RSI is scaled to 0..1; volatility is already a return. Indicator
+    columns after the base features are divided by the close.
+    """
+    close = X[:, 0]
+    return np.column_stack([
+        X[:, 2] / close - 1,
+        X[:, 3] / close - 1,
+        np.log1p(X[:, 1]),
+        X[:, 4] / 100,
+        X[:, 5],
+        X[:, len(FEATURES):] / close[:, None],
+    ])
+
+
+class ModelBackend:
+    """A model family StockPredictor can fit and forecast with.
+
+    ``fit(X, y)`` takes the feature rows and next-day closes prepared by
+    StockPredictor; ``forecast(models, closes, volumes, periods, extra)``
+    rolls one fitted model per symbol forward from the last WINDOW bars,
+    with ``extra`` supplying any indicator feature columns.
+    """
+
+    name = None
+
+    def fit(self, X, y):
+        raise NotImplementedError
+
+    def forecast(self, models, closes, volumes, periods, extra=None):
+        """Recursive multi-step forecast, shape (symbols, periods)"""
+        raise NotImplementedError
+
+
+class FeatureRowBackend(ModelBackend):
+    """A backend whose models predict the next close from one feature row.
+
+    ``predict`` is all a subclass needs: forecasts run it once per step
+    inside RecursiveForecaster, which rebuilds the features in between.
+    """
+
+    def predict(self, model, X):
+        """Next-day closes for feature rows"""
+        return model.predict(X)
+
+    def forecast(self, models, closes, volumes, periods, extra=None):
+        def step(features):
+            return np.array([self.predict(m, features[i:i + 1])[0] for i, m in enumerate(models)])
+        return RecursiveForecaster.from_function(step).forecast(closes, volumes, periods, extra)
+
+
+class LinearBackend(ModelBackend):
+    """Ordinary least squares on the raw features (the original model)"""
+
+    name = "linear"
+
+    def fit(self, X, y):
+        from sklearn.linear_model import LinearRegression  # Deferred: slow to import
+        return LinearRegression().fit(X, y)
+
+    def forecast(self, models, closes, volumes, periods, extra=None):
+        # Every symbol advances in one vectorized recurrence
+        return RecursiveForecaster.from_models(models).forecast(closes, volumes, periods, extra)
+
+
+class RidgeBackend(LinearBackend):
+    """Ridge regression on standardized features, mapped back to raw coefficients"""
+
+    name = "ridge"
+
+    def __init__(self, alpha=1.0):
+        self.alpha = alpha
+
+    def fit(self, X, y):
+        from sklearn.linear_model import Ridge
+        mean, scale = X.mean(axis=0), X.std(axis=0)
+        scale[scale == 0] = 1.0
+        model = Ridge(alpha=self.alpha).fit((X - mean) / scale, y)
+        coef = model.coef_ / scale
+        return LinearModel(coef, model.intercept_ - mean @ coef)
+
+
+class GradientBoostingBackend(FeatureRowBackend):
+    """Histogram gradient boosting on scale-free features, predicting the next return.
+
+    Trees cannot extrapolate price levels, so the model learns the ratio of
+    the next close to the current one.
+    """
+
+    name = "gbm"
+
+    def __init__(self, max_iter=100, learning_rate=0.05, max_leaf_nodes=15):
+        self.params = {"max_iter": max_iter, "learning_rate": learning_rate,
+                       "max_leaf_nodes": max_leaf_nodes}
+
+    def fit(self, X, y):
+        from sklearn.ensemble import HistGradientBoostingRegressor
+        return HistGradientBoostingRegressor(**self.params).fit(relative_features(X), y / X[:, 0] - 1)
+
+    def predict(self, model, X):
+        return (1 + model.predict(relative_features(X))) * X[:, 0]
+
+
+class ARBackend(ModelBackend):
+    """AR(p) model of daily log returns, fitted by least squares.
+
+    Uses only the closes: the feature rows carry each day's close and the
+    target the next one, which gives the return series.
+    """
+
+    name = "ar"
+
+    def __init__(self, order=5):
+        if order >= WINDOW - 1:
+            raise ValueError(f"order must be below {WINDOW - 1}")
+        self.order = order
+
+    def fit(self, X, y):
+        returns = np.log(y / X[:, 0])
+        p = self.order
+        if len(returns) <= p + 1:
+            raise ValueError("Not enough data for the AR order")
+        lags = np.column_stack([returns[p - k - 1:len(returns) - k - 1] for k in range(p)])
+        design = np.column_stack([np.ones(len(lags)), lags])
+        coef, *_ = np.linalg.lstsq(design, returns[p:], rcond=None)
+        return coef  # Intercept followed by lags 1..p
+
+    def forecast(self, models, closes, volumes, periods, extra=None):
+        # Closes only: indicator features do not apply
+        coef = np.atleast_2d(np.asarray(models, dtype=float))
+        closes = np.atleast_2d(np.asarray(closes, dtype=float))
+        p = self.order
+        # Most recent return first, matching the lag order of the coefficients
+        lags = np.log(closes[:, -1:-p - 1:-1] / closes[:, -2:-p - 2:-1])
+        last = closes[:, -1]
+        out = np.empty((closes.shape[0], periods))
+        for step in range(periods):
+            r = coef[:, 0] + (coef[:, 1:] * lags).sum(axis=1)
+            last = last * np.exp(r)
+            out[:, step] = last
+            lags = np.column_stack([r, lags[:, :-1]])
+        return out
+
+
+class PooledBackend(ModelBackend):
+    """One cross-sectional ridge model for a whole universe.
+
+    Rows from every symbol are stacked in scale-free form and fitted in a
+    single vectorized solve; forecasting applies the one model to all
+    symbols at each step. fit() on one symbol works too, but the point is
+    fit_pooled().
+    """
+
+    name = "pooled"
+
+    def __init__(self, alpha=1e-3):
+        self.alpha = alpha
+
+    def fit(self, X, y):
+        return self.fit_pooled([(X, y)])
+
+    def fit_pooled(self, rows):
+        """Fit one model on a list of (X, y) pairs from many symbols"""
+        X = np.concatenate([relative_features(x) for x, _ in rows])
+        y = np.concatenate([t / x[:, 0] - 1 for x, t in rows])
+        valid = np.isfinite(X).all(axis=1) & np.isfinite(y)
+        X, y = X[valid], y[valid]
+        mean = X.mean(axis=0)
+        design = X - mean
+        # Ridge normal equations: one small (features x features) solve
+        gram = design.T @ design + self.alpha * len(X) * np.eye(X.shape[1])
+        coef = np.linalg.solve(gram, design.T @ (y - y.mean()))
+        return LinearModel(coef, y.mean() - mean @ coef)
+
+    def predict(self, model, X):
+        return (1 + relative_features(X) @ model.coef_ + model.intercept_) * X[:, 0]
+
+    def forecast(self, models, closes, volumes, periods, extra=None):
+        coef = np.stack([m.coef_ for m in models])
+        intercept = np.array([m.intercept_ for m in models])
+
+        def step(features):
+            ratio = (relative_features(features) * coef).sum(axis=1) + intercept
+            return (1 + ratio) * features[:, 0]
+        return RecursiveForecaster.from_function(step).forecast(closes, volumes, periods, extra)
+
+
+MODEL_BACKENDS = {
+    backend.name: backend
+    for backend in (LinearBackend, RidgeBackend, GradientBoostingBackend, ARBackend, PooledBackend)
+}
+
+
+def get_backend(backend=None, **params):
+    """Return a backend instance by name (an instance is passed through)"""
+    if isinstance(backend, ModelBackend):
+        return backend
+    name = backend or "linear"
+    if name not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown model backend {name!r}; choose from {', '.join(MODEL_BACKENDS)}")
+    return MODEL_BACKENDS[name](**params)
+
+
+def universe_rows(histories):
+    """Training rows and recent bars for every symbol with enough data"""
+    rows, recent = {}, {}
+    for symbol, history in histories.items():
+        df = history[['Close', 'Volume']].dropna()
+        if len(df) <= WINDOW + 1:
+            continue
+        close = df['Close'].to_numpy(dtype=float)
+        volume = df['Volume'].to_numpy(dtype=float)
+        X, y = training_rows(close, volume)
+        if len(X) >= 2:
+            rows[symbol] = (X, y)
+            recent[symbol] = (close[-WINDOW:], volume[-WINDOW:])
+    return rows, recent
+
+
+def fit_universe(backend, histories, pooled=False, workers=8):
+    """Fit a backend on a whole universe of symbols.
+
+    With ``pooled=False`` one model per symbol is fitted on a thread pool;
+    with ``pooled=True`` (PooledBackend) one cross-sectional model is fitted
+    in a single solve and shared by every symbol. Returns ``(models,
+    recent, seconds)`` where models and recent are dicts keyed by symbol.
+    """
+    backend = get_backend(backend)
+    rows, recent = universe_rows(histories)
+    start = time.perf_counter()
+    if pooled:
+        model = backend.fit_pooled(list(rows.values()))
+        models = dict.fromkeys(rows, model)
+    else:
+        symbols = list(rows)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            fitted = list(pool.map(lambda s: backend.fit(*rows[s]), symbols))
+        models = dict(zip(symbols, fitted))
+    return models, recent, time.perf_counter() - start
+
+
+def forecast_universe(backend, models, recent, periods):
+    """Forecast every fitted symbol together; returns ({symbol: array}, seconds)"""
+    backend = get_backend(backend)
+    symbols = list(models)
+    if not symbols:
+        return {}, 0.0
+    closes = np.stack([recent[s][0] for s in symbols])
+    volumes = np.stack([recent[s][1] for s in symbols])
+    start = time.perf_counter()
+    predictions = backend.forecast([models[s] for s in symbols], closes, volumes, periods)
+    return dict(zip(symbols, predictions)), time.perf_counter() - start
+
+
+def compare_backends(histories, periods=21, backends=None):
+    """Fit, forecast and score each backend on a holdout of the last ``periods`` bars.
+
+    Returns a DataFrame with per-symbol fit and forecast times in
+    milliseconds and the holdout MAE (as % of the last training close),
+    to pick the fastest model that is accurate enough.
+    """
+    train = {s: h.iloc[:-periods] for s, h in histories.items() if len(h) > periods}
+    actual = {s: h['Close'].to_numpy(dtype=float)[-periods:] for s, h in histories.items()
+              if s in train}
+
+    rows = []
+    for name in backends or MODEL_BACKENDS:
+        pooled = name == "pooled"
+        models, recent, fit_seconds = fit_universe(name, train, pooled=pooled)
+        predictions, predict_seconds = forecast_universe(name, models, recent, periods)
+        errors = [np.abs(predictions[s] - actual[s]).mean() / recent[s][0][-1] * 100
+                  for s in predictions]
+        n = max(len(models), 1)
+        rows.append({
+            "backend": name,
+            "fit_ms_per_symbol": fit_seconds * 1000 / n,
+            "predict_ms_per_symbol": predict_seconds * 1000 / n,
+            "holdout_mae_pct": float(np.mean(errors)) if errors else np.nan,
+        })
+    return pd.DataFrame(rows).set_index("backend")
@@ -0,0 +1,83 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+from utils.data_handler import StockDataHandler
+from utils.models import fit_universe, forecast_universe
+from utils.prediction import StockPredictor
+
+# Longest prediction the dashboards offer: 12 months of calendar days
+MAX_HORIZON = int(12 * 30.44)
+
+
+def load_universe(symbols=None, universe_file=None):
+    """Symbols given on the command line, in a file (one per line) or in FORECAST_UNIVERSE"""
+    if symbols:
+        return StockDataHandler.normalize_symbols(symbols)
+    if universe_file:
+        lines = Path(universe_file).read_text().splitlines()
+        return StockDataHandler.normalize_symbols(l.split("#")[0] for l in lines)
+    env = os.environ.get("FORECAST_UNIVERSE", "")
+    return StockDataHandler.normalize_symbols(env.split(","))
+
+
+def precompute(symbols, periods=("1y",), horizon=MAX_HORIZON, backend=None, store=None, workers=8):
+    """Refresh histories, then fit and forecast a universe for each period.
+
+    Histories are topped up with bulk downloads through the history store,
+    models are fitted on a thread pool (or once, for the pooled backend)
+    and every symbol is forecast in one batched recurrence. Returns a list
+    of per-period summaries.
+    """
+    backend = backend or StockPredictor.default_backend
+    store = store or StockPredictor.forecast_store
+    summaries = []
+    for period in periods:
+        start = time.perf_counter()
+        histories, errors = StockDataHandler.get_histories(symbols, period)
+        fetch_seconds = time.perf_counter() - start
+
+        models, recent, fit_seconds = fit_universe(backend, histories, pooled=backend == "pooled",
+                                                   workers=workers)
+        predictions, predict_seconds = forecast_universe(backend, models, recent, horizon)
+        store.save(period, backend, {
+            symbol: (histories[symbol].index[-1], values)
+            for symbol, values in predictions.items()
+        })
+        summaries.append({
+            "period": period,
+            "symbols": len(predictions),
+            "errors": errors,
+            "fetch_seconds": fetch_seconds,
+            "fit_seconds": fit_seconds,
+            "predict_seconds": predict_seconds,
+        })
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Precompute forecasts for a symbol universe (run after market close)")
+    parser.add_argument("symbols", nargs="*", help="symbols (default: --universe-file or FORECAST_UNIVERSE)")
+    parser.add_argument("--universe-file", help="file with one symbol per line")
+    parser.add_argument("--periods", nargs="+", default=["1y"], help="history periods to fit on")
+    parser.add_argument("--horizon", type=int, default=MAX_HORIZON, help="days to forecast")
+    parser.add_argument("--backend", default=None, help="model backend (default: MODEL_BACKEND)")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    symbols = load_universe(args.symbols, args.universe_file)
+    if not symbols:
+        parser.error("no symbols given")
+
+    for summary in precompute(symbols, args.periods, args.horizon, args.backend, workers=args.workers):
+        print(f"{summary['period']}: {summary['symbols']}/{len(symbols)} symbols forecast "
+              f"(fetch {summary['fetch_seconds']:.1f}s, fit {summary['fit_seconds']:.1f}s, "
+              f"predict {summary['predict_seconds']:.2f}s)")
+        for symbol, error in summary["errors"].items():
+            print(f"  {symbol}: {error}")
+
+
+if __name__ == "__main__":
+    main()
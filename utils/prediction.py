@@ -1,44 +1,76 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import MinMaxScaler
 from datetime import datetime, timedelta
+import os
 import streamlit as st
+from utils.data_handler import StockDataHandler
+from utils.features import FeatureEngine, compute_features
+from utils.forecast_store import ForecastStore
+from utils.forecasting import WINDOW
+from utils.indicators import MODEL_INDICATORS, IndicatorStepper, TechnicalIndicators
+from utils.model_registry import ModelRegistry
+from utils.models import get_backend
+from utils.simulation import BAND_QUANTILES, SIMULATION_PATHS, daily_log_returns, simulate_quantiles
+from utils.tracing import cache_event, span, traced, tracer
 
 class StockPredictor:
+    # Incremental per-symbol feature state, shared across reruns
+    feature_engine = FeatureEngine(max_entries=int(os.environ.get("FEATURE_CACHE_SIZE", "256")))
+    # Fitted models keyed by symbol, period and data fingerprint
+    model_registry = ModelRegistry(
+        max_size=int(os.environ.get("MODEL_CACHE_SIZE", "64")),
+        persist_dir=os.environ.get("MODEL_CACHE_DIR") or None,
+    )
+    # Model family used when none is requested; see utils.models.MODEL_BACKENDS
+    default_backend = os.environ.get("MODEL_BACKEND", "linear")
+    # Indicator columns added to the model features when none are requested;
+    # see utils.indicators.MODEL_INDICATORS
+    default_indicators = tuple(filter(None, os.environ.get("MODEL_INDICATORS", "").split(",")))
+    # Forecasts written by the nightly precompute job (python -m utils.precompute)
+    forecast_store = ForecastStore()
+
+    @staticmethod
+    def resolve_indicators(indicators):
+        if indicators is None:
+            return StockPredictor.default_indicators
+        return tuple(indicators)
+
     @staticmethod
-    def prepare_data(data):
+    @traced("predict.prepare_data")
+    def prepare_data(data, symbol=None, indicators=(), period=None):
         """Prepare data for prediction"""
         try:
-            df = data.copy()
-            # Drop any rows with missing values
-            df = df.dropna()
+            # Drop any rows with missing values, on a copy of the caller's frame
+            df = data.dropna().copy()
 
             if len(df) < 10:  # Require at least 10 data points
                 st.error("Not enough historical data for prediction (minimum 10 days required)")
                 return None, None
 
-            # Create target variable (next day's closing price)
-            df['Target'] = df['Close'].shift(-1)
-            df = df.dropna()
+            close = df['Close'].to_numpy(dtype=float)
+            volume = df['Volume'].to_numpy(dtype=float)
 
-            # Create features
-            df['SMA_5'] = df['Close'].rolling(window=5).mean()
-            df['SMA_20'] = df['Close'].rolling(window=20).mean()
-            df['RSI'] = StockPredictor.calculate_rsi(df['Close'])
+            # Features: Close, Volume, SMA_5, SMA_20, RSI, Volatility
+            if symbol is not None:
+                # Only bars appended since the last call are processed
+                X = StockPredictor.feature_engine.features(symbol, df.index, close, volume, period)
+            else:
+                X = compute_features(close, volume)
+            if indicators:
+                # Indicator columns come from the shared, fingerprint-cached set
+                extra = TechnicalIndicators.indicator_set(df, symbol).matrix(indicators)
+                X = np.hstack([X, extra])
 
-            # Additional features
-            df['Daily_Return'] = df['Close'].pct_change()
-            df['Volatility'] = df['Daily_Return'].rolling(window=5).std()
+            # Target variable is the next day's closing price
+            X, y = X[:-1], close[1:]
+            valid = ~np.isnan(X).any(axis=1)  # Drop rows still warming up
+            X, y = X[valid], y[valid]
 
-            features = ['Close', 'Volume', 'SMA_5', 'SMA_20', 'RSI', 'Volatility']
-            df = df.dropna()  # Remove any rows with NaN after feature creation
-
-            if len(df) == 0:
+            if len(X) == 0:
                 st.error("No valid data points after preparation")
                 return None, None
 
-            return df[features].values, df['Target'].values
+            return X, y
         except Exception as e:
             st.error(f"Error preparing data: {str(e)}")
             return None, None
@@ -56,53 +88,191 @@ class StockPredictor:
             return pd.Series(index=prices.index)
 
     @staticmethod
-    def predict_future(data, periods):
-        """Predict future stock prices"""
+    def fit_model(data, symbol=None, backend=None, indicators=None, period=None):
+        """Fit the next-day close model on a history"""
+        indicators = StockPredictor.resolve_indicators(indicators)
+        unknown = [name for name in indicators if name not in MODEL_INDICATORS]
+        if unknown:
+            st.error(f"Indicators {', '.join(unknown)} cannot be used as model features")
+            return None
+
+        X, y = StockPredictor.prepare_data(data, symbol, indicators, period)
+
+        if X is None or y is None:
+            return None
+
+        if len(X) < 2:
+            st.error("Not enough valid data points for prediction")
+            return None
+
+        backend = get_backend(backend or StockPredictor.default_backend)
         try:
-            X, y = StockPredictor.prepare_data(data)
+            with span("predict.fit"):
+                return backend.fit(X, y)
+        except ValueError as e:
+            st.error(f"Could not fit the {backend.name} model: {str(e)}")
+            return None
 
-            if X is None or y is None:
-                return None
+    @staticmethod
+    def future_dates(data, periods):
+        """Calendar days following the last bar"""
+        return data.index[-1] + pd.to_timedelta(np.arange(1, periods + 1), unit="D")
+
+    @staticmethod
+    def get_fitted(data, symbol=None, period=None, backend=None, indicators=None):
+        """Return (model, recent bars, indicator state) for a history, reusing cached fits.
+
+        With a symbol, the fit is cached in the model registry until the
+        history changes, so later calls skip feature preparation and fitting.
+        The indicator state is None when the model uses no indicators.
+        """
+        backend = get_backend(backend or StockPredictor.default_backend)
+        indicators = StockPredictor.resolve_indicators(indicators)
+        key = None
+        if symbol is not None:
+            key = (symbol, period, StockDataHandler.data_fingerprint(data), backend.name, indicators)
+            entry = StockPredictor.model_registry.get(key)
+            if entry is not None:
+                return entry["model"], entry["recent"], entry.get("indicator_state")
+
+        model = StockPredictor.fit_model(data, symbol, backend, indicators, period)
+        if model is None:
+            return None, None, None
 
-            if len(X) < 2:
-                st.error("Not enough valid data points for prediction")
+        df = data.dropna()
+        recent = df[['Close', 'Volume']].iloc[-WINDOW:].to_numpy(dtype=float)
+        state = None
+        if indicators:
+            state = TechnicalIndicators.indicator_set(df, symbol).forecast_state()
+        if key is not None:
+            StockPredictor.model_registry.put(key, {"model": model, "recent": recent,
+                                                    "indicator_state": state})
+        return model, recent, state
+
+    @staticmethod
+    @traced("predict.predict_future")
+    def predict_future(data, periods, symbol=None, period=None, backend=None, indicators=None,
+                       bands=None):
+        """Predict future stock prices
+
+        With ``bands`` ("bootstrap" or "gbm") a DataFrame is returned
+        instead: the point forecast in "Predicted" plus Monte Carlo price
+        quantiles (see forecast_bands).
+        """
+        try:
+            backend = get_backend(backend or StockPredictor.default_backend)
+            indicators = StockPredictor.resolve_indicators(indicators)
+            model, recent, state = StockPredictor.get_fitted(data, symbol, period, backend, indicators)
+            if model is None:
                 return None
 
-            # Train model
-            model = LinearRegression()
-            model.fit(X, y)
-
-            # Prepare future prediction data
-            last_data = X[-1:].copy()  # Use the last observation
-            predictions = []
-            dates = []
-
-            # Predict for each future period
-            current_data = last_data.copy()
-            for i in range(periods):
-                try:
-                    pred = model.predict(current_data)[0]
-                    predictions.append(pred)
-
-                    # Generate future date
-                    next_date = data.index[-1] + timedelta(days=i+1)
-                    dates.append(next_date)
-
-                    # Update features for next prediction
-                    current_data[0][0] = pred  # Update Close price
-                    # Update other features based on prediction
-                    if i >= 4:  # Update SMA_5 after 5 predictions
-                        current_data[0][2] = np.mean(predictions[-5:])
-                    if i >= 19:  # Update SMA_20 after 20 predictions
-                        current_data[0][3] = np.mean(predictions[-20:])
-                except Exception as e:
-                    st.error(f"Error in prediction loop: {str(e)}")
-                    break
+            # Roll every feature forward with the predictions in one recurrence
+            extra = IndicatorStepper(indicators, [state]) if indicators else None
+            with span("predict.forecast"):
+                predictions = backend.forecast([model], recent[None, :, 0], recent[None, :, 1],
+                                               periods, extra)[0]
 
             if len(predictions) > 0:
-                return pd.Series(predictions, index=dates)
+                predictions = pd.Series(predictions, index=StockPredictor.future_dates(data, periods))
+                return StockPredictor.with_bands(data, predictions, bands)
             return None
 
         except Exception as e:
             st.error(f"Error in prediction: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    @staticmethod
+    @traced("predict.get_forecast")
+    def get_forecast(data, periods, symbol=None, period=None, indicators=None, bands=None):
+        """Predict future prices, reading the nightly forecast when there is one
+
+        Symbols outside the precomputed universe (or with a forecast that is
+        stale, too short or made before the history's last bar) fall back
+        to predict_future, as do models using
+        indicator features (the nightly job fits the base features only).
+        ``bands`` adds Monte Carlo bands to either, as in predict_future.
+        The result's ``attrs["source"]`` says which one answered:
+        "precomputed" or "live".
+        """
+        indicators = StockPredictor.resolve_indicators(indicators)
+        if symbol is not None and period is not None and not indicators:
+            entry = StockPredictor.forecast_store.get(symbol, period, StockPredictor.default_backend,
+                                                      as_of=data.index[-1])
+            hit = entry is not None and len(entry["values"]) >= periods
+            cache_event("forecast_store", hit)
+            if hit:
+                index = entry["as_of"] + pd.to_timedelta(np.arange(1, periods + 1), unit="D")
+                predictions = pd.Series(entry["values"][:periods], index=index)
+                predictions = StockPredictor.with_bands(data, predictions, bands)
+                predictions.attrs["source"] = "precomputed"
+                return predictions
+
+        predictions = StockPredictor.predict_future(data, periods, symbol, period, indicators=indicators,
+                                                    bands=bands)
+        if predictions is not None:
+            predictions.attrs["source"] = "live"
+        return predictions
+
+    @staticmethod
+    @traced("predict.bands")
+    def forecast_bands(data, predictions, method="bootstrap", paths=SIMULATION_PATHS,
+                       quantiles=BAND_QUANTILES, seed=0):
+        """Monte Carlo price bands around a point forecast.
+
+        ``bootstrap`` compounds resampled daily log returns of the history
+        (less their mean) around the forecast; ``gbm`` compounds normal log
+        returns with the history's volatility around it. Returns a
+        DataFrame on the forecast's index with one column per quantile
+        ("P5", "P50", "P95"). The seed is fixed, so a rerun draws the same
+        bands.
+        """
+        close = data['Close'].dropna().to_numpy(dtype=float)
+        with span("predict.simulate"):
+            values = simulate_quantiles(close[-1], len(predictions), daily_log_returns(close), method,
+                                        center=predictions.to_numpy(dtype=float), paths=paths,
+                                        quantiles=quantiles, seed=seed)
+        return pd.DataFrame(values.T, index=predictions.index,
+                            columns=[f"P{q * 100:g}" for q in quantiles])
+
+    @staticmethod
+    def with_bands(data, predictions, bands):
+        """The forecast alone, or with its bands when a method is given"""
+        if not bands:
+            return predictions
+        frame = StockPredictor.forecast_bands(data, predictions, bands)
+        frame.insert(0, "Predicted", predictions)
+        return frame
+
+    @staticmethod
+    @traced("predict.predict_many")
+    def predict_many(histories, periods, period=None, backend=None, indicators=None):
+        """Predict future prices for many symbols in one batched recurrence.
+
+        ``histories`` maps symbol -> history DataFrame; symbols that cannot
+        be modelled are left out of the returned dict of Series.
+        """
+        backend = get_backend(backend or StockPredictor.default_backend)
+        indicators = StockPredictor.resolve_indicators(indicators)
+        fitted = {}
+        for symbol, data in histories.items():
+            model, recent, state = StockPredictor.get_fitted(data, symbol, period, backend, indicators)
+            if model is not None:
+                fitted[symbol] = (model, recent, state)
+        if not fitted:
+            return {}
+
+        symbols = list(fitted)
+        recent = np.stack([fitted[s][1] for s in symbols])
+        extra = IndicatorStepper(indicators, [fitted[s][2] for s in symbols]) if indicators else None
+
+        with span("predict.forecast_batch"):
+            predictions = backend.forecast([fitted[s][0] for s in symbols],
+                                           recent[:, :, 0], recent[:, :, 1], periods, extra)
+        return {
+            symbol: pd.Series(predictions[i], index=StockPredictor.future_dates(histories[symbol], periods))
+            for i, symbol in enumerate(symbols)
+        }
+
+
+tracer.register_cache("model_registry", lambda: (StockPredictor.model_registry.hits,
+                                                 StockPredictor.model_registry.misses))
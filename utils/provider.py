@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+
+from utils.shared_cache import SingleFlight
+from utils.tracing import span
+
+
+class YahooProvider:
+    """Thin wrapper around yfinance so the data handler can swap providers.
+
+    yfinance is imported on first use to keep app start-up fast.
+    """
+
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        """Download bars for one symbol, for a full period or from a start date"""
+        import yfinance as yf
+        stock = yf.Ticker(symbol)
+        if start is not None:
+            return stock.history(start=start, interval=interval)
+        return stock.history(period=period, interval=interval)
+
+    def download(self, symbols, period=None, start=None):
+        """Download bars for many symbols in a single bulk request.
+
+        Returns a dict of symbol -> DataFrame; symbols without any bars are
+        left out so the caller can report them individually.
+        """
+        import yfinance as yf
+        kwargs = {"start": start} if start is not None else {"period": period}
+        data = yf.download(
+            list(symbols),
+            group_by="ticker",
+            actions=True,
+            auto_adjust=True,
+            ignore_tz=False,
+            threads=True,
+            progress=False,
+            **kwargs,
+        )
+        if data is None or data.empty:
+            return {}
+
+        histories = {}
+        tickers = data.columns.get_level_values(0)
+        for symbol in symbols:
+            if symbol not in tickers:
+                continue
+            hist = data[symbol].dropna(how="all")
+            if not hist.empty:
+                hist.columns.name = None
+                histories[symbol] = hist
+        return histories
+
+    def info(self, symbol):
+        """Fetch the company info dict for one symbol"""
+        import yfinance as yf
+        return yf.Ticker(symbol).info
+
+
+
+class TokenBucket:
+    """Token-bucket rate limiter; acquire() blocks until a token is available"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, returning how long the caller had to wait"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def is_rate_limited(error):
+    """Whether an upstream error means we are being throttled"""
+    text = f"{type(error).__name__} {error}".lower()
+    return "ratelimit" in text or "rate limit" in text or "too many requests" in text or "429" in text
+
+
+class ProviderClient:
+    """Provider wrapper that protects the upstream API under load.
+
+    Identical in-flight requests are coalesced into one upstream call,
+    every upstream call takes a token from a shared token bucket, and
+    throttling errors are retried with exponential backoff.
+    """
+
+    def __init__(self, provider, rate=2.0, burst=5, max_retries=3, backoff=1.0):
+        self.provider = provider
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.single_flight = SingleFlight()
+        self.metrics = {
+            "upstream_calls": 0,
+            "throttle_waits": 0,
+            "throttle_wait_seconds": 0.0,
+            "retries": 0,
+        }
+        self._metrics_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, provider):
+        return cls(
+            provider,
+            rate=float(os.environ.get("PROVIDER_RATE", "2")),
+            burst=int(os.environ.get("PROVIDER_BURST", "5")),
+        )
+
+    def _call(self, key, fn, *args, **kwargs):
+        def upstream():
+            for attempt in range(self.max_retries + 1):
+                waited = self.bucket.acquire()
+                if waited:
+                    self._count("throttle_waits")
+                    self._count("throttle_wait_seconds", waited)
+                self._count("upstream_calls")
+                try:
+                    with span(f"provider.{key[0]}"):
+                        return fn(*args, **kwargs)
+                except Exception as e:
+                    if attempt == self.max_retries or not is_rate_limited(e):
+                        raise
+                    self._count("retries")
+                    time.sleep(self.backoff * 2 ** attempt)
+
+        return self.single_flight.do(key, upstream)
+
+    def history(self, symbol, period=None, start=None, interval="1d"):
+        return self._call(("history", symbol, period, start, interval),
+                          self.provider.history, symbol, period=period, start=start,
+                          interval=interval)
+
+    def download(self, symbols, period=None, start=None):
+        return self._call(("download", tuple(symbols), period, start),
+                          self.provider.download, symbols, period=period, start=start)
+
+    def info(self, symbol):
+        return self._call(("info", symbol), self.provider.info, symbol)
+
+    def _count(self, name, amount=1):
+        # Counters are bumped from every session's thread
+        with self._metrics_lock:
+            self.metrics[name] += amount
+
+    def stats(self):
+        """Upstream call, coalescing and throttling counters"""
+        with self._metrics_lock:
+            return dict(self.metrics, coalesced=self.single_flight.shared)
@@ -0,0 +1,241 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.data_handler import StockDataHandler
+from utils.tracing import cache_event, span, traced
+
+TRADING_DAYS = 252
+RISK_WINDOW = 252  # Days behind the covariance, correlation and VaR
+BETA_WINDOW = 63   # Days behind each rolling beta
+VAR_LEVELS = (0.95, 0.99)
+RISK_BENCHMARK = os.environ.get("RISK_BENCHMARK", "SPY")
+
+
+class RollingMoments:
+    """Column sums and cross products of a trailing window of daily returns.
+
+    The window's rows are kept as float32 in a ring buffer, the sums in
+    float64. push() adds a new day and drops the oldest in O(symbols²),
+    where recomputing the covariance would cost O(window × symbols²). The
+    sums are rebuilt from the rows once per window of pushes, so rounding
+    drift stays bounded.
+    """
+
+    def __init__(self, rows):
+        self.rows = np.array(rows, dtype=np.float32)
+        self.window = len(self.rows)
+        self._start = 0  # Ring position of the oldest row
+        self._rebuild()
+
+    def _rebuild(self):
+        rows = self.rows.astype(np.float64)
+        self.sums = rows.sum(axis=0)
+        self.cross = rows.T @ rows
+        self._pushes = 0
+
+    def push(self, row):
+        row = np.asarray(row, dtype=np.float32)
+        oldest = self.rows[self._start].astype(np.float64)
+        self.rows[self._start] = row
+        self._start = (self._start + 1) % self.window
+        self._pushes += 1
+        if self._pushes >= self.window:
+            self._rebuild()
+            return
+        new = row.astype(np.float64)
+        self.sums += new - oldest
+        self.cross += np.outer(new, new) - np.outer(oldest, oldest)
+
+    def ordered(self):
+        """The window's rows, oldest first"""
+        return np.roll(self.rows, -self._start, axis=0)
+
+    def covariance(self):
+        n = self.window
+        return (self.cross - np.outer(self.sums, self.sums) / n) / (n - 1)
+
+    def correlation(self):
+        cov = self.covariance()
+        std = np.sqrt(np.maximum(np.diag(cov), 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.clip(cov / np.outer(std, std), -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+        return corr
+
+
+class BasketRisk:
+    """Risk analytics for a basket of symbols over one aligned return panel.
+
+    ``closes`` is a wide (dates × symbols) frame such as
+    StockDataHandler.close_panel returns. Daily returns are stored as one
+    float32 array starting at the first date every symbol has a price;
+    symbols with fewer prices than the risk window are left out
+    (``excluded``) rather than shortening it for everyone.
+    The benchmark column, if present, is used for betas only.
+    """
+
+    def __init__(self, closes, benchmark=None, window=RISK_WINDOW, beta_window=BETA_WINDOW):
+        self._lock = threading.Lock()
+        self.input_columns = list(closes.columns)
+
+        # Symbols listed too recently would shorten everyone's window
+        keep = closes.notna().sum() >= min(window + 1, len(closes))
+        self.excluded = [s for s in closes.columns[~keep] if s != benchmark]
+        closes = closes.loc[:, keep]
+        self.benchmark = benchmark if benchmark in closes.columns else None
+        closes = closes.iloc[closes.notna().all(axis=1).to_numpy().argmax():]
+
+        prices = closes.to_numpy(dtype=np.float64)
+        returns = (prices[1:] / prices[:-1] - 1).astype(np.float32)
+        self.dates = closes.index[1:]
+        columns = list(closes.columns)
+        self.market = None
+        if self.benchmark is not None:
+            self.market = returns[:, columns.index(self.benchmark)]
+            returns = np.delete(returns, columns.index(self.benchmark), axis=1)
+            columns.remove(self.benchmark)
+        self.symbols = columns
+        self.returns = returns
+        self.last_close = prices[-1]
+        self.columns = list(closes.columns)
+        self.beta_window = beta_window
+        self.window = min(window, len(returns))
+        if self.window < 2 or not self.symbols:
+            raise ValueError("Not enough overlapping history to compute risk")
+        self.moments = RollingMoments(returns[-self.window:])
+
+    def update(self, closes):
+        """Advance by the days added to ``closes`` since the last update.
+
+        Each new day is pushed into the rolling moments instead of
+        recomputing them. Returns False (and changes nothing) when the
+        basket or its past prices changed, which needs a rebuild.
+        """
+        if list(closes.columns) != self.input_columns:
+            return False
+        closes = closes[self.columns]
+        # Check and push under one lock, so sessions updating the same cached
+        # model concurrently cannot both push the same days
+        with self._lock:
+            last = self.dates[-1] if len(self.dates) else None
+            position = closes.index.searchsorted(last, side="right")
+            if position == 0 or closes.index[position - 1] != last:
+                return False
+            prices = closes.iloc[position - 1:].to_numpy(dtype=np.float64)
+            if not np.allclose(prices[0], self.last_close, equal_nan=True):
+                return False
+            if len(prices) == 1:
+                return True
+
+            returns = (prices[1:] / prices[:-1] - 1).astype(np.float32)
+            if self.benchmark is not None:
+                market = self.columns.index(self.benchmark)
+                self.market = np.concatenate([self.market, returns[:, market]])
+                returns = np.delete(returns, market, axis=1)
+            for row in returns:
+                self.moments.push(row)
+            self.returns = np.concatenate([self.returns, returns])
+            self.dates = self.dates.append(closes.index[position:])
+            self.last_close = prices[-1]
+        return True
+
+    def covariance(self, annualize=True):
+        cov = self.moments.covariance() * (TRADING_DAYS if annualize else 1)
+        return pd.DataFrame(cov, index=self.symbols, columns=self.symbols)
+
+    def correlation(self):
+        return pd.DataFrame(self.moments.correlation(), index=self.symbols, columns=self.symbols)
+
+    def rolling_beta(self):
+        """Beta of every symbol to the benchmark over trailing BETA_WINDOW days"""
+        if self.market is None or len(self.returns) < self.beta_window:
+            return pd.DataFrame(columns=self.symbols)
+        w = self.beta_window
+        r = self.returns.astype(np.float64)
+        m = self.market.astype(np.float64)[:, None]
+
+        def window_sums(values):
+            cumsum = np.concatenate([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+            return cumsum[w:] - cumsum[:-w]
+
+        sum_r, sum_m = window_sums(r), window_sums(m)
+        cov = window_sums(r * m) - sum_r * sum_m / w
+        var = window_sums(m * m) - sum_m * sum_m / w
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = cov / var
+        return pd.DataFrame(beta, index=self.dates[w - 1:], columns=self.symbols)
+
+    def value_at_risk(self, weights=None, levels=VAR_LEVELS):
+        """Historical one-day VaR and expected shortfall (in %) over the risk window.
+
+        One row per symbol plus "Portfolio" (equal weights by default),
+        with the annualized volatility and the latest beta.
+        """
+        rows = self.moments.ordered().astype(np.float64)
+        n = len(self.symbols)
+        weights = np.full(n, 1.0 / n) if weights is None else np.asarray(weights, dtype=float)
+        table = np.column_stack([rows, rows @ weights])
+        out = {}
+        for level in levels:
+            cutoff = np.quantile(table, 1 - level, axis=0)
+            tail = table <= cutoff
+            out[f"VaR {level:.0%}"] = -cutoff * 100
+            out[f"ES {level:.0%}"] = -(table * tail).sum(axis=0) / tail.sum(axis=0) * 100
+        cov = self.moments.covariance() * TRADING_DAYS
+        out["Volatility"] = np.sqrt(np.append(np.diag(cov), weights @ cov @ weights)) * 100
+        beta = self.rolling_beta()
+        if len(beta):
+            latest = beta.iloc[-1].to_numpy()
+            out["Beta"] = np.append(latest, weights @ latest)
+        return pd.DataFrame(out, index=pd.Index(self.symbols + ["Portfolio"], name="Symbol"))
+
+
+class RiskAnalytics:
+    # Basket risk models, least recently used first
+    cache = OrderedDict()
+    cache_size = 16
+    _lock = threading.Lock()
+
+    @staticmethod
+    @traced("risk.basket")
+    def basket(symbols, period="1y", benchmark=RISK_BENCHMARK, window=RISK_WINDOW):
+        """Risk model for a basket, from the histories StockDataHandler fetches.
+
+        Histories come from one bulk get_histories call and are aligned with
+        one join (StockDataHandler.close_panel). A cached model for the same
+        basket is advanced by the new days only. Returns ``(model, errors)``;
+        the model is None when there is not enough data.
+        """
+        symbols = [s for s in StockDataHandler.normalize_symbols(symbols) if s != benchmark]
+        histories, errors = StockDataHandler.get_histories(
+            symbols + ([benchmark] if benchmark else []), period)
+        if not any(s in histories for s in symbols):
+            return None, errors
+
+        with span("risk.align"):
+            closes = StockDataHandler.close_panel(histories)
+        key = (tuple(symbols), period, benchmark, window)
+        with RiskAnalytics._lock:
+            model = RiskAnalytics.cache.get(key)
+        if model is not None and model.update(closes):
+            cache_event("risk", True)
+            with RiskAnalytics._lock:
+                RiskAnalytics.cache.move_to_end(key)
+            return model, errors
+
+        cache_event("risk", False)
+        try:
+            with span("risk.build"):
+                model = BasketRisk(closes, benchmark, window)
+        except ValueError as e:
+            errors["basket"] = str(e)
+            return None, errors
+        with RiskAnalytics._lock:
+            RiskAnalytics.cache[key] = model
+            while len(RiskAnalytics.cache) > RiskAnalytics.cache_size:
+                RiskAnalytics.cache.popitem(last=False)
+        return model, errors
@@ -0,0 +1,324 @@
+import argparse
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.data_handler import StockDataHandler
+from utils.indicators import IndicatorSet
+from utils.tracing import cache_event, span, traced
+
+# Trading days kept per symbol: enough for SMA_200 and the 52-week range
+SCREEN_BARS = int(os.environ.get("SCREEN_BARS", "260"))
+YEAR_BARS = 252
+FIELDS = ("Close", "Volume", "High", "Low")
+
+# Columns of the screening snapshot, one row per symbol
+SNAPSHOT_COLUMNS = [
+    "Close", "Change_Pct", "Return_1M", "Return_3M", "Volume", "Volume_SMA_20", "Rel_Volume",
+    "SMA_20", "SMA_50", "SMA_200", "EMA_12", "EMA_26", "MACD", "MACD_Signal", "MACD_Hist",
+    "RSI", "BB_Upper", "BB_Lower", "ATR", "ATR_Pct", "High_52W", "Low_52W", "Pct_From_High",
+]
+
+OPERATORS = {
+    "<=": np.less_equal, ">=": np.greater_equal, "==": np.equal,
+    "!=": np.not_equal, "<": np.less, ">": np.greater,
+}
+_CONDITION = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*(\S+)\s*$")
+
+
+def parse_conditions(text):
+    """Parse screening conditions, one per line (or joined with "and").
+
+    Each condition compares a snapshot column with a number or another
+    column, e.g. ``RSI < 30`` or ``Volume > Volume_SMA_20``. Returns a list
+    of (column, operator, number or column name); raises ValueError on
+    anything else.
+    """
+    conditions = []
+    for part in re.split(r"\n|;|\band\b", text or "", flags=re.IGNORECASE):
+        if not part.strip():
+            continue
+        match = _CONDITION.match(part)
+        if match is None:
+            raise ValueError(f"Cannot read condition {part.strip()!r}; use e.g. 'RSI < 30'")
+        column, op, operand = match.groups()
+        if column not in SNAPSHOT_COLUMNS:
+            raise ValueError(f"Unknown column {column!r}")
+        try:
+            operand = float(operand)
+        except ValueError:
+            if operand not in SNAPSHOT_COLUMNS:
+                raise ValueError(f"{operand!r} is neither a number nor a column") from None
+        conditions.append((column, op, operand))
+    return conditions
+
+
+class UniversePanel:
+    """Wide (dates, symbols) arrays of the recent bars of every stored history.
+
+    Each symbol's last SCREEN_BARS bars are read from the history store once
+    and kept until its Parquet file changes. The per-symbol tails are also
+    saved together in one ``screener_panel.npz`` next to the histories, so a
+    restarted worker reads one file instead of one per symbol. Dates before a
+    symbol's first bar are NaN; days a listed symbol did not trade repeat its
+    last prices with zero volume.
+    """
+
+    def __init__(self, store=None, bars=SCREEN_BARS):
+        self.store = store
+        self.bars = bars
+        self.version = 0
+        self._tails = {}  # symbol -> (mtime, dates as int64 ns, (fields, bars) values)
+        self._panel = None
+        self._loaded_file = False
+        self._lock = threading.Lock()
+
+    @property
+    def _store(self):
+        return self.store or StockDataHandler.history_store
+
+    @property
+    def path(self):
+        return self._store.root / "screener_panel.npz"
+
+    def _stat(self):
+        """Modification time of every stored history, keyed by symbol"""
+        try:
+            entries = list(os.scandir(self._store.root))
+        except OSError:
+            return {}
+        return {entry.name[:-len(".parquet")]: entry.stat().st_mtime
+                for entry in entries if entry.name.endswith(".parquet")}
+
+    def _read_tail(self, symbol):
+        history = self._store.load(symbol)
+        if history is None or history.empty or "Close" not in history.columns:
+            # Kept as an empty tail, so an unreadable file is not retried until it changes
+            return np.empty(0, dtype=np.int64), np.empty((len(FIELDS), 0))
+        history = history.iloc[-self.bars:]
+        index = pd.DatetimeIndex(history.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        values = np.vstack([
+            history[field].to_numpy(dtype=float) if field in history.columns
+            else np.full(len(history), np.nan) for field in FIELDS
+        ])
+        return index.normalize().as_unit("ns").asi8, values
+
+    def _load_file(self):
+        """Per-symbol tails from the consolidated file, if it was written with the same bar count"""
+        try:
+            with np.load(self.path) as archive:
+                saved = {key: archive[key] for key in archive.files}  # Each access rereads the zip
+            if int(saved["bars"]) != self.bars:
+                return
+            offsets, mtimes, dates, values = (saved[key] for key in ("offsets", "mtimes", "dates", "values"))
+        except (OSError, ValueError, KeyError):
+            return
+        for i, symbol in enumerate(saved["symbols"].tolist()):
+            rows = slice(offsets[i], offsets[i + 1])
+            self._tails[symbol] = (float(mtimes[i]), dates[rows], values[:, rows])
+
+    def _save_file(self):
+        symbols = sorted(self._tails)
+        if not symbols:
+            return
+        tails = [self._tails[s] for s in symbols]
+        offsets = np.concatenate([[0], np.cumsum([len(t[1]) for t in tails])])
+        tmp_path = self.path.with_name(f"screener_panel.{os.getpid()}.tmp.npz")
+        try:
+            np.savez(tmp_path, bars=self.bars, symbols=np.array(symbols),
+                     mtimes=np.array([t[0] for t in tails]), offsets=offsets,
+                     dates=np.concatenate([t[1] for t in tails]),
+                     values=np.concatenate([t[2] for t in tails], axis=1))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+    def _build(self):
+        symbols = sorted(self._tails)
+        dates = np.unique(np.concatenate([self._tails[s][1] for s in symbols] or [[]]))[-self.bars:]
+        if not len(dates):
+            return {"symbols": [], "dates": pd.DatetimeIndex([]),
+                    **{field: np.empty((0, 0)) for field in FIELDS}}
+        panel = np.full((len(FIELDS), len(dates), len(symbols)), np.nan)
+        for j, symbol in enumerate(symbols):
+            _, own_dates, values = self._tails[symbol]
+            keep = own_dates >= dates[0]
+            panel[:, np.searchsorted(dates, own_dates[keep]), j] = values[:, keep]
+
+        # Days a listed symbol did not trade keep its last prices, with no volume
+        known = ~np.isnan(panel[0])
+        rows = np.maximum.accumulate(np.where(known, np.arange(len(dates))[:, None], 0), axis=0)
+        listed = np.maximum.accumulate(known, axis=0)
+        for i, field in enumerate(FIELDS):
+            if field == "Volume":
+                panel[i][listed & ~known] = 0.0
+            else:
+                panel[i] = panel[i][rows, np.arange(len(symbols))]
+        return {"symbols": symbols, "dates": pd.DatetimeIndex(dates),
+                **{field: panel[i] for i, field in enumerate(FIELDS)}}
+
+    def get(self):
+        """The current panel: symbols, dates and one (dates, symbols) array per field"""
+        with span("screener.panel"):
+            mtimes = self._stat()
+            with self._lock:
+                if not self._loaded_file:
+                    self._loaded_file = True
+                    self._load_file()
+                stale = [s for s, mtime in mtimes.items()
+                         if s not in self._tails or self._tails[s][0] != mtime]
+                removed = [s for s in self._tails if s not in mtimes]
+                cache_event("screener_panel", self._panel is not None and not stale and not removed)
+                if self._panel is not None and not stale and not removed:
+                    return self._panel
+
+                for symbol in removed:
+                    del self._tails[symbol]
+                for symbol in stale:
+                    self._tails[symbol] = (mtimes[symbol],) + self._read_tail(symbol)
+                if stale or removed:
+                    self._save_file()
+                self._panel = self._build()
+                self.version += 1
+                return self._panel
+
+
+def _at(values, rows):
+    """values[rows[j], j] for every symbol j, NaN where the row is before the panel"""
+    cols = np.arange(values.shape[1])
+    out = values[np.maximum(rows, 0), cols]
+    return np.where(rows >= 0, out, np.nan)
+
+
+def snapshot_frame(panel):
+    """One row of SNAPSHOT_COLUMNS per symbol, taken at its last known bar.
+
+    Every indicator is computed for the whole panel at once by one
+    IndicatorSet, then read off at each symbol's last row.
+    """
+    close, volume, high, low = (panel[field] for field in FIELDS)
+    if close.size == 0:
+        return pd.DataFrame(columns=["As_Of"] + SNAPSHOT_COLUMNS, index=pd.Index([], name="Symbol"))
+    indicators = IndicatorSet(close, volume, high, low)
+    known = ~np.isnan(close)
+    last = len(close) - 1 - np.argmax(known[::-1], axis=0)
+    last[~known.any(axis=0)] = -1
+
+    def at(values, back=0):
+        return _at(values, last - back)
+
+    price = at(close)
+    volume_sma = indicators.rolling_sum("volume", volume, 20) / 20
+    macd, signal, histogram = indicators.macd()
+    upper, _, lower = indicators.bollinger()
+    year = slice(-YEAR_BARS, None)
+    high_52w = np.fmax.reduce(np.where(np.isnan(high), close, high)[year], axis=0)
+    low_52w = np.fmin.reduce(np.where(np.isnan(low), close, low)[year], axis=0)
+    atr = at(indicators.atr())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns = {
+            "Close": price,
+            "Change_Pct": (price / at(close, 1) - 1) * 100,
+            "Return_1M": (price / at(close, 21) - 1) * 100,
+            "Return_3M": (price / at(close, 63) - 1) * 100,
+            "Volume": at(volume),
+            "Volume_SMA_20": at(volume_sma),
+            "Rel_Volume": at(volume) / at(volume_sma),
+            "SMA_20": at(indicators.sma(20)),
+            "SMA_50": at(indicators.sma(50)),
+            "SMA_200": at(indicators.sma(200)),
+            "EMA_12": at(indicators.ema(12)),
+            "EMA_26": at(indicators.ema(26)),
+            "MACD": at(macd),
+            "MACD_Signal": at(signal),
+            "MACD_Hist": at(histogram),
+            "RSI": at(indicators.rsi()),
+            "BB_Upper": at(upper),
+            "BB_Lower": at(lower),
+            "ATR": atr,
+            "ATR_Pct": atr / price * 100,
+            "High_52W": high_52w,
+            "Low_52W": low_52w,
+            "Pct_From_High": (price / high_52w - 1) * 100,
+        }
+    frame = pd.DataFrame(columns, index=pd.Index(panel["symbols"], name="Symbol"))
+    frame.insert(0, "As_Of", panel["dates"][np.maximum(last, 0)])
+    return frame[last >= 0]
+
+
+class StockScreener:
+    universe = UniversePanel()
+    _snapshot = (None, None)  # (panel version, frame)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def snapshot():
+        """Snapshot of every stored symbol, rebuilt only when the panel changes"""
+        panel = StockScreener.universe.get()
+        version = StockScreener.universe.version
+        with StockScreener._lock:
+            cached_version, frame = StockScreener._snapshot
+            cache_event("screener_snapshot", cached_version == version)
+            if cached_version == version:
+                return frame
+        with span("screener.snapshot"):
+            frame = snapshot_frame(panel)
+        with StockScreener._lock:
+            StockScreener._snapshot = (version, frame)
+        return frame
+
+    @staticmethod
+    def mask(snapshot, conditions):
+        """Boolean array of the symbols meeting every condition (NaN never matches)"""
+        mask = np.ones(len(snapshot), dtype=bool)
+        for column, op, operand in conditions:
+            left = snapshot[column].to_numpy(dtype=float)
+            right = operand if isinstance(operand, float) else snapshot[operand].to_numpy(dtype=float)
+            mask &= OPERATORS[op](left, right) & ~np.isnan(left) & ~np.isnan(right)
+        return mask
+
+    @staticmethod
+    @traced("screener.screen")
+    def screen(conditions, sort_by="Change_Pct", ascending=False, page=1, page_size=25):
+        """Screen the stored universe.
+
+        ``conditions`` is the text accepted by parse_conditions (or its
+        parsed list). Matches are ranked by ``sort_by`` with NaN last and
+        cut into pages. Returns ``(rows of the page, number of matches)``.
+        """
+        if isinstance(conditions, str):
+            conditions = parse_conditions(conditions)
+        if sort_by not in SNAPSHOT_COLUMNS:
+            raise ValueError(f"Unknown column {sort_by!r}")
+        snapshot = StockScreener.snapshot()
+        matches = snapshot[StockScreener.mask(snapshot, conditions)]
+        ranked = matches.sort_values(sort_by, ascending=ascending, na_position="last", kind="stable")
+        start = (max(int(page), 1) - 1) * page_size
+        return ranked.iloc[start:start + page_size], len(ranked)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen the symbols in the local history store")
+    parser.add_argument("conditions", nargs="*", help="conditions such as 'RSI < 30'")
+    parser.add_argument("--sort", default="Change_Pct", help="column to rank by")
+    parser.add_argument("--ascending", action="store_true")
+    parser.add_argument("--limit", type=int, default=25)
+    args = parser.parse_args(argv)
+
+    try:
+        rows, total = StockScreener.screen("\n".join(args.conditions), args.sort, args.ascending,
+                                           page_size=args.limit)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"{total} of {len(StockScreener.snapshot())} symbols match")
+    if total:
+        print(rows.to_string(float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
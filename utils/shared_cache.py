@@ -0,0 +1,425 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process single-flight only
+    fcntl = None
+
+INFO_METADATA_KEY = b"stock_info"
+FRESH_METADATA_KEY = b"fresh_until"
+
+# Delete a Redis lock only if it still holds our token (it may have expired and been re-taken)
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def encode_entry(entry, fresh_until):
+    """Serialize a {"history": DataFrame or CompactHistory, "info": dict} entry as Arrow IPC bytes"""
+    import pyarrow as pa
+    history = entry["history"]
+    if hasattr(history, "frame"):  # CompactHistory: stored with its float32/uint32 columns
+        history = history.frame()
+    table = pa.Table.from_pandas(history, preserve_index=True)
+    metadata = dict(table.schema.metadata or {})
+    metadata[INFO_METADATA_KEY] = json.dumps(entry.get("info") or {}, default=str).encode()
+    metadata[FRESH_METADATA_KEY] = repr(fresh_until).encode()
+    table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def decode_entry(buffer, types_mapper=None):
+    """Inverse of encode_entry, returning (entry, fresh_until).
+
+    Reads straight from the (possibly memory-mapped) buffer.
+    """
+    import pyarrow as pa
+    if isinstance(buffer, bytes):
+        buffer = pa.py_buffer(buffer)
+    table = pa.ipc.open_file(buffer).read_all()
+    metadata = table.schema.metadata or {}
+    info = json.loads(metadata.get(INFO_METADATA_KEY, b"{}"))
+    fresh_until = float(metadata.get(FRESH_METADATA_KEY, b"0"))
+    history = table.to_pandas(types_mapper=types_mapper)
+    return {"history": history, "info": info}, fresh_until
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.shared = 0  # Calls answered by another caller's execution
+
+    def do(self, key, fn):
+        """Run fn() once per key at a time; concurrent callers share the result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["event"].set()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+
+class CacheBackend:
+    """Base class for the stock data cache backends.
+
+    Subclasses implement get_item/set; get_or_compute adds single-flighting
+    so that concurrent cold misses for the same key compute the value once,
+    within a process and (where the backend supports it) across processes.
+
+    Entries are fresh for ``ttl`` seconds and then kept for ``stale_ttl``
+    more: during that window the stale value is served immediately while
+    one background refresh fetches a new one.
+    """
+
+    def __init__(self, stale_ttl=0):
+        self.stale_ttl = stale_ttl
+        self.single_flight = SingleFlight()
+        self.metrics = {"hits": 0, "misses": 0, "stale_serves": 0, "background_refreshes": 0,
+                        "refresh_failures": 0, "last_refresh_error": None}
+        self._metrics_lock = threading.Lock()
+
+    def _count(self, name, **values):
+        # Counters are bumped from session and refresh threads alike
+        with self._metrics_lock:
+            self.metrics[name] += 1
+            self.metrics.update(values)
+
+    def stats(self):
+        """A consistent copy of the hit, miss and refresh counters"""
+        with self._metrics_lock:
+            return dict(self.metrics)
+
+    def get_item(self, key):
+        """Return (value, fresh_until) for an unexpired entry, else None"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return the value for key if it is still fresh"""
+        item = self.get_item(key)
+        if item is None or item[1] < time.time():
+            return None
+        return item[0]
+
+    @contextmanager
+    def lock(self, key):
+        """Cross-process lock for a key; in-process only by default"""
+        yield
+
+    def get_or_compute(self, key, ttl, compute, refresh=None):
+        """Return the cached value for key, computing it once on a miss.
+
+        None results are not cached, so failures are retried next time.
+        ``refresh`` replaces ``compute`` for background revalidation, which
+        runs outside any Streamlit script, so it must not call Streamlit.
+        """
+        item = self.get_item(key)
+        if item is not None:
+            value, fresh_until = item
+            if fresh_until >= time.time():
+                self._count("hits")
+                return value
+            # Stale but usable: serve it and revalidate in the background
+            self._count("stale_serves")
+            self._revalidate(key, ttl, refresh or compute)
+            return value
+        self._count("misses")
+
+        def fill():
+            with self.lock(key):
+                # Another process may have filled the key while we waited
+                cached = self.get(key)
+                if cached is not None:
+                    return cached
+                result = compute()
+                if result is not None:
+                    self.set(key, result, ttl)
+                return result
+
+        return self.single_flight.do(key, fill)
+
+    def _revalidate(self, key, ttl, compute):
+        refresh_key = f"refresh:{key}"
+        if self.single_flight.in_flight(refresh_key):
+            return
+
+        def refresh():
+            result = compute()
+            if result is None:
+                raise LookupError(f"No data returned for {key}")
+            self.set(key, result, ttl)
+
+        def run():
+            try:
+                self.single_flight.do(refresh_key, refresh)
+            except Exception as e:
+                # Keep serving the stale value; the next stale read retries
+                self._count("refresh_failures", last_refresh_error=str(e))
+
+        self._count("background_refreshes")
+        threading.Thread(target=run, name="cache-refresh", daemon=True).start()
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process cache handing the same objects to every caller (no copies)"""
+
+    def __init__(self, max_entries=512, stale_ttl=0):
+        super().__init__(stale_ttl)
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_item(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires, fresh_until, value = item
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            return value, fresh_until
+
+    def set(self, key, value, ttl):
+        fresh_until = time.time() + ttl
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # Drop the entry closest to expiry
+                oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                del self._entries[oldest]
+            self._entries[key] = (fresh_until + self.stale_ttl, fresh_until, value)
+
+
+class FileLockMixin:
+    """Cross-process single-flight through flock on per-key lock files"""
+
+    lock_dir = None
+
+    @contextmanager
+    def lock(self, key):
+        if fcntl is None:
+            yield
+            return
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+        with open(self.lock_dir / f"{digest}.lock", "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SQLiteCacheBackend(FileLockMixin, CacheBackend):
+    """Host-wide cache in a SQLite file, values stored as Arrow IPC blobs.
+
+    Expired rows are deleted by the first write after every
+    ``prune_interval`` seconds, so the file does not keep growing with
+    symbols nobody asks for again.
+    """
+
+    def __init__(self, path, stale_ttl=0, prune_interval=3600):
+        super().__init__(stale_ttl)
+        self.prune_interval = prune_interval
+        self._last_prune = time.time()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock_dir = self.path.parent / f"{self.path.name}.locks"
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, expires REAL NOT NULL, payload BLOB NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+
+    def get_item(self, key):
+        row = self._connect().execute(
+            "SELECT expires, payload FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        return decode_entry(row[1])
+
+    def set(self, key, value, ttl):
+        fresh_until = time.time() + ttl
+        payload = encode_entry(value, fresh_until).to_pybytes()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, expires, payload) VALUES (?, ?, ?)",
+                (key, fresh_until + self.stale_ttl, payload),
+            )
+        if time.time() - self._last_prune >= self.prune_interval:
+            self.prune()
+
+    def prune(self):
+        """Delete every expired row; returns how many were removed"""
+        self._last_prune = time.time()
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM cache WHERE expires < ?", (time.time(),)).rowcount
+
+
+class ArrowFileCacheBackend(FileLockMixin, CacheBackend):
+    """Host-wide cache of memory-mapped Arrow IPC files, one per key.
+
+    Readers map the file instead of reading it into a Python bytes object;
+    with ``zero_copy=True`` they get Arrow-backed frames that reference the
+    mapping directly instead of NumPy copies.
+    """
+
+    def __init__(self, root, zero_copy=False, stale_ttl=0):
+        super().__init__(stale_ttl)
+        self.root = Path(root)
+        self.lock_dir = self.root / "locks"
+        self.zero_copy = zero_copy
+
+    def _path(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        return self.root / f"{digest}.arrow"
+
+    def get_item(self, key):
+        import pyarrow as pa
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) < time.time():  # mtime holds the expiry
+                return None
+            source = pa.memory_map(str(path))
+        except OSError:
+            return None
+        return decode_entry(source, pd.ArrowDtype if self.zero_copy else None)
+
+    def set(self, key, value, ttl):
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        fresh_until = time.time() + ttl
+        with open(tmp_path, "wb") as f:
+            f.write(encode_entry(value, fresh_until))
+        expires = fresh_until + self.stale_ttl
+        os.utime(tmp_path, (expires, expires))
+        os.replace(tmp_path, path)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Cache in Redis (or any client with the same get/set API, e.g. a local stand-in)"""
+
+    def __init__(self, url=None, client=None, lock_timeout=30, stale_ttl=0):
+        super().__init__(stale_ttl)
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.lock_timeout = lock_timeout
+
+    def get_item(self, key):
+        payload = self.client.get(key)
+        if payload is None:
+            return None
+        return decode_entry(payload)
+
+    def set(self, key, value, ttl):
+        fresh_until = time.time() + ttl
+        payload = encode_entry(value, fresh_until).to_pybytes()
+        self.client.set(key, payload, ex=max(int(ttl + self.stale_ttl), 1))
+
+    @contextmanager
+    def lock(self, key):
+        """SET NX lock with an expiry, so a crashed holder cannot block forever.
+
+        If the lock is still held after lock_timeout seconds the caller goes
+        ahead unlocked (it rechecks the cache first) and leaves the other
+        holder's lock alone.
+        """
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex.encode()
+        deadline = time.time() + self.lock_timeout
+        acquired = False
+        while True:
+            acquired = bool(self.client.set(lock_key, token, nx=True,
+                                            px=int(self.lock_timeout * 1000)))
+            if acquired or time.time() > deadline:
+                break
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if acquired:
+                self.client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+
+def cache_backend_from_env():
+    """Build the backend named by STOCK_CACHE_BACKEND.
+
+    ``memory`` (default), ``sqlite:///path/cache.db``, ``arrow:///path/dir``
+    or a ``redis://`` URL. As with SQLAlchemy URLs, paths after ``///`` are
+    relative; use four slashes for an absolute path. Query options:
+    ``arrow:///dir?zero_copy=1`` serves Arrow-backed frames that reference
+    the mapped files, ``sqlite:///cache.db?prune_interval=600`` sets how
+    often expired rows are deleted (seconds). STOCK_CACHE_STALE_TTL sets
+    how long expired entries are still served while revalidating.
+    """
+    spec = os.environ.get("STOCK_CACHE_BACKEND", "memory")
+    stale_ttl = float(os.environ.get("STOCK_CACHE_STALE_TTL", "600"))
+    if spec.startswith(("sqlite:///", "arrow:///")):
+        spec, _, query = spec.partition("?")
+        options = {name: values[-1] for name, values in parse_qs(query).items()}
+        if spec.startswith("sqlite:///"):
+            return SQLiteCacheBackend(spec[len("sqlite:///"):], stale_ttl=stale_ttl,
+                                      prune_interval=float(options.get("prune_interval", 3600)))
+        return ArrowFileCacheBackend(spec[len("arrow:///"):], stale_ttl=stale_ttl,
+                                     zero_copy=options.get("zero_copy", "0").lower() in ("1", "true", "yes"))
+    if spec.startswith(("redis://", "rediss://")):
+        return RedisCacheBackend(spec, stale_ttl=stale_ttl)
+    return MemoryCacheBackend(stale_ttl=stale_ttl)
@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+
+SIMULATION_METHODS = ("bootstrap", "gbm")
+BAND_LABELS = {None: "None", "bootstrap": "Bootstrap", "gbm": "GBM"}
+SIMULATION_PATHS = int(os.environ.get("SIMULATION_PATHS", "10000"))
+BAND_QUANTILES = (0.05, 0.5, 0.95)
+# Bars of history the shocks are calibrated on
+CALIBRATION_BARS = 252
+# Upper bound on the working arrays of one chunk of steps
+CHUNK_BYTES = int(float(os.environ.get("SIMULATION_CHUNK_MB", "64")) * 2**20)
+
+
+def daily_log_returns(close, bars=CALIBRATION_BARS):
+    """Log returns of the last `bars` closes, non-finite values dropped"""
+    close = np.asarray(close, dtype=float)[-bars - 1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(close))
+    return returns[np.isfinite(returns)]
+
+
+def simulate_quantiles(last_close, periods, returns, method="bootstrap", center=None,
+                       paths=SIMULATION_PATHS, quantiles=BAND_QUANTILES, chunk_bytes=CHUNK_BYTES,
+                       seed=None):
+    """Price quantiles of simulated paths, shape (len(quantiles), periods).
+
+    Paths are compounded around ``center`` (the point forecast), so the
+    median follows the model: ``bootstrap`` resamples the demeaned daily
+    log returns, ``gbm`` draws normal log returns with their volatility.
+    Without a center, paths start from the last close; the bootstrap stays
+    flat and ``gbm`` also applies the drift of ``returns``.
+
+    Every path advances together: each step is one row of a (steps, paths)
+    array filled by one random draw and one cumulative sum, and quantiles
+    are taken across the row in log space. Horizons whose arrays would
+    exceed ``chunk_bytes`` are simulated a block of steps at a time,
+    carrying each path's level over, which gives the same result.
+    """
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f"Unknown simulation method {method!r}; choose from {', '.join(SIMULATION_METHODS)}")
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) < 2:
+        raise ValueError("At least two returns are needed to calibrate the simulation")
+
+    base = np.log(last_close if center is None else np.asarray(center, dtype=float))
+    if method == "gbm":
+        # The forecast already carries the trend; only the drift-free GBM is unconditional
+        drift = returns.mean() if center is None else 0.0
+        volatility = returns.std(ddof=1)
+    else:
+        residuals = returns - returns.mean()
+
+    rng = np.random.default_rng(seed)
+    quantiles = np.asarray(quantiles, dtype=float)
+    out = np.empty((len(quantiles), periods))
+    level = np.zeros(paths)
+    # Shocks plus, for the bootstrap, the int64 draw indices
+    step = max(1, chunk_bytes // (paths * (16 if method == "bootstrap" else 8)))
+    for start in range(0, periods, step):
+        n = min(step, periods - start)
+        if method == "gbm":
+            shocks = rng.standard_normal((n, paths))
+            shocks *= volatility
+            shocks += drift
+        else:
+            shocks = residuals[rng.integers(0, len(residuals), size=(n, paths))]
+        np.cumsum(shocks, axis=0, out=shocks)
+        shocks += level
+        level = shocks[-1].copy()
+        out[:, start:start + n] = np.quantile(shocks, quantiles, axis=1)
+    return np.exp(out + base)
@@ -0,0 +1,324 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.features import FEATURES, FeatureState
+from utils.shared_cache import SingleFlight
+from utils.tracing import traced, tracer
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Supported live bar sizes
+LIVE_INTERVALS = {
+    "1m": pd.Timedelta(minutes=1),
+    "2m": pd.Timedelta(minutes=2),
+    "5m": pd.Timedelta(minutes=5),
+    "15m": pd.Timedelta(minutes=15),
+}
+
+
+class LiveSeries:
+    """Rolling window of intraday bars for one symbol, with incremental features.
+
+    Bars live in preallocated arrays twice the window size; when the end is
+    reached the last ``window`` rows are moved to the front, so appends are
+    amortized O(1) and memory stays bounded. ``version`` counts every bar
+    ever appended, which lets viewers ask for just the bars they have not
+    seen yet.
+    """
+
+    def __init__(self, symbol, window=2000):
+        self.symbol = symbol
+        self.window = window
+        self.tz = None
+        self.version = 0
+        self.state = FeatureState()
+        self.last_access = time.monotonic()
+        self._times = np.empty(2 * window, dtype=np.int64)
+        self._bars = np.empty((2 * window, len(BAR_COLUMNS)))
+        self._features = np.empty((2 * window, len(FEATURES)))
+        self._start = 0
+        self._stop = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._stop - self._start
+
+    @property
+    def last_time(self):
+        """Timestamp of the newest bar, or None before the first append"""
+        with self._lock:
+            if self._stop == self._start:
+                return None
+            return pd.Timestamp(self._times[self._stop - 1], tz="UTC").tz_convert(self.tz)
+
+    def append(self, bars):
+        """Append the bars newer than the last one; returns how many were added"""
+        if bars is None or len(bars) == 0:
+            return 0
+        index = pd.DatetimeIndex(bars.index)
+        if index.tz is None:
+            index = index.tz_localize("UTC")
+        times = index.as_unit("ns").asi8
+        values = bars[BAR_COLUMNS].to_numpy(dtype=float)
+
+        with self._lock:
+            if self.tz is None:
+                self.tz = index.tz
+            if self._stop > self._start:
+                keep = times > self._times[self._stop - 1]
+                times, values = times[keep], values[keep]
+            if len(times) > self.window:
+                # Only the last window bars can be kept; the state still sees them all
+                for close, volume in values[:-self.window, [3, 4]]:
+                    self.state.update(float(close), float(volume))
+                self.version += len(times) - self.window
+                times, values = times[-self.window:], values[-self.window:]
+
+            for t, row in zip(times, values):
+                if self._stop == len(self._times):
+                    self._compact()
+                self._times[self._stop] = t
+                self._bars[self._stop] = row
+                self._features[self._stop] = self.state.update(float(row[3]), float(row[4]))
+                self._stop += 1
+                if self._stop - self._start > self.window:
+                    self._start += 1
+            self.version += len(times)
+            return len(times)
+
+    def _compact(self):
+        n = self._stop - self._start
+        for array in (self._times, self._bars, self._features):
+            array[:n] = array[self._start:self._stop]
+        self._start, self._stop = 0, n
+
+    def _frame(self, start, stop):
+        index = pd.DatetimeIndex(self._times[start:stop], tz="UTC").tz_convert(self.tz)
+        return pd.DataFrame(self._bars[start:stop].copy(), index=index, columns=BAR_COLUMNS)
+
+    def frame(self):
+        """Copy of the current window as an OHLCV DataFrame"""
+        with self._lock:
+            return self._frame(self._start, self._stop)
+
+    def since(self, version):
+        """Return (bars appended after version, current version).
+
+        The bars are None when some of them already left the window, in
+        which case the caller should rebuild from frame().
+        """
+        with self._lock:
+            missing = self.version - version
+            if missing < 0 or missing > self._stop - self._start:
+                return None, self.version
+            return self._frame(self._stop - missing, self._stop), self.version
+
+    def latest_features(self):
+        """Feature row (FEATURES order) of the newest bar, as a dict"""
+        with self._lock:
+            if self._stop == self._start:
+                return {}
+            return dict(zip(FEATURES, self._features[self._stop - 1].tolist()))
+
+
+def closed_bars(bars, interval, now=None):
+    """Drop the trailing bar if it is still forming"""
+    if bars is None or len(bars) == 0:
+        return bars
+    now = pd.Timestamp.now(tz="UTC") if now is None else now
+    last = bars.index[-1]
+    if last.tzinfo is None:
+        last = last.tz_localize("UTC")
+    if last + LIVE_INTERVALS[interval] > now:
+        return bars.iloc[:-1]
+    return bars
+
+
+class ProviderFeed:
+    """Polls the market data provider for bars after the last one seen"""
+
+    def __init__(self, provider, interval="1m", period="1d"):
+        self.provider = provider
+        self.interval = interval
+        self.period = period
+
+    def poll(self, symbol, since=None):
+        if since is None:
+            bars = self.provider.history(symbol, period=self.period, interval=self.interval)
+        else:
+            bars = self.provider.history(symbol, start=since, interval=self.interval)
+        return closed_bars(bars, self.interval)
+
+
+class ReplayFeed:
+    """Replays recorded bars from a CSV or Parquet file instead of polling upstream.
+
+    Files with a ``Symbol`` column are split per symbol; otherwise the one
+    recording is served for every symbol. The first poll returns
+    ``initial_bars`` bars and every later poll the next ``bars_per_poll``.
+    """
+
+    def __init__(self, source, bars_per_poll=1, initial_bars=200):
+        if isinstance(source, pd.DataFrame):
+            data = source
+        else:
+            path = Path(source)
+            if path.suffix == ".parquet":
+                data = pd.read_parquet(path)
+            else:
+                data = pd.read_csv(path, index_col=0, parse_dates=[0])
+        if "Symbol" in data.columns:
+            self.recordings = {s: g.drop(columns="Symbol") for s, g in data.groupby("Symbol")}
+        else:
+            self.recordings = {None: data}
+        self.bars_per_poll = bars_per_poll
+        self.initial_bars = initial_bars
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    def poll(self, symbol, since=None):
+        recording = self.recordings.get(symbol, self.recordings.get(None))
+        if recording is None:
+            return None
+        with self._lock:
+            cursor = self._cursors.get(symbol, 0)
+            step = self.initial_bars if cursor == 0 else self.bars_per_poll
+            self._cursors[symbol] = min(cursor + step, len(recording))
+        return recording.iloc[cursor:cursor + step]
+
+
+class StreamHub:
+    """One upstream poller shared by every viewer of every live symbol.
+
+    Viewers call subscribe() on each render and read from the returned
+    LiveSeries; a single background thread polls the feed for each
+    subscribed symbol once per interval. Symbols nobody has read for
+    ``idle_timeout`` seconds are dropped. Bars can also be pushed in with
+    push(), e.g. from a websocket client, instead of polling.
+    """
+
+    def __init__(self, feed, poll_interval=5.0, window=2000, idle_timeout=300.0):
+        self.feed = feed
+        self.poll_interval = poll_interval
+        self.window = window
+        self.idle_timeout = idle_timeout
+        self.series = {}
+        self.single_flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.metrics = {"polls": 0, "bars": 0, "errors": 0, "last_error": None}
+        self._metrics_lock = threading.Lock()
+
+    def subscribe(self, symbol):
+        """Return the live series for a symbol, loading its first bars on first use"""
+        with self._lock:
+            series = self.series.get(symbol)
+        if series is None:
+            # Concurrent first viewers share one initial load
+            series = self.single_flight.do(("subscribe", symbol), lambda: self._load(symbol))
+        series.last_access = time.monotonic()
+        self.start()
+        return series
+
+    def _load(self, symbol):
+        with self._lock:
+            series = self.series.get(symbol)
+        if series is not None:
+            return series
+        series = LiveSeries(symbol, self.window)
+        self._poll(series)
+        with self._lock:
+            return self.series.setdefault(symbol, series)
+
+    def push(self, symbol, bars):
+        """Append bars delivered by a push feed"""
+        with self._lock:
+            series = self.series.setdefault(symbol, LiveSeries(symbol, self.window))
+        return series.append(bars)
+
+    def _poll(self, series):
+        bars = self.feed.poll(series.symbol, series.last_time)
+        self._count(polls=1, bars=series.append(bars))
+
+    def _count(self, last_error=None, **increments):
+        # First loads run on session threads, later polls on the poller thread
+        with self._metrics_lock:
+            for name, amount in increments.items():
+                self.metrics[name] += amount
+            if last_error is not None:
+                self.metrics["last_error"] = last_error
+
+    def stats(self):
+        """A consistent copy of the poll, bar and error counters"""
+        with self._metrics_lock:
+            return dict(self.metrics)
+
+    @traced("stream.poll")
+    def poll_once(self):
+        """Poll every subscribed symbol once, dropping the idle ones"""
+        now = time.monotonic()
+        with self._lock:
+            for symbol in [s for s, series in self.series.items()
+                           if now - series.last_access > self.idle_timeout]:
+                del self.series[symbol]
+            subscribed = list(self.series.values())
+        for series in subscribed:
+            try:
+                self._poll(series)
+            except Exception as e:
+                self._count(errors=1, last_error=str(e))
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            self.poll_once()
+
+    def start(self):
+        """Start the poller thread (no-op if it is running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="stream-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+STREAM_POLL_INTERVAL = float(os.environ.get("STREAM_POLL_INTERVAL", "5"))
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+def get_hub(interval="1m"):
+    """Return the process-wide hub for a bar size.
+
+    Set STREAM_REPLAY_FILE to replay a recorded CSV/Parquet file instead of
+    polling Yahoo Finance; STREAM_WINDOW bounds the bars kept per symbol
+    (default 2000).
+    """
+    with _hubs_lock:
+        hub = _hubs.get(interval)
+        if hub is None:
+            replay = os.environ.get("STREAM_REPLAY_FILE")
+            if replay:
+                feed = ReplayFeed(replay)
+            else:
+                from utils.data_handler import StockDataHandler
+                feed = ProviderFeed(StockDataHandler.provider, interval)
+            hub = StreamHub(feed, poll_interval=STREAM_POLL_INTERVAL,
+                            window=int(os.environ.get("STREAM_WINDOW", "2000")))
+            _hubs[interval] = hub
+            tracer.register_counters(f"stream_{interval}", hub.stats)
+    return hub
@@ -0,0 +1,421 @@
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (Prometheus layout)"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class Span:
+    """Times one stage; nested spans are recorded as children of the enclosing one"""
+
+    __slots__ = ("tracer", "name", "start", "children")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.children = []
+
+    def __enter__(self):
+        local = self.tracer._local
+        stack = getattr(local, "stack", None)
+        if stack is None:
+            stack = local.stack = []
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        stack = self.tracer._local.stack
+        stack.pop()
+        node = (self.name, self.start, duration, self.children)
+        if stack:
+            stack[-1].children.append(node)
+        self.tracer._finish(node, exc_type is not None, root=not stack)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class Tracer:
+    """Per-stage latency histograms, cache hit counters and recent traces.
+
+    Disabled by default; while disabled, spans and cache events return
+    immediately without taking a lock or reading the clock. Components with
+    counters of their own (shared cache, model registry, provider client)
+    register collectors that are only read when a snapshot is taken.
+    """
+
+    def __init__(self, enabled=False, recent=100):
+        self.enabled = enabled
+        self.histograms = {}
+        self.errors = {}
+        self.cache_counts = {}  # name -> [hits, misses]
+        self.recent = deque(maxlen=recent)  # Finished root spans, newest last
+        self.cache_collectors = {}
+        self.counter_collectors = {}
+        self._cache_baselines = {}  # Collector counts at the last reset
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        return cls(enabled=os.environ.get("STOCK_TRACE", "") == "1")
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.errors.clear()
+            self.cache_counts.clear()
+            self.recent.clear()
+            self.started_at = time.time()
+        self._cache_baselines = {name: tuple(counts) for name, counts in self._collect_caches().items()}
+
+    def _collect_caches(self):
+        caches = {}
+        for name, fn in self.cache_collectors.items():
+            try:
+                caches[name] = tuple(fn())
+            except Exception:
+                continue
+        return caches
+
+    def _finish(self, node, failed, root):
+        name, start, duration = node[:3]
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(duration)
+            if failed:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            if root:
+                self.recent.append((time.time() - duration, node))
+
+    def cache_event(self, name, hit):
+        """Count a hit or miss for a cache without counters of its own"""
+        if not self.enabled:
+            return
+        with self._lock:
+            counts = self.cache_counts.get(name)
+            if counts is None:
+                counts = self.cache_counts[name] = [0, 0]
+            counts[0 if hit else 1] += 1
+
+    def register_cache(self, name, fn):
+        """Report a cache that keeps its own counts; fn returns (hits, misses)"""
+        self.cache_collectors[name] = fn
+
+    def register_counters(self, name, fn):
+        """Report a component's counters; fn returns a dict of numbers"""
+        self.counter_collectors[name] = fn
+
+    def snapshot(self):
+        """All metrics as plain data (latencies in milliseconds)"""
+        with self._lock:
+            histograms = {name: (h.count, h.total, h.max, h.quantile(0.5), h.quantile(0.95),
+                                 h.quantile(0.99), list(h.counts))
+                          for name, h in self.histograms.items()}
+            errors = dict(self.errors)
+            caches = {name: tuple(counts) for name, counts in self.cache_counts.items()}
+        for name, (hits, misses) in self._collect_caches().items():
+            base_hits, base_misses = self._cache_baselines.get(name, (0, 0))
+            caches[name] = (hits - base_hits, misses - base_misses)
+        counters = {}
+        for name, fn in self.counter_collectors.items():
+            try:
+                counters[name] = {k: v for k, v in fn().items() if isinstance(v, (int, float))}
+            except Exception:
+                continue
+
+        return {
+            "enabled": self.enabled,
+            "since": self.started_at,
+            "stages": {
+                name: {
+                    "count": count,
+                    "total_ms": total * 1000,
+                    "mean_ms": total / count * 1000 if count else 0.0,
+                    "p50_ms": p50 * 1000,
+                    "p95_ms": p95 * 1000,
+                    "p99_ms": p99 * 1000,
+                    "max_ms": peak * 1000,
+                    "errors": errors.get(name, 0),
+                    "buckets": buckets,
+                }
+                for name, (count, total, peak, p50, p95, p99, buckets) in histograms.items()
+            },
+            "caches": {
+                name: {"hits": hits, "misses": misses,
+                       "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+                for name, (hits, misses) in caches.items()
+            },
+            "counters": counters,
+        }
+
+    def recent_traces(self, limit=20):
+        """The latest root spans as (started_at, rows), rows being (depth, name, offset_ms, ms)"""
+        with self._lock:
+            traces = list(self.recent)[-limit:]
+
+        def flatten(node, origin, depth, rows):
+            name, start, duration, children = node
+            rows.append((depth, name, (start - origin) * 1000, duration * 1000))
+            for child in children:
+                flatten(child, origin, depth + 1, rows)
+            return rows
+
+        return [(started_at, flatten(node, node[1], 0, [])) for started_at, node in reversed(traces)]
+
+    def to_prometheus(self):
+        """Render the snapshot in the Prometheus text exposition format"""
+        snap = self.snapshot()
+        lines = [
+            "# HELP stock_app_stage_seconds Latency of traced stages",
+            "# TYPE stock_app_stage_seconds histogram",
+        ]
+        for name, stage in sorted(snap["stages"].items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS + ("+Inf",), stage["buckets"]):
+                cumulative += n
+                lines.append(f'stock_app_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'stock_app_stage_seconds_sum{{stage="{name}"}} {stage["total_ms"] / 1000:.6f}')
+            lines.append(f'stock_app_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+
+        lines += ["# HELP stock_app_stage_errors_total Traced stages that raised",
+                  "# TYPE stock_app_stage_errors_total counter"]
+        for name, stage in sorted(snap["stages"].items()):
+            lines.append(f'stock_app_stage_errors_total{{stage="{name}"}} {stage["errors"]}')
+
+        lines += ["# HELP stock_app_cache_requests_total Cache lookups by result",
+                  "# TYPE stock_app_cache_requests_total counter"]
+        for name, cache in sorted(snap["caches"].items()):
+            lines.append(f'stock_app_cache_requests_total{{cache="{name}",result="hit"}} {cache["hits"]}')
+            lines.append(f'stock_app_cache_requests_total{{cache="{name}",result="miss"}} {cache["misses"]}')
+
+        lines += ["# HELP stock_app_component_value Counters reported by app components",
+                  "# TYPE stock_app_component_value gauge"]
+        for component, values in sorted(snap["counters"].items()):
+            for key, value in sorted(values.items()):
+                lines.append(f'stock_app_component_value{{component="{component}",name="{key}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def write(self, path):
+        """Atomically write the metrics to a file: Prometheus text for .prom/.txt, else JSON"""
+        text = self.to_prometheus() if str(path).endswith((".prom", ".txt")) else self.to_json()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+tracer = Tracer.from_env()
+
+
+def span(name):
+    """Context manager timing a stage; a shared no-op while tracing is off"""
+    if not tracer.enabled:
+        return _NOOP
+    return Span(tracer, name)
+
+
+def traced(name):
+    """Decorator timing every call of a function as a stage"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with Span(tracer, name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def cache_event(name, hit):
+    if tracer.enabled:
+        tracer.cache_event(name, hit)
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters(path=None, interval=None, port=None, host=None):
+    """Periodically write the metrics to a file and/or serve them on /metrics.
+
+    Defaults come from STOCK_TRACE_FILE, STOCK_TRACE_EXPORT_INTERVAL (15 s),
+    STOCK_TRACE_PORT and STOCK_TRACE_HOST (127.0.0.1); does nothing when
+    neither a file nor a port is set. The file works with node_exporter's
+    textfile collector. Called by the Streamlit pages (through
+    render_admin_panel), not on import, so jobs and worker processes never
+    start exporters; if the port is taken, e.g. by another replica, a
+    warning is logged and the app carries on.
+    """
+    global _exporters_started
+    path = path or os.environ.get("STOCK_TRACE_FILE")
+    interval = interval or float(os.environ.get("STOCK_TRACE_EXPORT_INTERVAL", "15"))
+    port = port or int(os.environ.get("STOCK_TRACE_PORT", "0"))
+    host = host or os.environ.get("STOCK_TRACE_HOST", "127.0.0.1")
+    with _exporters_lock:
+        if _exporters_started or not (path or port):
+            return
+        _exporters_started = True
+
+    if path:
+        def export_loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    tracer.write(path)
+                except OSError:
+                    pass
+
+        threading.Thread(target=export_loop, name="trace-export", daemon=True).start()
+
+    if port:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            logger.warning("Metrics endpoint not started on %s:%s: %s", host, port, e)
+            return
+        threading.Thread(target=server.serve_forever, name="trace-metrics", daemon=True).start()
+
+
+def is_admin(username):
+    """Whether a user may open the performance panel (STOCK_ADMIN_USERS)"""
+    admins = {u.strip() for u in os.environ.get("STOCK_ADMIN_USERS", "").split(",") if u.strip()}
+    return username in admins
+
+
+def render_admin_panel(username):
+    """Performance panel in the sidebar, shown to admins who open the page with ?admin=1"""
+    import pandas as pd
+    import streamlit as st
+
+    start_exporters()  # Once per process, on the first page render
+    if st.query_params.get("admin") != "1" or not is_admin(username):
+        return
+
+    with st.sidebar.expander("⚙️ Performance", expanded=True):
+        enabled = st.toggle("Tracing enabled", value=tracer.enabled, key="admin_tracing")
+        if enabled != tracer.enabled:
+            tracer.enable() if enabled else tracer.disable()
+
+        snap = tracer.snapshot()
+        st.caption(f"Since {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(snap['since']))}")
+
+        st.markdown("**Stages**")
+        if snap["stages"]:
+            stages = pd.DataFrame(snap["stages"]).T.drop(columns="buckets")
+            st.dataframe(stages.sort_values("total_ms", ascending=False).round(2),
+                         use_container_width=True)
+        else:
+            st.info("No spans recorded yet")
+
+        st.markdown("**Caches**")
+        if snap["caches"]:
+            st.dataframe(pd.DataFrame(snap["caches"]).T.round(3), use_container_width=True)
+
+        traces = tracer.recent_traces()
+        if traces:
+            st.markdown("**Recent traces**")
+            labels = [f"{time.strftime('%H:%M:%S', time.localtime(started))} {rows[0][1]} "
+                      f"({rows[0][3]:.1f} ms)" for started, rows in traces]
+            choice = st.selectbox("Trace", options=range(len(traces)), format_func=labels.__getitem__,
+                                  key="admin_trace")
+            st.dataframe(pd.DataFrame([("  " * depth + name, offset, ms)
+                                       for depth, name, offset, ms in traces[choice][1]],
+                                      columns=["stage", "start_ms", "ms"]).round(2),
+                         hide_index=True, use_container_width=True)
+
+        with st.popover("Component counters"):
+            st.json(snap["counters"])
+
+        st.download_button("Prometheus metrics", data=tracer.to_prometheus,
+                           file_name="stock_app.prom", mime="text/plain")
+        st.download_button("JSON snapshot", data=tracer.to_json,
+                           file_name="stock_app_metrics.json", mime="application/json")
+        if st.button("Reset metrics"):
+            tracer.reset()
+            st.rerun()
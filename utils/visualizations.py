@@ -1,73 +1,466 @@
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import hashlib
+import time
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
+from utils.data_handler import StockDataHandler
+from utils.indicators import OVERLAYS, TechnicalIndicators
+from utils.tracing import cache_event, span, traced
+
+# Candidate bucket sizes for downsampling, finest first
+RESAMPLE_RULES = [
+    ("5min", pd.Timedelta(minutes=5)),
+    ("15min", pd.Timedelta(minutes=15)),
+    ("30min", pd.Timedelta(minutes=30)),
+    ("1h", pd.Timedelta(hours=1)),
+    ("D", pd.Timedelta(days=1)),
+    ("W", pd.Timedelta(days=7)),
+    ("ME", pd.Timedelta(days=30)),
+    ("QE", pd.Timedelta(days=91)),
+    ("YE", pd.Timedelta(days=365)),
+]
+
+OHLCV_AGGREGATION = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Volume': 'sum',
+}
+
+# Bar columns plotted by live charts, besides the timestamps
+LIVE_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+# Pixel heights of the chart rows: price, volume and each indicator pane
+PRICE_PANE_HEIGHT = 560
+VOLUME_PANE_HEIGHT = 240
+INDICATOR_PANE_HEIGHT = 180
+
+# Line colours for indicator overlays, in the order their columns are drawn
+OVERLAY_COLORS = ['#FB8C00', '#8E24AA', '#00897B', '#E53935', '#3949AB', '#6D4C41']
+
+# Plotly is imported inside the chart builders so importing this module,
+# which every page does, stays cheap
 
 class StockVisualizer:
     @staticmethod
-    def create_stock_chart(data, predictions=None):
-        """Create an interactive stock price chart with optional predictions"""
-        fig = make_subplots(rows=2, cols=1, 
-                           shared_xaxes=True,
-                           vertical_spacing=0.03,
-                           row_heights=[0.7, 0.3])
+    def choose_resample_rule(data, max_points):
+        """Pick the finest bucket size that keeps a history under max_points bars"""
+        if max_points is None or len(data) <= max_points:
+            return None
+        span = data.index[-1] - data.index[0]
+        for rule, width in RESAMPLE_RULES:
+            if span / width <= max_points:
+                return rule
+        return RESAMPLE_RULES[-1][0]
 
-        # Candlestick chart
-        fig.add_trace(
-            go.Candlestick(
-                x=data.index,
-                open=data['Open'],
-                high=data['High'],
-                low=data['Low'],
-                close=data['Close'],
-                name='OHLC'
-            ),
-            row=1, col=1
-        )
+    @staticmethod
+    def resample_ohlcv(data, rule):
+        """Aggregate OHLCV bars into coarser buckets"""
+        aggregation = {k: v for k, v in OHLCV_AGGREGATION.items() if k in data.columns}
+        return data.resample(rule).agg(aggregation).dropna(subset=['Close'])
 
-        # Add predictions if available
-        if predictions is not None:
-            fig.add_trace(
-                go.Scatter(
-                    x=predictions.index,
-                    y=predictions.values,
-                    mode='lines',
-                    name='Predicted',
-                    line=dict(color='#2E7D32', dash='dash'),
+    @staticmethod
+    def lttb(x, y, n_out):
+        """Largest-Triangle-Three-Buckets downsampling of a line to n_out points"""
+        n = len(y)
+        if n_out >= n or n_out < 3:
+            return np.arange(n)
+        y = np.asarray(y, dtype=float)
+        x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+        edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+        selected = np.empty(n_out, dtype=int)
+        selected[0], selected[-1] = 0, n - 1
+        previous = 0
+        for i in range(n_out - 2):
+            start, stop = edges[i], edges[i + 1]
+            # Average of the next bucket is the third triangle vertex
+            next_stop = edges[i + 2] if i + 2 < len(edges) else n
+            avg_x = x[stop:next_stop].mean()
+            avg_y = y[stop:next_stop].mean()
+            area = np.abs(
+                (x[previous] - avg_x) * (y[start:stop] - y[previous])
+                - (x[previous] - x[start:stop]) * (avg_y - y[previous])
+            )
+            previous = start + int(np.argmax(area))
+            selected[i + 1] = previous
+        return selected
+
+    # Layouts shared by every chart, built once per set of indicator panes
+    # and shallow-copied per figure
+    _layout_templates = {}
+    # Validated OHLC/volume traces keyed by symbol, data fingerprint and point budget
+    base_trace_cache = OrderedDict()
+    # Finished figures, additionally keyed by a hash of the predictions
+    figure_cache = OrderedDict()
+    figure_cache_size = 32
+
+    @staticmethod
+    def chart_layout(panes=()):
+        """Return the prebuilt price/volume layout, plus one row per indicator pane"""
+        panes = tuple(panes)
+        template = StockVisualizer._layout_templates.get(panes)
+        if template is None:
+            from plotly.subplots import make_subplots
+            heights = [PRICE_PANE_HEIGHT, VOLUME_PANE_HEIGHT] + [INDICATOR_PANE_HEIGHT] * len(panes)
+            fig = make_subplots(rows=len(heights), cols=1,
+                               shared_xaxes=True,
+                               vertical_spacing=0.03 * 2 / len(heights),
+                               row_heights=[h / sum(heights) for h in heights])
+
+            # Update layout
+            fig.update_layout(
+                title_text="Stock Price & Volume Chart with Predictions",
+                xaxis_rangeslider_visible=False,
+                height=sum(heights),
+                template="plotly",  # Changed to light theme
+                showlegend=True,
+                legend=dict(
+                    yanchor="top",
+                    y=0.99,
+                    xanchor="left",
+                    x=0.01
                 ),
-                row=1, col=1
+                margin=dict(l=50, r=50, t=50, b=50),
+                paper_bgcolor='white',
+                plot_bgcolor='white'
             )
 
-        # Volume bar chart
-        fig.add_trace(
-            go.Bar(
-                x=data.index,
-                y=data['Volume'],
-                name='Volume',
-                marker_color='rgba(30, 136, 229, 0.5)'
-            ),
-            row=2, col=1
+            # Update axes for better visibility in light theme
+            fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='#E0E0E0')
+            fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='#E0E0E0')
+            for row, pane in enumerate(panes, start=3):
+                fig.update_yaxes(title_text=pane, row=row, col=1)
+
+            template = fig.layout.to_plotly_json()
+            StockVisualizer._layout_templates[panes] = template
+        return template
+
+    @staticmethod
+    @traced("chart.base_traces")
+    def base_traces(data, max_points=1000):
+        """Build the candlestick and volume traces, downsampled to max_points"""
+        import plotly.graph_objects as go
+        rule = StockVisualizer.choose_resample_rule(data, max_points)
+        if rule is not None:
+            data = StockVisualizer.resample_ohlcv(data, rule)
+
+        # Candlestick chart
+        candlestick = go.Candlestick(
+            x=data.index,
+            open=data['Open'],
+            high=data['High'],
+            low=data['Low'],
+            close=data['Close'],
+            name='OHLC',
+            xaxis='x', yaxis='y'
         )
 
-        # Update layout
-        fig.update_layout(
-            title_text="Stock Price & Volume Chart with Predictions",
-            xaxis_rangeslider_visible=False,
-            height=800,
-            template="plotly",  # Changed to light theme
-            showlegend=True,
-            legend=dict(
-                yanchor="top",
-                y=0.99,
-                xanchor="left",
-                x=0.01
-            ),
-            margin=dict(l=50, r=50, t=50, b=50),
-            paper_bgcolor='white',
-            plot_bgcolor='white'
+        # Volume bar chart
+        volume = go.Bar(
+            x=data.index,
+            y=data['Volume'],
+            name='Volume',
+            marker_color='rgba(30, 136, 229, 0.5)',
+            xaxis='x2', yaxis='y2'
         )
+        return candlestick.to_plotly_json(), volume.to_plotly_json()
+
+    @staticmethod
+    def prediction_trace(predictions, max_points=1000):
+        """Build the dashed prediction line"""
+        import plotly.graph_objects as go
+        if max_points is not None and len(predictions) > max_points:
+            keep = StockVisualizer.lttb(None, predictions.values, max_points)
+            predictions = predictions.iloc[keep]
+        return go.Scattergl(
+            x=predictions.index,
+            y=predictions.values,
+            mode='lines',
+            name='Predicted',
+            line=dict(color='#2E7D32', dash='dash'),
+            xaxis='x', yaxis='y'
+        ).to_plotly_json()
+
+    @staticmethod
+    def band_traces(bands, max_points=1000):
+        """Build the shaded forecast band between the outer quantile columns.
+
+        The lower edge is drawn first with no line, so the upper edge can
+        fill down to it; a middle quantile column, if any, is drawn dotted.
+        """
+        import plotly.graph_objects as go
+        if max_points is not None and len(bands) > max_points:
+            bands = bands.iloc[::-(-len(bands) // max_points)]
+        columns = list(bands.columns)
+        lower, upper = columns[0], columns[-1]
+        traces = [
+            go.Scatter(x=bands.index, y=bands[lower], mode='lines', name=lower,
+                       line=dict(width=0), showlegend=False, hoverinfo='skip',
+                       xaxis='x', yaxis='y'),
+            go.Scatter(x=bands.index, y=bands[upper], mode='lines',
+                       name=f"{lower}-{upper} band", line=dict(width=0), fill='tonexty',
+                       fillcolor='rgba(46, 125, 50, 0.15)', xaxis='x', yaxis='y'),
+        ]
+        for column in columns[1:-1]:
+            traces.append(go.Scatter(x=bands.index, y=bands[column], mode='lines', name=column,
+                                     line=dict(color='#2E7D32', width=1, dash='dot'),
+                                     xaxis='x', yaxis='y'))
+        return [trace.to_plotly_json() for trace in traces]
+
+    @staticmethod
+    @traced("chart.indicator_traces")
+    def indicator_traces(data, overlays, symbol=None, max_points=1000):
+        """Build the traces for a selection of indicator overlays.
+
+        Every column comes from one shared indicator set, so five overlays
+        cost one pass over the closes. Returns ``(price_traces,
+        pane_traces, panes)``: overlays drawn on the candlestick pane,
+        traces for the indicator panes below the volume, and the pane names.
+        """
+        import plotly.graph_objects as go
+        frame = TechnicalIndicators.compute(data, TechnicalIndicators.overlay_columns(overlays), symbol)
+        rule = StockVisualizer.choose_resample_rule(data, max_points)
+        if rule is not None:
+            # Value at the end of each bucket, matching the resampled candles
+            frame = frame.resample(rule).last().dropna(how='all')
 
-        # Update axes for better visibility in light theme
+        price_traces, pane_traces, panes = [], [], []
+        colors = iter(OVERLAY_COLORS * 3)
+        for overlay in overlays:
+            columns, pane = OVERLAYS[overlay]
+            if pane == "price":
+                axes = dict(xaxis='x', yaxis='y')
+                traces = price_traces
+            else:
+                panes.append(pane)
+                row = len(panes) + 2
+                axes = dict(xaxis=f'x{row}', yaxis=f'y{row}')
+                traces = pane_traces
+
+            for column in columns:
+                if column == "MACD_Hist":
+                    trace = go.Bar(x=frame.index, y=frame[column], name="MACD Hist",
+                                   marker_color='rgba(117, 117, 117, 0.5)', **axes)
+                elif column.startswith("BB_"):
+                    # Shade between the bands: middle and lower each fill up to the previous band
+                    trace = go.Scatter(x=frame.index, y=frame[column], mode='lines', name=column,
+                                       line=dict(color='#90A4AE', width=1,
+                                                 dash='dot' if column == "BB_Middle" else 'solid'),
+                                       fill=None if column == "BB_Upper" else 'tonexty',
+                                       fillcolor='rgba(144, 164, 174, 0.15)', **axes)
+                else:
+                    trace = go.Scatter(x=frame.index, y=frame[column], mode='lines', name=column,
+                                       line=dict(color=next(colors), width=1.5), **axes)
+                traces.append(trace.to_plotly_json())
+        return price_traces, pane_traces, panes
+
+    @staticmethod
+    def predictions_key(predictions):
+        if predictions is None:
+            return None
+        digest = hashlib.blake2b(np.ascontiguousarray(predictions.values, dtype=float).tobytes(),
+                                 digest_size=12)
+        digest.update(repr((predictions.index[0], predictions.index[-1])).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _cache_put(cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > StockVisualizer.figure_cache_size:
+            cache.popitem(last=False)
+
+    @staticmethod
+    @traced("chart.stock")
+    def create_stock_chart(data, predictions=None, max_points=1000, symbol=None, overlays=()):
+        """Create an interactive stock price chart with optional predictions
+
+        Histories longer than max_points bars are aggregated into coarser
+        OHLCV buckets (weekly, monthly, ...) to keep the chart payload small;
+        pass max_points=None to plot every bar. ``overlays`` names indicator
+        groups from utils.indicators.OVERLAYS: price overlays are drawn over
+        the candles and the others in panes below the volume. With a symbol,
+        the OHLC, volume and overlay traces are cached per data fingerprint,
+        so toggling the prediction overlay reuses them, and finished figures
+        are cached too. ``predictions`` may be a DataFrame from
+        StockPredictor.get_forecast with bands: its quantile columns are
+        shaded around the "Predicted" line.
+        """
+        overlays = tuple(overlays)
+
+        base_key = figure_key = None
+        if symbol is not None:
+            base_key = (symbol, StockDataHandler.data_fingerprint(data), max_points)
+            figure_key = base_key + (StockVisualizer.predictions_key(predictions), overlays)
+            fig = StockVisualizer.figure_cache.get(figure_key)
+            cache_event("figure", fig is not None)
+            if fig is not None:
+                StockVisualizer.figure_cache.move_to_end(figure_key)
+                return fig
+
+        traces = StockVisualizer.base_trace_cache.get(base_key) if base_key else None
+        if base_key is not None:
+            cache_event("base_traces", traces is not None)
+        if traces is None:
+            traces = StockVisualizer.base_traces(data, max_points)
+            if base_key is not None:
+                StockVisualizer._cache_put(StockVisualizer.base_trace_cache, base_key, traces)
+        candlestick, volume = traces
+
+        price_traces, pane_traces, panes = [], [], []
+        if overlays:
+            overlay_key = base_key + (overlays,) if base_key else None
+            cached = StockVisualizer.base_trace_cache.get(overlay_key) if overlay_key else None
+            if cached is None:
+                cached = StockVisualizer.indicator_traces(data, overlays, symbol, max_points)
+                if overlay_key is not None:
+                    StockVisualizer._cache_put(StockVisualizer.base_trace_cache, overlay_key, cached)
+            price_traces, pane_traces, panes = cached
+
+        # Add predictions if available
+        data_traces = [candlestick] + price_traces
+        if isinstance(predictions, pd.DataFrame):
+            data_traces += StockVisualizer.band_traces(predictions.drop(columns="Predicted"), max_points)
+            predictions = predictions["Predicted"]
+        if predictions is not None:
+            data_traces.append(StockVisualizer.prediction_trace(predictions, max_points))
+        data_traces.append(volume)
+        data_traces += pane_traces
+
+        # Traces were validated when built, so assemble without re-validating
+        import plotly.graph_objects as go
+        with span("chart.assemble"):
+            fig = go.Figure(data=data_traces, layout=dict(StockVisualizer.chart_layout(panes)),
+                            _validate=False)
+
+        if figure_key is not None:
+            StockVisualizer._cache_put(StockVisualizer.figure_cache, figure_key, fig)
+        return fig
+
+    @staticmethod
+    def _live_columns(bars):
+        """A live chart's trace columns for a frame of bars, keyed like the ring buffers"""
+        columns = {"x": bars.index.to_numpy()}
+        for name in LIVE_COLUMNS:
+            columns[name] = bars[name].to_numpy(dtype=float)
+        return columns
+
+    @staticmethod
+    def _show_live_ring(chart):
+        """Point the live chart's traces at the window held in its ring buffers"""
+        ring = chart["ring"]
+        view = {name: buffer[ring["start"]:ring["end"]] for name, buffer in ring["columns"].items()}
+        candlestick, volume = chart["figure"].data
+        # Plain assignment skips update()'s property path parsing
+        candlestick.x, volume.x = view["x"], view["x"]
+        candlestick.open, candlestick.high = view["Open"], view["High"]
+        candlestick.low, candlestick.close = view["Low"], view["Close"]
+        volume.y = view["Volume"]
+
+    @staticmethod
+    @traced("chart.live_create")
+    def create_live_chart(series, title=None):
+        """Build the live chart for a LiveSeries; returns a chart state dict.
+
+        The state belongs to one viewer (keep it in st.session_state); its
+        "build_ms" is how long this build or update took. Its "ring" holds
+        the plotted columns in buffers of twice the series window, so new
+        bars are written in place and the window is always one contiguous
+        slice; the buffers are compacted once per window of appended bars.
+        """
+        import plotly.graph_objects as go
+        start = time.perf_counter()
+        data = series.frame()
+        version = series.version
+        window = series.window
+        columns = {}
+        for name, values in StockVisualizer._live_columns(data.iloc[-window:]).items():
+            columns[name] = np.empty(2 * window, dtype=values.dtype)
+            columns[name][:len(values)] = values
+        layout = dict(StockVisualizer.chart_layout())
+        layout["title"] = {"text": title or f"{series.symbol} live"}
+        fig = go.Figure(data=list(StockVisualizer.base_traces(data.iloc[:0], max_points=None)),
+                        layout=layout, _validate=False)
+        chart = {"figure": fig, "version": version, "window": window, "new_bars": len(data),
+                 "ring": {"columns": columns, "start": 0, "end": min(len(data), window)}}
+        StockVisualizer._show_live_ring(chart)
+        chart["build_ms"] = (time.perf_counter() - start) * 1000
+        return chart
+
+    @staticmethod
+    @traced("chart.live_update")
+    def update_live_chart(chart, series, title=None):
+        """Append the bars a live chart has not seen yet, instead of rebuilding it
+
+        Only the new bars are copied, into the chart's ring buffers (see
+        create_live_chart). Falls back to create_live_chart when there is
+        no chart yet or it fell further behind than the series window.
+        """
+        if chart is None or "ring" not in chart:
+            return StockVisualizer.create_live_chart(series, title)
+        start = time.perf_counter()
+        bars, version = series.since(chart["version"])
+        if bars is None:
+            return StockVisualizer.create_live_chart(series, title)
+
+        if len(bars):
+            window = chart["window"]
+            ring = chart["ring"]
+            new = StockVisualizer._live_columns(bars.iloc[-window:])
+            count = len(new["x"])
+            first, end = ring["start"], ring["end"]
+            if end + count > 2 * window:
+                # Out of room: move the bars that stay in the window to the front
+                kept = min(end - first, window - count)
+                for buffer in ring["columns"].values():
+                    buffer[:kept] = buffer[end - kept:end]
+                first, end = 0, kept
+            for name, buffer in ring["columns"].items():
+                buffer[end:end + count] = new[name]
+            end += count
+            ring["start"], ring["end"] = max(first, end - window), end
+            StockVisualizer._show_live_ring(chart)
+        return dict(chart, version=version, new_bars=len(bars),
+                    build_ms=(time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    @traced("chart.correlation")
+    def create_correlation_heatmap(correlation):
+        """Heatmap of a correlation matrix on a fixed -1..1 diverging scale"""
+        import plotly.graph_objects as go
+        labels = list(correlation.columns)
+        show_text = len(labels) <= 20
+        fig = go.Figure(go.Heatmap(
+            z=correlation.to_numpy(), x=labels, y=labels, zmin=-1, zmax=1,
+            colorscale='RdBu', reversescale=True,
+            text=correlation.round(2).to_numpy() if show_text else None,
+            texttemplate="%{text}" if show_text else None,
+            hovertemplate="%{y} / %{x}: %{z:.2f}<extra></extra>",
+        ))
+        size = min(max(400, 24 * len(labels)), 900)
+        fig.update_layout(title_text="Return Correlation", height=size, template="plotly",
+                          yaxis=dict(autorange='reversed'), margin=dict(l=50, r=50, t=50, b=50),
+                          paper_bgcolor='white', plot_bgcolor='white')
+        return fig
+
+    @staticmethod
+    @traced("chart.rolling_beta")
+    def create_beta_chart(betas, benchmark, max_points=1000):
+        """Line chart of rolling betas, one line per symbol"""
+        import plotly.graph_objects as go
+        keep = np.arange(len(betas))
+        if max_points is not None and len(betas) > max_points:
+            keep = np.linspace(0, len(betas) - 1, max_points).astype(int)
+        fig = go.Figure([
+            go.Scattergl(x=betas.index[keep], y=betas[symbol].to_numpy()[keep], mode='lines', name=symbol)
+            for symbol in betas.columns
+        ])
+        fig.add_hline(y=1.0, line=dict(color='#9E9E9E', dash='dot'))
+        fig.update_layout(title_text=f"Rolling Beta vs {benchmark}", height=400, template="plotly",
+                          margin=dict(l=50, r=50, t=50, b=50), paper_bgcolor='white',
+                          plot_bgcolor='white')
         fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='#E0E0E0')
         fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='#E0E0E0')
-
-        return fig
\ No newline at end of file
+        return fig